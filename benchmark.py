@@ -0,0 +1,406 @@
+"""Performance baselines for the portfolio math and the risk API.
+
+Runs every benchmark on synthetic portfolios of several sizes and writes the
+timings as JSON, so runs can be compared over time::
+
+    python benchmark.py --output bench/today.json
+    python benchmark.py --compare bench/today.json --fail-on-regression
+
+API routes are exercised through Flask's test client against synthetic price
+CSVs and tiny models written to a temporary directory, so no real data or
+network is needed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from portfolio_analysis import (
+    PortfolioState,
+    RiskTrendStream,
+    analyze_portfolio,
+    predict_risk_trend,
+    predict_risk_trends,
+    simulate_portfolio_change,
+)
+from portfolio_risk import (
+    calculate_portfolio_risk_advanced,
+    calculate_weighted_portfolio_risk,
+    conditional_value_at_risk,
+    risk_measures,
+    value_at_risk,
+)
+
+SECTORS = ["Technology", "Energy", "Finance", "Health", "Industrials", "Utilities", "Materials"]
+FEATURE_COLUMNS = ["rsi", "sma_20", "volatility", "beta"]
+
+
+def make_positions(n: int, history: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Return ``n`` synthetic positions with ``history`` daily returns each."""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.01, history)
+    betas = rng.uniform(0.5, 1.5, n)
+    returns = betas[:, None] * market + rng.normal(0, 0.015, (n, history))
+    return [
+        {
+            "symbol": f"S{i:05d}",
+            "quantity": int(rng.integers(1, 100)),
+            "price": float(rng.uniform(5, 500)),
+            "risk_score": float(rng.random()),
+            "sector": SECTORS[i % len(SECTORS)],
+            "volatility": float(returns[i].std()),
+            "beta": float(betas[i]),
+            "returns": returns[i].tolist(),
+        }
+        for i in range(n)
+    ]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Time ``fn`` ``repeat`` times after one untimed warm-up call."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "repeat": repeat,
+    }
+
+
+class Suite:
+    """Collects benchmark results, optionally filtered by name substring."""
+
+    def __init__(self, repeat: int, only: Optional[str] = None, verbose: bool = True) -> None:
+        self.repeat = repeat
+        self.only = only
+        self.verbose = verbose
+        self.results: List[Dict[str, Any]] = []
+
+    def run(self, name: str, fn: Callable[[], Any], skip: Optional[str] = None, **params) -> None:
+        if self.only and self.only not in name:
+            return
+        record = {"name": name, **params}
+        if skip:
+            record["skipped"] = skip
+        else:
+            record.update(measure(fn, self.repeat))
+        self.results.append(record)
+        if self.verbose:
+            timing = record.get("skipped") or f"{record['median_s'] * 1e3:10.3f} ms"
+            label = " ".join(f"{k}={v}" for k, v in params.items())
+            print(f"{name:<40} {label:<28} {timing}", file=sys.stderr)
+
+
+def bench_portfolio_math(suite: Suite, sizes: List[int], history: int, max_pairwise: int) -> None:
+    for n in sizes:
+        positions = make_positions(n, history)
+        params = {"positions": n, "history": history}
+        without_returns = [{k: v for k, v in p.items() if k != "returns"} for p in positions]
+        change = dict(make_positions(1, history, seed=1)[0], symbol="NEW")
+        candidates = make_positions(100, history, seed=2)
+        weights = np.array([p["quantity"] * p["price"] for p in positions])
+        weights /= weights.sum()
+        asset_returns = np.array([p["returns"] for p in positions])
+        portfolio_returns = weights @ asset_returns
+        pairwise = f"skipped: builds an n x n matrix above {max_pairwise} positions" if n > max_pairwise else None
+
+        suite.run("calculate_weighted_portfolio_risk", lambda: calculate_weighted_portfolio_risk(positions), **params)
+        suite.run("calculate_portfolio_risk_advanced",
+                  lambda: calculate_portfolio_risk_advanced(positions, include_contributions=True), **params)
+        suite.run("analyze_portfolio", lambda: analyze_portfolio(positions), skip=pairwise, **params)
+        suite.run("analyze_portfolio_no_returns", lambda: analyze_portfolio(without_returns), **params)
+        suite.run("simulate_portfolio_change", lambda: simulate_portfolio_change(without_returns, change), **params)
+        suite.run("portfolio_state_evaluate_100",
+                  lambda: PortfolioState(without_returns).evaluate(candidates), **params)
+        suite.run("value_at_risk", lambda: value_at_risk(portfolio_returns), **params)
+        suite.run("conditional_value_at_risk", lambda: conditional_value_at_risk(portfolio_returns), **params)
+        suite.run("risk_measures_historical_per_position",
+                  lambda: risk_measures(asset_returns, [0.95, 0.99]), **params)
+        suite.run("risk_measures_parametric",
+                  lambda: risk_measures(confidence=[0.95, 0.99], method="parametric",
+                                        weights=weights, asset_returns=asset_returns), **params)
+        suite.run("risk_measures_monte_carlo",
+                  lambda: risk_measures(confidence=[0.95, 0.99], method="monte_carlo", weights=weights,
+                                        asset_returns=asset_returns, n_simulations=10000, seed=0),
+                  skip=pairwise, **params)
+
+    for length in sorted({10, history, 10 * history}):
+        risk_history = [(str(i), 0.3 + 0.001 * i) for i in range(length)]
+        suite.run("predict_risk_trend", lambda: predict_risk_trend(risk_history), history=length)
+
+    histories = [[0.3 + 0.001 * (i + j) for j in range(history - i % 10)] for i in range(1000)]
+    suite.run("predict_risk_trends_1000", lambda: predict_risk_trends(histories), history=history)
+    stream = RiskTrendStream()
+    for i, risks in enumerate(histories):
+        stream.extend(i, risks)
+    suite.run("risk_trend_stream_add_1000",
+              lambda: [stream.add(i, 0.4) for i in range(1000)], history=history)
+    suite.run("risk_trend_stream_forecast_1000", lambda: stream.forecast(), history=history)
+
+
+def bench_covariance(suite: Suite, sizes: List[int], history: int, max_pairwise: int) -> None:
+    """Time building, reusing and incrementally updating stored-history covariances."""
+    from covariance_service import CovarianceService
+    from price_store import PriceStore
+
+    n_max = min(max(sizes), max_pairwise)
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range("2020-01-01", periods=history + 1)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (history + 1, n_max)), axis=0))
+    symbols = [f"C{i:05d}" for i in range(n_max)]
+    with tempfile.TemporaryDirectory() as root:
+        store = PriceStore(root)
+        store.write({s: pd.Series(closes[:, i], index=dates) for i, s in enumerate(symbols)})
+        next_day = [dates[-1]]
+
+        def append_day(service, subset):
+            next_day[0] += pd.offsets.BDay()
+            store.write({s: pd.Series([100.0 + rng.random()], index=[next_day[0]]) for s in subset})
+            return service.statistics(subset)
+
+        for n in sizes:
+            params = {"symbols": n, "history": history}
+            skip = f"skipped: builds an n x n matrix above {max_pairwise} symbols" if n > max_pairwise else None
+            subset = symbols[:n]
+            suite.run("covariance_build", lambda: CovarianceService(store, window=history).statistics(subset),
+                      skip=skip, **params)
+            service = CovarianceService(store, window=history)
+            if skip is None:
+                service.statistics(subset)
+            suite.run("covariance_cached", lambda: service.statistics(subset), skip=skip, **params)
+            suite.run("covariance_new_day", lambda: append_day(service, subset), skip=skip, **params)
+
+
+def _write_api_fixture(root: str, n_symbols: int, history: int) -> List[str]:
+    """Write synthetic ``{symbol}_history.csv`` files and tiny models under ``root``."""
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(0)
+    csv_dir, model_dir = os.path.join(root, "csv"), os.path.join(root, "models")
+    os.makedirs(csv_dir)
+    os.makedirs(model_dir)
+    dates = pd.bdate_range("2020-01-01", periods=history).strftime("%Y-%m-%d")
+    symbols = [f"B{i:03d}" for i in range(n_symbols)]
+    for i, symbol in enumerate(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, history)))
+        pd.DataFrame({"date": dates, "close": close}).to_csv(os.path.join(csv_dir, f"{symbol}_history.csv"), index=False)
+        X = pd.DataFrame(rng.random((200, 4)) * [100, 200, 0.05, 2], columns=FEATURE_COLUMNS)
+        y = X["volatility"] * 4 + X["rsi"] / 500
+        model = RandomForestRegressor(n_estimators=20, max_depth=6, random_state=i).fit(X, y)
+        joblib.dump(model, os.path.join(model_dir, f"{symbol}_risk_model.pkl"))
+    return symbols
+
+
+def bench_api(suite: Suite, sizes: List[int], history: int, n_symbols: int) -> None:
+    import risk_api
+    from covariance_service import CovarianceService
+    from model_registry import ModelRegistry
+    from price_store import PriceStore
+    from universe_scores import ScoreTable
+
+    with tempfile.TemporaryDirectory() as root:
+        symbols = _write_api_fixture(root, n_symbols, history)
+        saved = (risk_api.MODEL_DIR, risk_api.CSV_DIR, risk_api.PRICE_STORE, risk_api.MODEL_REGISTRY,
+                 risk_api.COVARIANCE_SERVICE)
+        risk_api.MODEL_DIR = os.path.join(root, "models")
+        risk_api.CSV_DIR = os.path.join(root, "csv")
+        risk_api.PRICE_STORE = PriceStore(os.path.join(root, "store"))
+        risk_api.COVARIANCE_SERVICE = CovarianceService(risk_api.PRICE_STORE)
+        risk_api.MODEL_REGISTRY = ModelRegistry(risk_api.MODEL_DIR)
+        risk_api.MODEL_CACHE.invalidate()
+        try:
+            client = risk_api.app.test_client()
+
+            def post(route, payload):
+                response = client.post(route, json=payload)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{route} returned {response.status_code}: {response.get_data(as_text=True)}")
+                return response
+
+            rng = np.random.default_rng(1)
+            rows = [
+                dict(zip(FEATURE_COLUMNS, rng.random(4) * [100, 200, 0.05, 2]), symbol=symbols[i % len(symbols)])
+                for i in range(100)
+            ]
+            suite.run("POST /predict-risk", lambda: post("/predict-risk", rows[0]), rows=1)
+            suite.run("POST /predict-risk-batch", lambda: post("/predict-risk-batch", {"rows": rows}), rows=len(rows))
+            if risk_api.load_shap() is not None:
+                suite.run("POST /predict-risk-explain", lambda: post("/predict-risk-explain", rows[0]), rows=1)
+            suite.run("score_table_refresh_cold",
+                      lambda: ScoreTable(risk_api.MODEL_DIR, risk_api.score_symbol, risk_api.score_signature,
+                                         model_versions=risk_api.model_versions,
+                                         score_many=risk_api.score_symbols).refresh(),
+                      symbols=n_symbols, history=history)
+            suite.run("GET /recommend-low-risk", lambda: client.get("/recommend-low-risk"), symbols=n_symbols)
+            holdings = [{"symbol": s, "quantity": 1 + i, "price": 10.0, "sector": SECTORS[i % len(SECTORS)]}
+                        for i, s in enumerate(symbols)]
+            # Cleared each time so the whole pipeline runs, not the memoized response.
+            suite.run("POST /portfolio-full",
+                      lambda: (risk_api.RESPONSE_CACHE.clear(), post("/portfolio-full", {"holdings": holdings})),
+                      symbols=n_symbols)
+
+            for n in sizes:
+                positions = make_positions(n, history)
+                candidates = make_positions(100, history, seed=2)
+                params = {"positions": n, "history": history}
+                suite.run("POST /portfolio-risk", lambda: post("/portfolio-risk", {"positions": positions}), **params)
+                suite.run("POST /portfolio-analysis",
+                          lambda: post("/portfolio-analysis", {"positions": positions}), **params)
+                suite.run("POST /portfolio-var",
+                          lambda: post("/portfolio-var", {"positions": positions, "confidence": [0.95, 0.99]}),
+                          **params)
+                suite.run("POST /portfolio-what-if",
+                          lambda: post("/portfolio-what-if", {"positions": positions, "candidates": candidates}),
+                          **params)
+        finally:
+            (risk_api.MODEL_DIR, risk_api.CSV_DIR, risk_api.PRICE_STORE, risk_api.MODEL_REGISTRY,
+             risk_api.COVARIANCE_SERVICE) = saved
+            risk_api.MODEL_CACHE.invalidate()
+
+
+STARTUP_SCRIPTS = {
+    "startup_import_risk_api": "import risk_api",
+    "startup_first_request": (
+        "import risk_api\n"
+        "client = risk_api.app.test_client()\n"
+        "client.post('/portfolio-risk', json={'positions': [{'symbol': 'AAA', 'quantity': 1, 'price': 1.0,"
+        " 'volatility': 0.2, 'beta': 1.0, 'returns': [0.01, -0.02, 0.005]}]})"
+    ),
+}
+
+
+def bench_startup(suite: Suite) -> None:
+    """Time a fresh interpreter importing the API and serving its first request.
+
+    ``eager`` runs set ``RISK_API_EAGER_IMPORTS=1`` so the cost of loading
+    the heavy libraries at start-up stays visible too.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    for eager in (False, True):
+        env = dict(os.environ, RISK_API_EAGER_IMPORTS="1" if eager else "0")
+        for name, script in STARTUP_SCRIPTS.items():
+            command = [sys.executable, "-c", script]
+            suite.run(name, lambda: subprocess.run(command, cwd=root, env=env, check=True), eager=eager)
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _key(record: Dict[str, Any]):
+    return tuple(sorted((k, v) for k, v in record.items() if k not in ("min_s", "median_s", "mean_s", "repeat")))
+
+
+def compare(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[Dict[str, Any]]:
+    """Return one row per benchmark present in both runs with the median ratio.
+
+    A row is marked ``regression`` when the current median is more than
+    ``tolerance`` (a fraction) slower than the baseline.
+    """
+    previous = {_key(r): r for r in baseline if "median_s" in r}
+    rows = []
+    for record in current:
+        old = previous.get(_key(record))
+        if old is None or "median_s" not in record:
+            continue
+        ratio = record["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        rows.append({**record, "baseline_median_s": old["median_s"], "ratio": ratio,
+                     "regression": ratio > 1 + tolerance})
+    return rows
+
+
+def run(sizes: List[int], history: int, repeat: int = 5, route_sizes: Optional[List[int]] = None,
+        api_symbols: int = 10, max_pairwise: int = 2000, only: Optional[str] = None,
+        include_api: bool = True, verbose: bool = True, include_startup: bool = True) -> Dict[str, Any]:
+    """Run the suite and return ``{"environment", "config", "results"}``."""
+    suite = Suite(repeat, only, verbose)
+    bench_portfolio_math(suite, sizes, history, max_pairwise)
+    bench_covariance(suite, sizes, history, max_pairwise)
+    if include_api:
+        bench_api(suite, route_sizes if route_sizes is not None else sizes, history, api_symbols)
+    if include_startup:
+        bench_startup(suite)
+    return {
+        "environment": environment(),
+        "config": {"sizes": sizes, "history": history, "repeat": repeat, "route_sizes": route_sizes,
+                   "api_symbols": api_symbols, "max_pairwise": max_pairwise, "only": only},
+        "results": suite.results,
+    }
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=_int_list, default=[10, 100, 1000, 10000], help="portfolio sizes")
+    parser.add_argument("--route-sizes", type=_int_list, default=[10, 100, 1000],
+                        help="portfolio sizes sent through the API routes")
+    parser.add_argument("--history", type=int, default=252, help="days of returns per position")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--api-symbols", type=int, default=10, help="synthetic symbols with models")
+    parser.add_argument("--max-pairwise", type=int, default=2000,
+                        help="largest portfolio for benchmarks that build an n x n matrix")
+    parser.add_argument("--only", help="run benchmarks whose name contains this text")
+    parser.add_argument("--no-api", action="store_true", help="skip the Flask route benchmarks")
+    parser.add_argument("--no-startup", action="store_true", help="skip the interpreter start-up benchmarks")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.history, args.repeat, args.route_sizes, args.api_symbols,
+                 args.max_pairwise, args.only, not args.no_api, include_startup=not args.no_startup)
+    if args.compare:
+        with open(args.compare) as fh:
+            report["comparison"] = compare(report["results"], json.load(fh)["results"], args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    regressions = [r for r in report.get("comparison", []) if r["regression"]]
+    for r in regressions:
+        print(f"[!] {r['name']} {r.get('positions', '')}: {r['ratio']:.2f}x slower", file=sys.stderr)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
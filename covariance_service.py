@@ -0,0 +1,284 @@
+"""Date-aligned covariance and correlation of stored price histories.
+
+:class:`CovarianceService` computes pairwise return statistics for a set of
+symbols over the last ``window`` trading days of a :class:`PriceStore`.
+Returns are taken between each symbol's consecutive prices on the store's
+shared date axis, and every pair uses the days on which both symbols have a
+return, so series of different lengths are joined on dates rather than cut
+to the shortest tail.
+
+Each cached set keeps the pairwise sufficient statistics (counts, sums,
+sums of squares and cross products). When the store changes only the return
+rows that were added, dropped from the window or corrected are applied to
+those sums, so a new trading day costs ``O(n^2)`` instead of a rebuild. The
+sums are built in column blocks so intermediate memory stays
+``O(window * block_size)`` however large the universe is.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from price_store import PriceStore
+
+Shrinkage = Union[None, float, str]
+
+
+def _ffill(closes: np.ndarray) -> np.ndarray:
+    """Forward-fill NaN down the rows of a ``dates x symbols`` array."""
+    valid = ~np.isnan(closes)
+    idx = np.where(valid, np.arange(closes.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(closes, idx, axis=0)
+
+
+def window_returns(closes: np.ndarray) -> np.ndarray:
+    """Return ``(rows - 1) x symbols`` returns from a ``rows x symbols`` price block.
+
+    A symbol's return on a day is measured from its last earlier price; days
+    without a price are NaN.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    previous = _ffill(closes)[:-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return closes[1:] / previous - 1.0
+
+
+def oas_shrinkage(correlation: np.ndarray, n_obs: float) -> float:
+    """Oracle approximating shrinkage intensity of a correlation matrix toward identity."""
+    p = correlation.shape[0]
+    if p < 2 or n_obs < 2:
+        return 1.0
+    tr_c2 = float(np.sum(correlation ** 2))
+    denominator = (n_obs + 1 - 2 / p) * (tr_c2 - p)
+    if denominator <= 0:
+        return 1.0
+    return float(min(1.0, ((1 - 2 / p) * tr_c2 + p * p) / denominator))
+
+
+class _Sums:
+    """Pairwise sufficient statistics of a ``days x symbols`` return block."""
+
+    def __init__(self, n: int, block_size: int) -> None:
+        self.block_size = block_size
+        self.count = np.zeros((n, n))
+        self.sum = np.zeros((n, n))  # sum[i, j]: sum of x_i over days both have a return
+        self.square = np.zeros((n, n))  # square[i, j]: sum of x_i ** 2 over the same days
+        self.cross = np.zeros((n, n))
+
+    def add(self, returns: np.ndarray, sign: float = 1.0) -> None:
+        if not len(returns):
+            return
+        mask = (~np.isnan(returns)).astype(np.float64)
+        x = np.nan_to_num(returns)
+        x2 = x * x
+        n = returns.shape[1]
+        for lo in range(0, n, self.block_size):
+            rows = slice(lo, min(lo + self.block_size, n))
+            self.count[rows] += sign * (mask[:, rows].T @ mask)
+            self.sum[rows] += sign * (x[:, rows].T @ mask)
+            self.square[rows] += sign * (x2[:, rows].T @ mask)
+            self.cross[rows] += sign * (x[:, rows].T @ x)
+
+
+class _Entry:
+    def __init__(self, symbols: Tuple[str, ...], block_size: int) -> None:
+        self.symbols = symbols
+        self.index = {s: i for i, s in enumerate(symbols)}
+        self.sums = _Sums(len(symbols), block_size)
+        self.dates = np.empty(0, dtype="datetime64[D]")
+        self.returns = np.empty((0, len(symbols)))
+        self.signature: Any = None
+        self.applied = 0
+        self.result: Optional[Dict[str, np.ndarray]] = None
+
+    def finalize(self, min_periods: int) -> Dict[str, np.ndarray]:
+        """Return read-only ``count``, ``covariance`` and ``correlation`` of every pair."""
+        if self.result is not None:
+            return self.result
+        sums = self.sums
+        count = sums.count.copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sums.sum / count
+            covariance = (sums.cross - mean * sums.sum.T) / (count - 1)
+            covariance[count < max(min_periods, 2)] = np.nan
+            variance = (sums.square - mean * sums.sum) / (count - 1)
+            variance *= variance.T
+            correlation = covariance / np.sqrt(variance, out=variance)
+        np.clip(correlation, -1.0, 1.0, out=correlation)
+        diagonal = np.diag(covariance)
+        np.fill_diagonal(correlation, np.where(np.isfinite(diagonal) & (diagonal > 0), 1.0, np.nan))
+        self.result = {"count": count, "covariance": covariance, "correlation": correlation}
+        for matrix in self.result.values():
+            matrix.setflags(write=False)
+        return self.result
+
+
+class CovarianceService:
+    """Cached, date-aligned return statistics of symbols in a price store.
+
+    Parameters
+    ----------
+    store : PriceStore
+        Source of the closing prices.
+    window : int, optional
+        Number of most recent trading days of returns to use.
+    min_periods : int, optional
+        Pairs with fewer common returns get a NaN correlation.
+    block_size : int, optional
+        Columns per block when building the sums.
+    max_entries : int, optional
+        Number of symbol sets kept; the least recently used is dropped.
+    """
+
+    def __init__(
+        self,
+        store: PriceStore,
+        window: int = 252,
+        min_periods: int = 20,
+        block_size: int = 256,
+        max_entries: int = 32,
+    ) -> None:
+        self.store = store
+        self.window = window
+        self.min_periods = min_periods
+        self.block_size = block_size
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, ...], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+
+    def _window(self, symbols: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(dates, returns)`` of the current window for ``symbols``."""
+        stored = {s: i for i, s in enumerate(self.store.symbols)}
+        dates, closes = self.store.panel()
+        columns = [stored.get(s, -1) for s in symbols]
+        block = np.full((min(len(dates), self.window + 1), len(symbols)), np.nan)
+        present = [i for i, c in enumerate(columns) if c >= 0]
+        if len(block) and present:
+            block[:, present] = closes[-len(block):, [columns[i] for i in present]]
+        return dates[-len(block):][1:], window_returns(block) if len(block) else block
+
+    def _update(self, entry: _Entry) -> None:
+        """Bring ``entry`` up to date with the store by applying changed rows only."""
+        signature = self.store.signature
+        if signature == entry.signature:
+            return
+        dates, returns = self._window(entry.symbols)
+        _, old_rows, new_rows = np.intersect1d(entry.dates, dates, assume_unique=True, return_indices=True)
+        dropped = np.setdiff1d(np.arange(len(entry.dates)), old_rows)
+        added = np.setdiff1d(np.arange(len(dates)), new_rows)
+        before, after = entry.returns[old_rows], returns[new_rows]
+        differs = ~((before == after) | (np.isnan(before) & np.isnan(after))).all(axis=1)
+        old_rows, new_rows = old_rows[differs], new_rows[differs]
+        n_rows = len(dropped) + len(added) + 2 * len(old_rows)
+        # Rebuild when that is cheaper, and now and then to shed rounding drift.
+        if n_rows >= len(dates) or entry.applied + n_rows > 4 * self.window:
+            entry.sums = _Sums(len(entry.symbols), self.block_size)
+            entry.sums.add(returns)
+            entry.applied = 0
+        else:
+            entry.sums.add(entry.returns[np.concatenate([dropped, old_rows])], -1.0)
+            entry.sums.add(returns[np.concatenate([added, new_rows])])
+            entry.applied += n_rows
+            self.updates += 1
+        entry.dates, entry.returns, entry.signature = dates, returns, signature
+        entry.result = None
+
+    def _entry(self, symbols: Tuple[str, ...]) -> Tuple[_Entry, List[int]]:
+        """Return a fresh entry covering ``symbols`` and their positions in it."""
+        key = tuple(sorted(set(symbols), key=str))
+        entry = self._entries.get(key)
+        if entry is None:
+            # A cached superset (for example the whole universe) also works.
+            entry = next((e for e in self._entries.values() if all(s in e.index for s in key)), None)
+        if entry is None:
+            self.misses += 1
+            entry = _Entry(key, self.block_size)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(entry.symbols)
+        self._update(entry)
+        return entry, [entry.index[s] for s in symbols]
+
+    def statistics(self, symbols: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return pairwise ``count``, ``covariance`` and ``correlation`` for ``symbols``.
+
+        Matrices follow the order of ``symbols``. Pairs with fewer than
+        ``min_periods`` common returns are NaN; the diagonal of
+        ``correlation`` is 1 for symbols with data. The matrices are computed
+        once per store change and may be shared, so treat them as read-only.
+        """
+        symbols = tuple(symbols)
+        with self._lock:
+            entry, idx = self._entry(symbols)
+            result = entry.finalize(self.min_periods)
+        if idx == list(range(len(entry.symbols))):
+            return result
+        grid = np.ix_(idx, idx)
+        return {name: matrix[grid] for name, matrix in result.items()}
+
+    def volatility(self, symbols: Sequence[str]) -> np.ndarray:
+        """Return the daily return volatility of each symbol (NaN without data)."""
+        return np.sqrt(np.diag(self.statistics(symbols)["covariance"]))
+
+    def correlation(self, symbols: Sequence[str], shrinkage: Shrinkage = None) -> np.ndarray:
+        """Return the correlation matrix of ``symbols``.
+
+        Unknown pairs are treated as uncorrelated. ``shrinkage`` pulls the
+        matrix toward the identity: a float in ``[0, 1]`` is used as is and
+        ``"oas"`` estimates the intensity from the data, which keeps large
+        matrices well conditioned.
+        """
+        stats = self.statistics(symbols)
+        correlation = np.nan_to_num(stats["correlation"])
+        np.fill_diagonal(correlation, 1.0)
+        if shrinkage is None:
+            return correlation
+        if shrinkage == "oas":
+            off = ~np.eye(len(correlation), dtype=bool)
+            n_obs = float(np.median(stats["count"][off])) if off.any() else 0.0
+            intensity = oas_shrinkage(correlation, n_obs)
+        else:
+            intensity = float(shrinkage)
+            if not 0.0 <= intensity <= 1.0:
+                raise ValueError("shrinkage must be between 0 and 1")
+        return (1 - intensity) * correlation + intensity * np.eye(len(correlation))
+
+    def covariance(
+        self,
+        symbols: Sequence[str],
+        shrinkage: Shrinkage = None,
+        volatilities: Optional[Sequence[float]] = None,
+    ) -> np.ndarray:
+        """Return ``D·C·D`` from :meth:`correlation` and per-symbol volatilities.
+
+        ``volatilities`` overrides the measured ones where it is not NaN.
+        Symbols without any volatility get zero variance.
+        """
+        vol = self.volatility(symbols)
+        if volatilities is not None:
+            given = np.asarray(volatilities, dtype=np.float64)
+            vol = np.where(np.isnan(given), vol, given)
+        vol = np.nan_to_num(vol)
+        return self.correlation(symbols, shrinkage) * np.outer(vol, vol)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "incremental_updates": self.updates,
+            }
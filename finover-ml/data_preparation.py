@@ -1,15 +1,22 @@
 import os
-import requests
+import sys
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
-import pandas_ta as ta
 from dotenv import load_dotenv
 load_dotenv()
 
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import (
     TimeSeriesSplit,
     GridSearchCV,
+    ParameterGrid,
     train_test_split,
     cross_val_score,
 )
@@ -18,10 +25,33 @@ try:
     from xgboost import XGBRegressor
 except Exception:
     XGBRegressor = None  # type: ignore
-import joblib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import indicators
+import market_beta
+from model_registry import POOLED_SYMBOL, ModelRegistry
+from price_store import PriceStore
+from ingestion import MarketDataClient, ingest
+from model_search import budgeted_search
 
 API_KEY = os.getenv("FMP_API_KEY")
 
+STATE_PATH = "data/models/training_state.json"
+REPORT_PATH = "data/models/training_report.json"
+POOLED_REPORT_PATH = "data/models/pooled_report.json"
+# Features of the cross-symbol model: the columns risk_api receives that mean
+# the same thing for every symbol. sma_20 is left out because it is a price
+# level, so it would mostly tell symbols apart by how expensive they are.
+# Beta carries the symbol context. risk_api reads the list from the registry.
+POOLED_FEATURES = ['rsi', 'volatility', 'beta']
+PARAM_GRID = {"n_estimators": [50, 100], "max_depth": [3, None]}
+# "halving" tunes with budgeted_search on shared time-series folds; "grid"
+# is the original GridSearchCV plus a separate cross-validation pass.
+SEARCH_MODE = os.getenv("TRAIN_SEARCH", "halving")
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+PRICE_STORE = PriceStore(os.getenv("PRICE_STORE_DIR", "data/store"))
+_client = None
+
 
 def time_series_cv_score(model, X, y, n_splits: int = 5):
     """Evaluate a model using time series cross validation."""
@@ -37,57 +67,72 @@ def optimize_hyperparameters(model, param_grid, X, y):
     search.fit(X, y)
     return search.best_estimator_
 
+def get_client():
+    """Return the process-wide pooled market-data client."""
+    global _client
+    if _client is None:
+        _client = MarketDataClient(API_KEY, pool_size=FETCH_CONCURRENCY)
+    return _client
+
+
+def fetch_prices(symbols):
+    """Download only the missing days of ``symbols`` into the local price store."""
+    return ingest(symbols, PRICE_STORE, get_client(), concurrency=FETCH_CONCURRENCY)
+
 # S&P 500 verisi çek
-def get_market_data():
-    url = f"https://financialmodelingprep.com/api/v3/historical-price-full/SPY?apikey={API_KEY}&serietype=line"
-    response = requests.get(url)
-    if response.status_code != 200:
+def get_market_data(fetch=True):
+    if fetch:
+        fetch_prices(["SPY"])
+    if "SPY" not in PRICE_STORE:
         print("[HATA] SPY verisi çekilemedi.")
         return None
-    data = response.json()
-    prices = data.get('historical')
-    df = pd.DataFrame(prices)
-    df = df[['date', 'close']].rename(columns={'close': 'spy_close'})
-    return df
+    return PRICE_STORE.frame("SPY").rename(columns={'close': 'spy_close'})
 
 # Hisse verisi çek
-def get_historical_data(symbol):
-    url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}?apikey={API_KEY}&serietype=line"
-    response = requests.get(url)
-    if response.status_code != 200:
-        print(f"[HATA] Veri çekilemedi: {symbol}")
-        return None
-    data = response.json()
-    prices = data.get('historical')
-    if not prices:
+def get_historical_data(symbol, fetch=True):
+    if fetch:
+        fetch_prices([symbol])
+    df = PRICE_STORE.frame(symbol) if symbol in PRICE_STORE else None
+    if df is None or df.empty:
         print(f"[Uyarı] Veri bulunamadı: {symbol}")
         return None
-    df = pd.DataFrame(prices)
-    df = df[['date', 'close']].sort_values('date')
+    # CSV kopyası, henüz fiyat deposunu okumayan araçlar için
     df.to_csv(f"data/csv/{symbol}_history.csv", index=False)
     print(f"[✓] {symbol} verisi kaydedildi → data/csv/{symbol}_history.csv")
     return df
 
 # Beta hesapla
 def calculate_beta(stock_df, market_df):
-    merged = pd.merge(stock_df, market_df, on='date', how='inner')
-    merged['stock_return'] = merged['close'].pct_change()
-    merged['market_return'] = merged['spy_close'].pct_change()
-    merged.dropna(inplace=True)
+    merged = pd.merge(stock_df[['date', 'close']], market_df[['date', 'spy_close']], on='date', how='outer')
+    merged = merged.sort_values('date')
+    stock_returns, market_returns = market_beta.aligned_returns(
+        merged['close'].to_numpy(), merged['spy_close'].to_numpy()
+    )
 
-    if len(merged) < 20:
-        print(f"[Uyarı] Yetersiz veri ile beta hesaplanamaz. {len(merged)} gün")
+    n_obs = int(np.sum(~np.isnan(stock_returns)))
+    if n_obs < 20:
+        print(f"[Uyarı] Yetersiz veri ile beta hesaplanamaz. {n_obs} gün")
         return None
 
-    covariance = np.cov(merged['stock_return'], merged['market_return'])[0][1]
-    variance = np.var(merged['market_return'], ddof=1)
-
-    if variance == 0 or np.isnan(variance):
+    beta = market_beta.batch_beta(stock_returns, market_returns, min_periods=20)[0]
+    if np.isnan(beta):
         print(f"[Uyarı] Market varyansı sıfır veya geçersiz.")
         return None
+    return float(beta)
 
-    beta = covariance / variance
-    return beta
+
+def calculate_universe_betas(symbols, market_symbol="SPY"):
+    """Return ``{symbol: beta}`` for every stored symbol in one vectorized pass."""
+    stored = PRICE_STORE.symbols
+    if market_symbol not in stored:
+        return {}
+    _, closes = PRICE_STORE.panel()
+    columns = [stored.index(s) for s in symbols if s in stored]
+    stock_returns, market_returns = market_beta.aligned_returns(
+        closes[:, columns].T, closes[:, stored.index(market_symbol)]
+    )
+    betas = market_beta.batch_beta(stock_returns, market_returns, min_periods=20)
+    return {stored[c]: float(b) for c, b in zip(columns, betas) if not np.isnan(b)}
 
 # Teknik göstergeler ekle
 def add_indicators(df, beta_value):
@@ -97,15 +142,16 @@ def add_indicators(df, beta_value):
     if 'low' not in df.columns:
         df['low'] = df['close']
 
-    df['rsi'] = ta.rsi(df['close'])
-    df['sma_20'] = ta.sma(df['close'], length=20)
-    df['ema_20'] = ta.ema(df['close'], length=20)
-    macd = ta.macd(df['close'])
-    df['macd'] = macd['MACD_12_26_9'] if 'MACD_12_26_9' in macd else None
-    df['atr'] = ta.atr(df['high'], df['low'], df['close'])
-    stoch = ta.stoch(df['high'], df['low'], df['close'])
-    df['stoch_k'] = stoch['STOCHk_14_3_3'] if 'STOCHk_14_3_3' in stoch else None
-    df['volatility'] = df['close'].rolling(20).std()
+    close = df['close'].to_numpy()
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    df['rsi'] = indicators.rsi(close)
+    df['sma_20'] = indicators.sma(close, 20)
+    df['ema_20'] = indicators.ema(close, 20)
+    df['macd'] = indicators.macd(close)[0]
+    df['atr'] = indicators.atr(high, low, close)
+    df['stoch_k'] = indicators.stoch(high, low, close)[0]
+    df['volatility'] = indicators.rolling_volatility(close, 20)
     df['beta'] = beta_value
     # Placeholder fundamental ratios
     df['pe_ratio'] = 10.0
@@ -113,18 +159,34 @@ def add_indicators(df, beta_value):
     df['de_ratio'] = 1.0
     return df
 
-# Model eğitimi (yüzdesel skor tahmini için regresyon modeli)
-def train_model(df, symbol):
-    df = df.dropna(subset=['rsi', 'sma_20', 'volatility', 'beta'])
-
-    # Risk skoru hesapla (örnek formül, geliştirilebilir)
-    df['risk_score'] = (
+# Risk skoru hesapla (örnek formül, geliştirilebilir)
+def risk_target(df):
+    return (
         0.4 * (df['volatility'] / df['volatility'].max()) +
         0.3 * (df['beta'] / df['beta'].max()) +
         0.2 * (1 - df['rsi'] / 100) +
         0.1 * np.random.rand(len(df))
     ).clip(0, 1)
 
+
+def _base_model(n_jobs=None):
+    if XGBRegressor is not None:
+        return XGBRegressor(objective='reg:squarederror', n_jobs=n_jobs)
+    return RandomForestRegressor(n_jobs=n_jobs)
+
+
+# Model eğitimi (yüzdesel skor tahmini için regresyon modeli)
+def train_model(df, symbol, n_jobs=None, search=None, max_fits=None, time_budget=None):
+    """Tune, score and publish ``symbol``'s risk model.
+
+    ``search`` is ``"halving"`` (default ``SEARCH_MODE``) or ``"grid"``;
+    ``max_fits`` and ``time_budget`` cap the halving search. The result
+    reports the cross-validated MAE, the number of fits and the search time.
+    """
+    search = search or SEARCH_MODE
+    df = df.dropna(subset=['rsi', 'sma_20', 'volatility', 'beta'])
+    df['risk_score'] = risk_target(df)
+
     feature_cols = [
         'rsi', 'sma_20', 'ema_20', 'macd', 'atr', 'stoch_k',
         'volatility', 'beta', 'pe_ratio', 'pb_ratio', 'de_ratio'
@@ -132,22 +194,133 @@ def train_model(df, symbol):
     features = df[feature_cols]
     targets = df['risk_score']
 
-    X_train, X_test, y_train, y_test = train_test_split(features, targets, test_size=0.2)
-    if XGBRegressor is not None:
-        base_model = XGBRegressor(objective='reg:squarederror')
+    start = time.perf_counter()
+    if search == "grid":
+        X_train, X_test, y_train, y_test = train_test_split(features, targets, test_size=0.2)
+        model = optimize_hyperparameters(_base_model(n_jobs), PARAM_GRID, X_train, y_train)
+        scores = time_series_cv_score(model, features, targets, n_splits=3)
+        mae = float(-scores.mean())
+        # grid: 3 katlı arama + yeniden eğitim, ardından 3 katlı doğrulama
+        fits = len(ParameterGrid(PARAM_GRID)) * 3 + 1 + 3
+    elif search == "halving":
+        result = budgeted_search(_base_model(n_jobs), PARAM_GRID, features, targets, n_splits=3,
+                                 max_fits=max_fits, time_budget=time_budget)
+        model, mae, fits = result["model"], result["mae"], result["fits"]
     else:
-        base_model = RandomForestRegressor()
+        raise ValueError(f"unknown search mode: {search}")
+    search_seconds = round(time.perf_counter() - start, 3)
+    print(f"[TS CV] MAE: {mae:.4f} ({search}, {fits} fit, {search_seconds:.1f}s)")
+
+    # Yayınlanan sürüm, çalışan API tarafından yeniden başlatmadan devralınır.
+    metrics = {"mae": mae, "search": search, "fits": fits, "search_seconds": search_seconds}
+    entry = ModelRegistry("data/models").publish(symbol, model, feature_cols, metrics)
+    print(f"[✓] Model kaydedildi: {entry['path']}")
+    return {"model_path": entry["path"], "version": entry["version"], **metrics}
+
+
+def stack_universe(frames, features=POOLED_FEATURES):
+    """Stack per-symbol indicator frames into one date-ordered training frame.
+
+    Each symbol's target is computed on its own rows, exactly as
+    :func:`train_model` does, and a ``symbol`` column is added.
+    """
+    parts = []
+    for symbol, df in frames.items():
+        df = df.dropna(subset=features).copy()
+        if df.empty:
+            continue
+        df['risk_score'] = risk_target(df)
+        df['symbol'] = symbol
+        parts.append(df)
+    if not parts:
+        raise ValueError("no symbol has complete feature rows")
+    stacked = pd.concat(parts, ignore_index=True)
+    return stacked.sort_values(['date', 'symbol'], kind='stable').reset_index(drop=True)
+
+
+def holdout_split(stacked, test_size=0.2):
+    """Hold out the last ``test_size`` share of every symbol's rows, by date."""
+    position = stacked.groupby('symbol').cumcount()
+    counts = stacked.groupby('symbol')['symbol'].transform('size')
+    test = position >= np.ceil(counts * (1 - test_size))
+    return stacked[~test], stacked[test]
+
+
+def train_pooled_model(frames, features=POOLED_FEATURES, n_jobs=None, test_size=0.2, compare=True,
+                       registry=None):
+    """Fit one risk model on the stacked rows of every symbol and publish it.
+
+    The model is evaluated on the last ``test_size`` of each symbol's
+    history. Both the pooled model and, with ``compare``, a per-ticker model
+    fitted on the same training rows of each symbol are tuned with
+    :func:`optimize_hyperparameters` (the grid search, not the halving
+    search of :func:`train_model`) and scored on the same held-out rows. The served
+    model is then refitted on all rows and published to the registry as
+    ``POOLED_SYMBOL``.
+
+    Returns a report with the overall and per-symbol MAE of both.
+    """
+    start = time.perf_counter()
+    stacked = stack_universe(frames, features)
+    train, test = holdout_split(stacked, test_size)
+    model = optimize_hyperparameters(_base_model(n_jobs), PARAM_GRID, train[features], train['risk_score'])
+    errors = (test['risk_score'] - model.predict(test[features])).abs()
 
-    param_grid = {"n_estimators": [50, 100], "max_depth": [3, None]}
-    model = optimize_hyperparameters(base_model, param_grid, X_train, y_train)
+    per_symbol = {}
+    for symbol, index in test.groupby('symbol').groups.items():
+        row = {"rows": int(len(index)), "pooled_mae": float(errors.loc[index].mean())}
+        if compare:
+            own = train[train['symbol'] == symbol]
+            try:
+                own_model = optimize_hyperparameters(_base_model(n_jobs), PARAM_GRID, own[features], own['risk_score'])
+                predicted = own_model.predict(test.loc[index, features])
+                row["per_symbol_mae"] = float((test.loc[index, 'risk_score'] - predicted).abs().mean())
+            except ValueError as e:  # too few rows for the CV folds
+                print(f"[Uyarı] Sembol modeli eğitilemedi {symbol}: {e}")
+        per_symbol[symbol] = row
 
-    scores = time_series_cv_score(model, features, targets, n_splits=3)
-    print(f"[TS CV] MAE: {-scores.mean():.4f}")
+    mae = float(errors.mean())
+    metrics = {"mae": mae, "rows": int(len(stacked))}
+    baseline = [r["per_symbol_mae"] * r["rows"] for r in per_symbol.values() if "per_symbol_mae" in r]
+    if baseline and len(baseline) == len(per_symbol):
+        metrics["per_symbol_mae"] = float(sum(baseline) / len(test))
+    print(f"[Havuz] MAE: {mae:.4f} (sembol modelleri: {metrics.get('per_symbol_mae', float('nan')):.4f})")
+
+    model = clone(model).fit(stacked[features], stacked['risk_score'])
+    registry = registry or ModelRegistry("data/models")
+    entry = registry.publish(POOLED_SYMBOL, model, features, metrics, universe=list(frames))
+    print(f"[✓] Havuz modeli kaydedildi: {entry['path']}")
+    return {
+        "model_path": entry["path"],
+        "version": entry["version"],
+        **metrics,
+        "seconds": round(time.perf_counter() - start, 3),
+        "symbols": per_symbol,
+    }
+
+
+def run_pooled(symbols, market_df, n_jobs=None, fetch=True):
+    """Train the cross-symbol model on ``symbols`` and write its report."""
+    if fetch:
+        fetch_prices(symbols)
+    betas = calculate_universe_betas(symbols)
+    frames = {}
+    for symbol in symbols:
+        df = get_historical_data(symbol, fetch=False)
+        if df is None:
+            continue
+        beta = betas.get(symbol)
+        if beta is None:
+            beta = calculate_beta(df, market_df)
+        if beta is None:
+            print(f"[Uyarı] Beta hesaplanamadı: {symbol}")
+            continue
+        frames[symbol] = add_indicators(df, beta)
+    report = train_pooled_model(frames, n_jobs=n_jobs)
+    _write_json(POOLED_REPORT_PATH, report)
+    print(f"[i] Rapor yazıldı: {POOLED_REPORT_PATH}")
+    return report
 
-    version = pd.Timestamp.utcnow().strftime('%Y%m%d%H%M%S')
-    model_path = f"data/models/{symbol}_risk_model_{version}.pkl"
-    joblib.dump(model, model_path)
-    print(f"[✓] Model kaydedildi: {model_path}")
 
 # Her sembol için süreci işlet
 def run_pipeline(symbol, market_df):
@@ -156,12 +329,160 @@ def run_pipeline(symbol, market_df):
         beta = calculate_beta(df, market_df)
         if beta is None:
             print(f"[Uyarı] Beta hesaplanamadı: {symbol}")
-            return
+            return None
         df = add_indicators(df, beta)
-        train_model(df, symbol)
+        return train_model(df, symbol)
+    return None
+
+
+def input_fingerprint(df, market_df):
+    """Hash the price data a symbol's model is trained on."""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df[['date', 'close']], index=False).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(market_df[['date', 'spy_close']], index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh, indent=2)
+    os.replace(tmp, path)
+
+
+_thread_limits = None
+
+
+def _limit_threads(n_threads):
+    """Cap BLAS/OpenMP threads in a pool worker so workers don't oversubscribe cores."""
+    global _thread_limits
+    try:
+        from threadpoolctl import threadpool_limits
+        _thread_limits = threadpool_limits(n_threads)
+    except Exception:
+        pass
+
+
+def train_symbol(symbol, market_df, previous=None, n_jobs=1, force=False, beta=None, search=None):
+    """Train one symbol unless its inputs match ``previous`` and return a report row.
+
+    ``beta`` may be precomputed for the whole universe; otherwise it is
+    computed from ``market_df``. ``search`` holds keyword arguments for
+    :func:`train_model` (``search``, ``max_fits``, ``time_budget``).
+    """
+    start = time.perf_counter()
+    report = {"symbol": symbol, "status": "failed"}
+    try:
+        df = get_historical_data(symbol, fetch=False)
+        if df is None:
+            report["status"] = "no_data"
+        else:
+            fingerprint = input_fingerprint(df, market_df)
+            report["fingerprint"] = fingerprint
+            if (
+                not force
+                and previous
+                and previous.get("fingerprint") == fingerprint
+                and os.path.exists(previous.get("model_path", ""))
+            ):
+                report.update(status="skipped", model_path=previous["model_path"], mae=previous.get("mae"))
+            else:
+                if beta is None:
+                    beta = calculate_beta(df, market_df)
+                if beta is None:
+                    report["status"] = "no_beta"
+                else:
+                    result = train_model(add_indicators(df, beta), symbol, n_jobs=n_jobs, **(search or {}))
+                    report.update(status="trained", **result)
+    except Exception as e:
+        report["error"] = str(e)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def run_universe(symbols, market_df, workers=None, force=False, fetch=True, search=None):
+    """Train ``symbols`` across a process pool and write a timing/status report.
+
+    New prices for all symbols are fetched once up front unless ``fetch`` is
+    false, so the pool workers only read the local price store. Symbols whose
+    input data is unchanged since their last successful model are skipped
+    unless ``force`` is set. Each worker gets an equal share of the cores for
+    its own estimator threads. ``search`` is passed to :func:`train_symbol`.
+    The report includes the mean MAE and search time of the trained symbols.
+    """
+    if fetch:
+        fetch_prices(symbols)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(symbols) or 1))
+    inner_jobs = max(1, cpus // workers)
+    state = _read_json(STATE_PATH, {})
+    betas = calculate_universe_betas(symbols)
+    reports = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_threads, initargs=(inner_jobs,)) as pool:
+        futures = {
+            pool.submit(
+                train_symbol, symbol, market_df, state.get(symbol), inner_jobs, force, betas.get(symbol), search
+            ): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                report = {"symbol": symbol, "status": "failed", "error": str(e)}
+            reports[symbol] = report
+            print(f"[{report['status']}] {symbol} {report.get('seconds', 0):.1f}s")
+            if report["status"] == "trained":
+                state[symbol] = {
+                    "fingerprint": report["fingerprint"],
+                    "model_path": report["model_path"],
+                    "mae": report["mae"],
+                    "trained_at": datetime.now(timezone.utc).isoformat(),
+                }
+                _write_json(STATE_PATH, state)
+
+    rows = [reports[symbol] for symbol in symbols]
+    trained = [r for r in rows if r["status"] == "trained"]
+    summary = {
+        "workers": workers,
+        "threads_per_worker": inner_jobs,
+        "seconds": round(time.perf_counter() - start, 3),
+        "counts": {status: sum(r["status"] == status for r in rows) for status in {r["status"] for r in rows}},
+        "mean_mae": float(np.mean([r["mae"] for r in trained])) if trained else None,
+        "mean_search_seconds": float(np.mean([r["search_seconds"] for r in trained])) if trained else None,
+        "symbols": rows,
+    }
+    _write_json(REPORT_PATH, summary)
+    print(f"[i] Rapor yazıldı: {REPORT_PATH} ({summary['seconds']:.1f}s)")
+    return summary
+
 
 # Ana süreç
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train per-symbol or pooled risk models.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TRAIN_WORKERS", "0")) or None,
+                        help="number of training processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="retrain symbols whose data did not change")
+    parser.add_argument("--pooled", action="store_true",
+                        help="train one cross-symbol model instead of one model per symbol")
+    parser.add_argument("--search", choices=["halving", "grid"], default=SEARCH_MODE,
+                        help="hyperparameter search (default: %(default)s)")
+    parser.add_argument("--max-fits", type=int, help="fit budget of the halving search per symbol")
+    parser.add_argument("--time-budget", type=float, help="seconds budget of the halving search per symbol")
+    args = parser.parse_args()
+    search = {"search": args.search, "max_fits": args.max_fits, "time_budget": args.time_budget}
+
     os.makedirs("data/csv", exist_ok=True)
     os.makedirs("data/models", exist_ok=True)
 
@@ -173,17 +494,19 @@ if __name__ == "__main__":
     market_df = get_market_data()
     if market_df is None:
         print("[HATA] SPY verisi olmadan işlem yapılamaz.")
+    elif args.pooled:
+        run_pooled(symbols, market_df)
     else:
-        for symbol in symbols:
-            print(f"\n🚀 İşleniyor: {symbol}")
-            run_pipeline(symbol, market_df)
+        run_universe(symbols, market_df, workers=args.workers, force=args.force, search=search)
 
     # Basit zamanlanmış eğitim (örnek)
     try:
         import schedule
         def job():
-            for symbol in symbols:
-                run_pipeline(symbol, market_df)
+            if args.pooled:
+                run_pooled(symbols, market_df)
+            else:
+                run_universe(symbols, market_df, workers=args.workers, search=search)
         schedule.every().week.do(job)
         print("[i] Scheduled weekly retraining aktif")
         while True:
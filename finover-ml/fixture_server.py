@@ -0,0 +1,96 @@
+"""Offline stand-in for the FMP ``historical-price-full`` endpoint.
+
+Serves ``{symbol}_history.csv`` files from a directory in FMP's JSON format,
+honouring the ``from`` and ``to`` query parameters. Use it to test ingestion
+throughput and correctness without network access::
+
+    python finover-ml/fixture_server.py --csv-dir data/csv --port 8765
+    FMP_BASE_URL=http://127.0.0.1:8765/api/v3 python finover-ml/data_preparation.py
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+PREFIX = "/api/v3/historical-price-full/"
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """HTTP server holding the fixture directory, latency and a request log."""
+
+    daemon_threads = True
+
+    def __init__(self, address, csv_dir: str, latency: float = 0.0) -> None:
+        super().__init__(address, _Handler)
+        self.csv_dir = csv_dir
+        self.latency = latency
+        self.requests: List[Tuple[str, dict]] = []
+        self._log_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v3"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802 - http.server API
+        url = urlparse(self.path)
+        if not url.path.startswith(PREFIX):
+            return self._send(404, {"error": "not found"})
+        symbol = url.path[len(PREFIX):]
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with self.server._log_lock:
+            self.server.requests.append((symbol, params))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        path = os.path.join(self.server.csv_dir, f"{symbol}_history.csv")
+        if not os.path.exists(path):
+            return self._send(200, {})
+        df = pd.read_csv(path).dropna(subset=["date", "close"])
+        if "from" in params:
+            df = df[df["date"] >= params["from"]]
+        if "to" in params:
+            df = df[df["date"] <= params["to"]]
+        df = df.sort_values("date", ascending=False)
+        self._send(200, {"symbol": symbol, "historical": df[["date", "close"]].to_dict("records")})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # keep test output quiet
+        pass
+
+
+def serve(csv_dir: str, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> FixtureServer:
+    """Start a fixture server in a daemon thread and return it."""
+    server = FixtureServer((host, port), csv_dir, latency)
+    threading.Thread(target=server.serve_forever, name="fmp-fixture", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv-dir", default="data/csv")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+    server = FixtureServer((args.host, args.port), args.csv_dir, args.latency)
+    print(f"[i] Fixture FMP API: {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,121 @@
+"""Incremental market-data ingestion into the local price store.
+
+Symbols are fetched concurrently over one pooled HTTP session, and only the
+days after each symbol's last stored date are requested. All fetched rows
+are merged into the :class:`price_store.PriceStore` in a single write.
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from price_store import PriceStore
+
+FMP_BASE_URL = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com/api/v3")
+
+
+class MarketDataClient:
+    """FMP client that reuses connections across requests and threads.
+
+    Parameters
+    ----------
+    api_key : str
+        FMP API key.
+    base_url : str, optional
+        API root; point it at ``fixture_server`` for offline runs.
+    pool_size : int, optional
+        Maximum number of pooled connections, normally the fetch concurrency.
+    timeout : float, optional
+        Per-request timeout in seconds.
+    retries : int, optional
+        Retries with backoff on connection errors and 429/5xx responses.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str = FMP_BASE_URL,
+        pool_size: int = 8,
+        timeout: float = 30.0,
+        retries: int = 2,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch_closes(self, symbol: str, since=None) -> Optional[pd.Series]:
+        """Return closes after ``since`` indexed by date, or ``None`` on failure."""
+        params = {"apikey": self.api_key, "serietype": "line"}
+        if since is not None:
+            params["from"] = str(np.datetime64(since, "D") + 1)
+        response = self.session.get(
+            f"{self.base_url}/historical-price-full/{symbol}", params=params, timeout=self.timeout
+        )
+        if response.status_code != 200:
+            print(f"[HATA] Veri çekilemedi: {symbol} ({response.status_code})")
+            return None
+        prices = response.json().get("historical") or []
+        if not prices:
+            return pd.Series(dtype=np.float64)
+        df = pd.DataFrame(prices)[["date", "close"]].drop_duplicates("date", keep="first")
+        closes = df.set_index("date")["close"].astype(np.float64).sort_index()
+        if since is not None:
+            closes = closes[pd.to_datetime(closes.index) > pd.Timestamp(since)]
+        return closes
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def ingest(
+    symbols: Iterable[str],
+    store: PriceStore,
+    client: MarketDataClient,
+    concurrency: int = 8,
+) -> Dict[str, Dict]:
+    """Fetch new days for ``symbols`` concurrently and merge them into ``store``.
+
+    Returns a per-symbol report with ``status`` (``updated``, ``unchanged`` or
+    ``failed``) and the number of new ``rows``.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    since = {symbol: store.last_date(symbol) for symbol in symbols}
+
+    def fetch(symbol):
+        try:
+            return client.fetch_closes(symbol, since[symbol])
+        except requests.RequestException as e:
+            print(f"[HATA] Veri çekilemedi: {symbol} ({e})")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = dict(zip(symbols, pool.map(fetch, symbols)))
+
+    report = {}
+    updates = {}
+    for symbol, closes in results.items():
+        if closes is None:
+            report[symbol] = {"status": "failed", "rows": 0}
+        elif closes.empty:
+            report[symbol] = {"status": "unchanged", "rows": 0}
+        else:
+            updates[symbol] = closes
+            report[symbol] = {"status": "updated", "rows": int(len(closes))}
+    store.write(updates)
+    return report
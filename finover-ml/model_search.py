@@ -0,0 +1,201 @@
+"""Budgeted hyperparameter search over fixed time-series folds.
+
+:func:`budgeted_search` tunes a regressor with successive halving: every
+candidate is first scored on the most recent slice of each fold's training
+window, and only the best ``1 / factor`` move on to a slice ``factor`` times
+larger. The last rung trains on the full windows, so the winner's fold
+scores are the reported cross-validation scores and no model is refitted
+just to be scored.
+
+Tree ensembles are fitted once per fold for the largest ``n_estimators`` of
+candidates that share their other parameters; smaller sizes are scored from
+the first trees of that fit. XGBoost fits stop adding trees once the error
+on the last rows of the fold's training window stops improving; the fold's
+test rows are only used to score it.
+
+The search stops starting new fits once ``max_fits`` or ``time_budget`` is
+spent and picks the best candidate scored so far.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+
+
+def _is_xgboost(model) -> bool:
+    return type(model).__module__.split(".")[0] == "xgboost"
+
+
+def _is_staged(model, candidates) -> bool:
+    """Whether candidates differing only in ``n_estimators`` can share one fit."""
+    if not all("n_estimators" in params for params in candidates):
+        return False
+    return _is_xgboost(model) or isinstance(model, (RandomForestRegressor, ExtraTreesRegressor))
+
+
+def _groups(candidates, staged):
+    if not staged:
+        return [[params] for params in candidates]
+    groups: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for params in candidates:
+        key = tuple(sorted((k, repr(v)) for k, v in params.items() if k != "n_estimators"))
+        groups.setdefault(key, []).append(params)
+    return list(groups.values())
+
+
+def _fit_fold(model, X, y, train_idx, early_stopping_rounds, validation_fraction=0.2):
+    """Fit on ``train_idx`` and return ``(model, best_iteration)``.
+
+    XGBoost early stopping watches the last ``validation_fraction`` of the
+    training rows, so the fold's test rows never pick the number of trees.
+    """
+    n_val = int(len(train_idx) * validation_fraction)
+    if early_stopping_rounds and _is_xgboost(model) and 0 < n_val < len(train_idx):
+        fit_idx, val_idx = train_idx[:-n_val], train_idx[-n_val:]
+        model.set_params(early_stopping_rounds=early_stopping_rounds)
+        model.fit(X.iloc[fit_idx], y.iloc[fit_idx], eval_set=[(X.iloc[val_idx], y.iloc[val_idx])], verbose=False)
+        return model, int(model.best_iteration)
+    model.fit(X.iloc[train_idx], y.iloc[train_idx])
+    return model, None
+
+
+def _staged_mae(model, X_test, y_test, sizes, best_iteration) -> Dict[int, Tuple[float, int]]:
+    """Return ``{n: (mae, trees_used)}`` for the first ``n`` trees of one fitted ensemble."""
+    if _is_xgboost(model):
+        limit = best_iteration + 1 if best_iteration is not None else max(sizes)
+        return {
+            n: (mean_absolute_error(y_test, model.predict(X_test, iteration_range=(0, min(n, limit)))), min(n, limit))
+            for n in sizes
+        }
+    X_test = np.asarray(X_test, dtype=np.float32)
+    cumulative = np.cumsum([tree.predict(X_test) for tree in model.estimators_], axis=0)
+    return {n: (mean_absolute_error(y_test, cumulative[n - 1] / n), n) for n in sizes}
+
+
+def budgeted_search(
+    model,
+    param_grid,
+    X,
+    y,
+    n_splits: int = 3,
+    factor: int = 3,
+    min_rows: int = 50,
+    max_fits: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    early_stopping_rounds: Optional[int] = 20,
+) -> Dict[str, Any]:
+    """Tune ``model`` over ``param_grid`` with successive halving.
+
+    Parameters
+    ----------
+    model : estimator
+        Unfitted scikit-learn compatible regressor.
+    param_grid : dict or list of dict
+        Candidate parameters, as for ``GridSearchCV``.
+    X, y : pandas.DataFrame, pandas.Series
+        Time-ordered features and target.
+    n_splits : int, optional
+        Number of ``TimeSeriesSplit`` folds shared by every fit.
+    factor : int, optional
+        Candidates kept and training rows grown by this factor per rung.
+    min_rows : int, optional
+        Smallest training slice of a fold.
+    max_fits : int, optional
+        Maximum number of fold fits before the search stops.
+    time_budget : float, optional
+        Seconds after which no new fold fit is started.
+    early_stopping_rounds : int, optional
+        Rounds without improvement on the last fifth of a fold's training
+        rows after which an XGBoost fit stops. The final model uses the mean number of trees the winner's
+        folds kept as ``n_estimators``.
+
+    Returns
+    -------
+    dict
+        ``model`` (refitted on all rows), ``params``, ``mae`` and ``fold_mae``
+        of the winner, the ``fraction`` of each fold's training window its
+        scores were measured on (1.0 unless the budget ran out), ``fits``
+        (including the final refit), ``seconds``, the per-rung ``rungs`` log
+        and ``exhausted`` when the budget cut the search short.
+    """
+    start = time.perf_counter()
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+    candidates = list(ParameterGrid(param_grid))
+    n_rungs = 1 if len(candidates) == 1 else math.ceil(math.log(len(candidates), factor)) + 1
+
+    staged = _is_staged(model, candidates)
+
+    fits = 0
+    exhausted = False
+    rungs: List[Dict[str, Any]] = []
+    best = None
+    survivors = candidates
+    for rung in range(n_rungs):
+        fraction = 1.0 / factor ** (n_rungs - 1 - rung)
+        scored = []
+        for group in _groups(survivors, staged):
+            sizes = sorted({params["n_estimators"] for params in group}) if staged else []
+            fold_mae: Dict[int, List[float]] = {n: [] for n in sizes} if staged else {0: []}
+            trees: Dict[int, List[int]] = {n: [] for n in fold_mae}
+            for train_idx, test_idx in folds:
+                if (max_fits is not None and fits >= max_fits) or (
+                    time_budget is not None and time.perf_counter() - start >= time_budget
+                ):
+                    exhausted = True
+                    break
+                rows = min(len(train_idx), max(min_rows, math.ceil(len(train_idx) * fraction)))
+                params = dict(group[0], n_estimators=sizes[-1]) if staged else group[0]
+                estimator = clone(model).set_params(**params)
+                estimator, best_iteration = _fit_fold(estimator, X, y, train_idx[-rows:], early_stopping_rounds)
+                fits += 1
+                X_test, y_test = X.iloc[test_idx], y.iloc[test_idx]
+                if staged:
+                    for n, (mae, used) in _staged_mae(estimator, X_test, y_test, sizes, best_iteration).items():
+                        fold_mae[n].append(mae)
+                        trees[n].append(used)
+                else:
+                    fold_mae[0].append(mean_absolute_error(y_test, estimator.predict(X_test)))
+            if exhausted:
+                break
+            for params in group:
+                key = params["n_estimators"] if staged else 0
+                scored.append({"params": params, "fold_mae": fold_mae[key], "trees": trees[key],
+                               "mae": float(np.mean(fold_mae[key])), "fraction": fraction})
+        if not scored:
+            break
+        scored.sort(key=lambda c: c["mae"])
+        best = scored[0]
+        rungs.append({"fraction": fraction, "candidates": len(scored), "fits": fits, "best_mae": best["mae"]})
+        if exhausted:
+            break
+        survivors = [c["params"] for c in scored[: max(1, math.ceil(len(scored) / factor))]]
+
+    if best is None:
+        # Budget too small to score anything: fall back to the first candidate.
+        best = {"params": candidates[0], "fold_mae": [], "trees": [], "mae": float("nan"), "fraction": 0.0}
+
+    params = dict(best["params"])
+    if staged and best["trees"]:
+        # XGBoost with early stopping may have used fewer trees than asked for.
+        params["n_estimators"] = int(round(np.mean(best["trees"])))
+    final = clone(model).set_params(**params)
+    final.fit(X, y)
+    fits += 1
+
+    return {
+        "model": final,
+        "params": params,
+        "mae": best["mae"],
+        "fold_mae": [float(v) for v in best["fold_mae"]],
+        "fraction": best["fraction"],
+        "fits": fits,
+        "seconds": round(time.perf_counter() - start, 3),
+        "rungs": rungs,
+        "exhausted": exhausted,
+    }
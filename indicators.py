@@ -0,0 +1,179 @@
+"""Vectorized technical indicators shared by training and serving.
+
+Every function accepts a 1-D series or a 2-D ``symbols x dates`` panel and
+computes along the last axis. Definitions follow pandas_ta defaults so models
+trained with pandas_ta see the same features at serving time.
+
+Leading NaNs (for example a symbol listed later than others in a panel) stay
+NaN. Gaps after the first valid value are forward filled.
+"""
+
+import sys
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Largest growth factor used when solving the EWM recursion in blocks.
+_BLOCK_RANGE = 1e8
+
+
+def _as_float(x) -> np.ndarray:
+    return np.array(x, dtype=np.float64, copy=True)
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """Forward fill NaNs along the last axis, keeping leading NaNs."""
+    valid = ~np.isnan(x)
+    if valid.all():
+        return x
+    idx = np.where(valid, np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    filled = np.take_along_axis(x, idx, axis=-1)
+    leading = np.logical_not(np.logical_or.accumulate(valid, axis=-1))
+    filled[leading] = np.nan
+    return filled
+
+
+def _first_valid(x: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(x)
+    first = np.argmax(valid, axis=-1)
+    return np.where(valid.any(axis=-1), first, x.shape[-1])
+
+
+def _recurrence(u: np.ndarray, decay: float) -> np.ndarray:
+    """Solve ``z[t] = decay * z[t-1] + u[t]`` with ``z[-1] = 0`` along the last axis.
+
+    The recursion is solved in closed form per block with a cumulative sum, so
+    the Python loop runs once per block instead of once per element.
+    """
+    n = u.shape[-1]
+    out = np.empty_like(u)
+    if n == 0:
+        return out
+    block = n if decay <= 0 else max(1, min(n, int(np.log(_BLOCK_RANGE) / -np.log(decay))))
+    powers = decay ** np.arange(block)
+    inv_powers = 1.0 / powers
+    carry = np.zeros(u.shape[:-1])
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        width = stop - start
+        scaled = np.cumsum(u[..., start:stop] * inv_powers[:width], axis=-1)
+        out[..., start:stop] = powers[:width] * (decay * carry[..., None] + scaled)
+        carry = out[..., stop - 1]
+    return out
+
+
+def _rolling(x: np.ndarray, length: int) -> np.ndarray:
+    """Return a ``(..., n - length + 1, length)`` window view over the last axis."""
+    return sliding_window_view(x, length, axis=-1)
+
+
+def _pad_front(values: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(values.shape[:-1] + (n,), np.nan)
+    if values.shape[-1]:
+        out[..., n - values.shape[-1]:] = values
+    return out
+
+
+def sma(close, length: int = 20) -> np.ndarray:
+    """Simple moving average."""
+    x = _ffill(_as_float(close))
+    n = x.shape[-1]
+    if n < length:
+        return np.full(x.shape, np.nan)
+    return _pad_front(_rolling(x, length).mean(axis=-1), n)
+
+
+def rolling_volatility(close, length: int = 20) -> np.ndarray:
+    """Rolling sample standard deviation (``ddof=1``) of the series."""
+    x = _ffill(_as_float(close))
+    n = x.shape[-1]
+    if n < length:
+        return np.full(x.shape, np.nan)
+    return _pad_front(_rolling(x, length).std(axis=-1, ddof=1), n)
+
+
+def rma(x, length: int = 14) -> np.ndarray:
+    """Wilder's moving average, ``ewm(alpha=1/length, min_periods=length).mean()``."""
+    x = _as_float(x)
+    valid = ~np.isnan(x)
+    decay = 1.0 - 1.0 / length
+    weighted = _recurrence(np.where(valid, x, 0.0), decay)
+    weights = _recurrence(valid.astype(np.float64), decay)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = weighted / weights
+    out[np.cumsum(valid, axis=-1) < length] = np.nan
+    return out
+
+
+def ema(close, length: int = 20) -> np.ndarray:
+    """Exponential moving average seeded with the SMA of the first ``length`` values."""
+    x = _ffill(_as_float(close))
+    n = x.shape[-1]
+    alpha = 2.0 / (length + 1)
+    seed_idx = _first_valid(x) + length - 1
+    seeds = sma(x, length)
+    idx = np.arange(n)
+    at_seed = idx == seed_idx[..., None]
+    after_seed = idx > seed_idx[..., None]
+    u = np.where(after_seed, alpha * np.nan_to_num(x), 0.0)
+    u = np.where(at_seed, np.nan_to_num(seeds), u)
+    out = _recurrence(u, 1.0 - alpha)
+    out[idx < seed_idx[..., None]] = np.nan
+    return out
+
+
+def rsi(close, length: int = 14) -> np.ndarray:
+    """Relative Strength Index using Wilder smoothing."""
+    x = _ffill(_as_float(close))
+    diff = np.full(x.shape, np.nan)
+    diff[..., 1:] = np.diff(x, axis=-1)
+    positive = rma(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    negative = rma(np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100.0 * positive / (positive + negative)
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return ``(macd, signal, histogram)``."""
+    x = _as_float(close)
+    line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """True range; the first value is NaN."""
+    h = _ffill(_as_float(high))
+    lo = _ffill(_as_float(low))
+    c = _ffill(_as_float(close))
+    prev = np.full(c.shape, np.nan)
+    prev[..., 1:] = c[..., :-1]
+    ranges = np.stack([h - lo, np.abs(h - prev), np.abs(prev - lo)])
+    out = np.max(ranges, axis=0)
+    out[..., 0] = np.nan
+    return out
+
+
+def atr(high, low, close, length: int = 14) -> np.ndarray:
+    """Average true range with Wilder smoothing."""
+    return rma(true_range(high, low, close), length)
+
+
+def stoch(high, low, close, k: int = 14, d: int = 3, smooth_k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the smoothed stochastic oscillator ``(%K, %D)``."""
+    h = _ffill(_as_float(high))
+    lo = _ffill(_as_float(low))
+    c = _ffill(_as_float(close))
+    n = c.shape[-1]
+    if n < k:
+        empty = np.full(c.shape, np.nan)
+        return empty, empty.copy()
+    highest = _pad_front(_rolling(h, k).max(axis=-1), n)
+    lowest = _pad_front(_rolling(lo, k).min(axis=-1), n)
+    span = highest - lowest
+    span = np.where(span == 0, sys.float_info.epsilon, span)
+    raw = 100.0 * (c - lowest) / span
+    stoch_k = sma(raw, smooth_k)
+    return stoch_k, sma(stoch_k, d)
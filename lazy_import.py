@@ -0,0 +1,66 @@
+"""Deferred imports of heavy libraries.
+
+``pd = lazy_import("pandas")`` binds a placeholder that imports pandas on
+the first attribute access, so a module that needs pandas only on some code
+paths does not pay for it when it is imported. :func:`optional_import`
+does the same for libraries that may be missing and returns ``None`` for
+them. :func:`preload` imports everything up front, for example before a
+server forks its workers.
+"""
+
+import importlib
+import sys
+import threading
+import time
+import types
+from typing import Dict, Iterable, Optional
+
+_lock = threading.Lock()
+_optional: Dict[str, Optional[types.ModuleType]] = {}
+
+
+class LazyModule(types.ModuleType):
+    """Module placeholder that imports the real module on first use."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+
+    def _load(self) -> types.ModuleType:
+        module = importlib.import_module(self.__name__)
+        # Later attribute lookups hit the copied namespace, not __getattr__.
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return ``name`` if it is already imported, otherwise a :class:`LazyModule`."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def optional_import(name: str) -> Optional[types.ModuleType]:
+    """Import ``name`` on the first call and return it, or ``None`` if it fails to import."""
+    if name not in _optional:
+        with _lock:
+            if name not in _optional:
+                try:
+                    _optional[name] = importlib.import_module(name)
+                except Exception:
+                    _optional[name] = None
+    return _optional[name]
+
+
+def preload(names: Iterable[str]) -> Dict[str, float]:
+    """Import ``names`` now and return the seconds each took (missing ones are skipped)."""
+    seconds = {}
+    for name in names:
+        start = time.perf_counter()
+        if optional_import(name) is not None:
+            seconds[name] = round(time.perf_counter() - start, 3)
+    return seconds
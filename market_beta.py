@@ -0,0 +1,143 @@
+"""Vectorized market beta for a whole universe of symbols.
+
+Prices and returns are ``symbols x dates`` panels aligned on the same date
+axis, with NaN where a symbol has no price. Missing data is handled with
+masks: each symbol's returns are taken between consecutive dates on which
+both the symbol and the market have a price, which is what an inner join on
+dates followed by ``pct_change`` gives for a single symbol.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def _ffill_rows(x: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(x)
+    idx = np.where(valid, np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    filled = np.take_along_axis(x, idx, axis=-1)
+    filled[~np.logical_or.accumulate(valid, axis=-1)] = np.nan
+    return filled
+
+
+def aligned_returns(closes, market_closes) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(stock_returns, market_returns)`` panels from aligned prices.
+
+    Parameters
+    ----------
+    closes : array-like
+        ``symbols x dates`` closing prices (a 1-D series is treated as one symbol).
+    market_closes : array-like
+        Market closing prices on the same dates.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Two ``symbols x dates`` arrays, NaN wherever the pair has no return.
+    """
+    prices = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    market = np.broadcast_to(np.asarray(market_closes, dtype=np.float64), prices.shape)
+    joint = ~np.isnan(prices) & ~np.isnan(market)
+
+    stock = np.where(joint, prices, np.nan)
+    bench = np.where(joint, market, np.nan)
+    prev_stock = np.full(stock.shape, np.nan)
+    prev_bench = np.full(bench.shape, np.nan)
+    prev_stock[:, 1:] = _ffill_rows(stock)[:, :-1]
+    prev_bench[:, 1:] = _ffill_rows(bench)[:, :-1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stock_returns = np.where(joint, stock / prev_stock - 1.0, np.nan)
+        market_returns = np.where(joint, bench / prev_bench - 1.0, np.nan)
+    return stock_returns, market_returns
+
+
+def _masked_sums(stock_returns, market_returns):
+    x = np.atleast_2d(np.asarray(stock_returns, dtype=np.float64))
+    y = np.broadcast_to(np.asarray(market_returns, dtype=np.float64), x.shape)
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    return mask.astype(np.float64), x, y, x * y, y * y
+
+
+def _beta_from_sums(n, sx, sy, sxy, syy, min_periods):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (sxy - sx * sy / n) / (n - 1)
+        var = (syy - sy * sy / n) / (n - 1)
+        beta = cov / var
+    return np.where((n >= min_periods) & (var > 0), beta, np.nan)
+
+
+def batch_beta(stock_returns, market_returns, min_periods: int = 20) -> np.ndarray:
+    """Return the full-sample beta of every symbol.
+
+    Parameters
+    ----------
+    stock_returns : array-like
+        ``symbols x dates`` returns, NaN where missing.
+    market_returns : array-like
+        Market returns, either one series or a ``symbols x dates`` panel.
+    min_periods : int, optional
+        Symbols with fewer paired observations get NaN.
+
+    Returns
+    -------
+    numpy.ndarray
+        One beta per symbol; NaN when there is too little data or the market
+        variance is zero.
+    """
+    n, x, y, xy, yy = _masked_sums(stock_returns, market_returns)
+    return _beta_from_sums(n.sum(1), x.sum(1), y.sum(1), xy.sum(1), yy.sum(1), min_periods)
+
+
+def rolling_beta(stock_returns, market_returns, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+    """Return ``symbols x dates`` betas over a trailing window of ``window`` dates."""
+    min_periods = window if min_periods is None else min_periods
+    sums = []
+    for arr in _masked_sums(stock_returns, market_returns):
+        csum = np.cumsum(arr, axis=1)
+        lagged = np.zeros_like(csum)
+        lagged[:, window:] = csum[:, :-window]
+        sums.append(csum - lagged)
+    return _beta_from_sums(*sums, min_periods)
+
+
+class RollingBeta:
+    """Streaming rolling betas updated in O(1) per symbol for each new day.
+
+    Running sums of ``x``, ``y``, ``xy`` and ``y^2`` are kept for the current
+    window; each update adds the new day and subtracts the day that leaves the
+    window. Sums are rebuilt from the window buffer every ``resync`` updates
+    so floating-point drift stays bounded.
+    """
+
+    def __init__(self, n_symbols: int, window: int, min_periods: Optional[int] = None, resync: int = 1000) -> None:
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.resync = resync
+        self._buffer = np.zeros((5, window, n_symbols))
+        self._sums = np.zeros((5, n_symbols))
+        self._pos = 0
+        self._updates = 0
+
+    def update(self, stock_returns, market_return) -> np.ndarray:
+        """Add one day of returns (NaN where missing) and return current betas.
+
+        ``market_return`` is a scalar or, for returns from
+        :func:`aligned_returns`, the per-symbol market return column.
+        """
+        n, x, y, xy, yy = _masked_sums(np.asarray(stock_returns, dtype=np.float64)[None, :], market_return)
+        new = np.stack([n[0], x[0], y[0], xy[0], yy[0]])
+        self._sums += new - self._buffer[:, self._pos]
+        self._buffer[:, self._pos] = new
+        self._pos = (self._pos + 1) % self.window
+        self._updates += 1
+        if self._updates % self.resync == 0:
+            self._sums = self._buffer.sum(axis=1)
+        return self.beta
+
+    @property
+    def beta(self) -> np.ndarray:
+        return _beta_from_sums(*self._sums, self.min_periods)
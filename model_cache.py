@@ -0,0 +1,153 @@
+"""Thread-safe LRU cache for models loaded from disk."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from lazy_import import lazy_import
+from single_flight import SingleFlight
+
+joblib = lazy_import("joblib")
+
+
+def _joblib_load(path: str) -> Any:
+    return joblib.load(path)
+
+
+class ModelCache:
+    """Keep recently used models in memory.
+
+    Entries are keyed by file path and remember the ``(mtime, size)`` of the
+    file they were loaded from. When the file changes on disk the stale entry
+    is dropped and the model is loaded again. Objects derived from a model,
+    such as SHAP explainers, are stored on the same entry and are dropped
+    together with it. Concurrent misses for the same file, or for the same
+    derived object, wait for one load instead of each loading it.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum number of models kept in memory. The least recently used
+        model is evicted when the limit is exceeded.
+    loader : callable, optional
+        Function used to load a model from a path. Defaults to ``joblib.load``.
+    """
+
+    def __init__(self, max_size: int = 64, loader: Optional[Callable[[str], Any]] = None) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._loader = loader if loader is not None else _joblib_load
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Any, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.derived_hits = 0
+        self.derived_misses = 0
+        self._loads = SingleFlight()
+        self._derived = SingleFlight()
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path: str, immutable: bool = False) -> Any:
+        """Return the model stored at ``path``, loading it if needed.
+
+        With ``immutable`` the file is trusted never to change once written
+        (as for versioned registry files), so a cached entry is returned
+        without checking the file on disk.
+
+        Raises ``FileNotFoundError`` if the file does not exist.
+        """
+        if immutable:
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is not None:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[1]
+        try:
+            signature = self._signature(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            raise
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if entry[0] == signature:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[path]
+                self.invalidations += 1
+            self.misses += 1
+
+        return self._loads.do((path, signature), lambda: self._load(path, signature))
+
+    def _load(self, path: str, signature: Tuple[int, int]) -> Any:
+        model = self._loader(path)
+        with self._lock:
+            self._entries[path] = (signature, model, {})
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def get_derived(
+        self, path: str, name: str, factory: Callable[[Any], Any], immutable: bool = False
+    ) -> Tuple[Any, Any]:
+        """Return ``(model, derived)`` where ``derived = factory(model)``.
+
+        The derived object is built once per loaded model version and cached
+        under ``name`` on the model's entry.
+        """
+        model = self.get(path, immutable)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[1] is model and name in entry[2]:
+                self.derived_hits += 1
+                return model, entry[2][name]
+            self.derived_misses += 1
+
+        # The in-flight caller holds ``model``, so its id cannot be reused meanwhile.
+        derived = self._derived.do((path, name, id(model)), lambda: factory(model))
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[1] is model:
+                entry[2][name] = derived
+        return model, derived
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop one cached model, or every model when ``path`` is ``None``."""
+        with self._lock:
+            if path is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(path, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "derived_hits": self.derived_hits,
+                "derived_misses": self.derived_misses,
+                "load_joins": self._loads.stats()["joined"],
+                "derived_joins": self._derived.stats()["joined"],
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
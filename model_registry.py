@@ -0,0 +1,346 @@
+"""Registry of trained risk models with atomic publish, hot-swap and rollback.
+
+A manifest (``registry.json``) in the model directory maps every symbol to
+its active model version. Each version records the model file, its feature
+list, training metrics and a SHA-256 checksum::
+
+    {
+      "revision": 12,
+      "models": {
+        "AAPL": {
+          "active": "20240601120000",
+          "history": ["20240501120000"],
+          "versions": {
+            "20240601120000": {
+              "file": "AAPL_risk_model_20240601120000.pkl",
+              "features": ["rsi", "sma_20", "volatility", "beta"],
+              "metrics": {"mae": 0.041},
+              "sha256": "...",
+              "created_at": "2024-06-01T12:00:00Z"
+            }
+          }
+        }
+      }
+    }
+
+Model files are immutable once published. Writers rewrite the manifest under
+a lock file and replace it atomically, so readers always see a complete
+manifest. Readers keep the parsed manifest in memory and only reread it when
+:meth:`ModelRegistry.refresh` sees the file change, typically from
+:meth:`ModelRegistry.watch`.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from lazy_import import lazy_import
+
+joblib = lazy_import("joblib")
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+MANIFEST_FILE = "registry.json"
+LEGACY_SUFFIX = "_risk_model.pkl"
+# Registry name of the single model trained on all symbols.
+POOLED_SYMBOL = "_pooled"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        write(fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ModelRegistry:
+    """Read and update the model manifest stored under ``root``.
+
+    Parameters
+    ----------
+    root : str
+        Directory holding ``registry.json`` and the versioned model files.
+    """
+
+    def __init__(self, root: str = "data/models") -> None:
+        self.root = root
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    # ------------------------------------------------------------------ read
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"revision": 0, "models": {}}
+
+    def _entry(self, symbol: str, version: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        return {"symbol": symbol, "version": version, "path": os.path.join(self.root, record["file"]), **record}
+
+    def refresh(self, prepare: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Tuple]:
+        """Reload the manifest if it changed and swap in the new active models.
+
+        ``prepare(symbol, entry)`` runs for every new active entry *before*
+        it becomes visible, so callers can load the model ahead of traffic.
+        An entry whose file fails its checksum or whose ``prepare`` raises is
+        not swapped in; the previous version keeps serving.
+
+        Returns ``{symbol: (old_entry, new_entry)}`` for the symbols that
+        changed; either side is ``None`` for added or removed symbols.
+        """
+        try:
+            st = os.stat(self.manifest_path)
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            signature = None
+        with self._lock:
+            if signature == self._signature:
+                return {}
+            current = self._active
+
+        manifest = self._read()
+        active = {}
+        changes = {}
+        for symbol, model in manifest.get("models", {}).items():
+            version = model.get("active")
+            if version is None:
+                continue
+            entry = self._entry(symbol, version, model["versions"][version])
+            old = current.get(symbol)
+            if old is not None and old["version"] == version and old["sha256"] == entry["sha256"]:
+                active[symbol] = old
+                continue
+            try:
+                if file_sha256(entry["path"]) != entry["sha256"]:
+                    raise ValueError("checksum mismatch")
+                if prepare is not None:
+                    prepare(symbol, entry)
+            except Exception as e:
+                print(f"[HATA] Model yüklenemedi {symbol} {version}: {e}")
+                if old is not None:
+                    active[symbol] = old
+                continue
+            active[symbol] = entry
+            changes[symbol] = (old, entry)
+        for symbol in current:
+            if symbol not in active:
+                changes[symbol] = (current[symbol], None)
+
+        with self._lock:
+            self._active = active
+            self._signature = signature
+        return changes
+
+    def active(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return the in-memory active entry for ``symbol`` (no file access)."""
+        return self._active.get(symbol)
+
+    def symbols(self) -> List[str]:
+        return sorted(self._active)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._active)
+
+    def versions(self, symbol: str) -> List[Dict[str, Any]]:
+        """Return every stored version of ``symbol``, oldest first, read from disk."""
+        model = self._read().get("models", {}).get(symbol, {})
+        return [self._entry(symbol, v, r) for v, r in sorted(model.get("versions", {}).items())]
+
+    def watch(self, interval: float = 2.0, prepare=None, on_change=None) -> None:
+        """Call :meth:`refresh` every ``interval`` seconds in a daemon thread.
+
+        ``on_change(changes)`` receives the result of each refresh that
+        swapped at least one model.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    changes = self.refresh(prepare)
+                    if changes and on_change is not None:
+                        on_change(changes)
+                except Exception as e:  # keep serving the current models
+                    print("Model kayıt defteri okunamadı:", str(e))
+
+        self._thread = threading.Thread(target=run, name="model-registry-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ----------------------------------------------------------------- write
+    @contextmanager
+    def _locked_manifest(self) -> Iterator[Dict[str, Any]]:
+        """Yield the manifest for editing and write it back atomically."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, f"{MANIFEST_FILE}.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                manifest = self._read()
+                yield manifest
+                manifest["revision"] = manifest.get("revision", 0) + 1
+                manifest["updated_at"] = _now().isoformat()
+                _atomic_write(self.manifest_path, lambda fh: fh.write(json.dumps(manifest, indent=2).encode()))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def publish(
+        self,
+        symbol: str,
+        model: Any,
+        features: List[str],
+        metrics: Optional[Dict[str, Any]] = None,
+        version: Optional[str] = None,
+        activate: bool = True,
+        universe: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Save ``model`` as a new version of ``symbol`` and register it.
+
+        The model file is fully written before the manifest references it,
+        and the manifest switch is atomic, so readers never see a partial
+        model. ``universe`` lists the symbols a pooled model was trained on.
+        Returns the new entry.
+        """
+        version = version or _now().strftime("%Y%m%d%H%M%S%f")
+        filename = f"{symbol}_risk_model_{version}.pkl"
+        path = os.path.join(self.root, filename)
+        os.makedirs(self.root, exist_ok=True)
+        _atomic_write(path, lambda fh: joblib.dump(model, fh))
+        record = {
+            "file": filename,
+            "features": list(features),
+            "metrics": metrics or {},
+            "sha256": file_sha256(path),
+            "created_at": _now().isoformat(),
+        }
+        if universe is not None:
+            record["universe"] = sorted(universe)
+        with self._locked_manifest() as manifest:
+            model_entry = manifest.setdefault("models", {}).setdefault(symbol, {"versions": {}, "history": []})
+            model_entry["versions"][version] = record
+            if activate:
+                self._switch(model_entry, version)
+        return self._entry(symbol, version, record)
+
+    @staticmethod
+    def _switch(model_entry: Dict[str, Any], version: str) -> None:
+        previous = model_entry.get("active")
+        if previous is not None and previous != version:
+            model_entry["history"].append(previous)
+        model_entry["active"] = version
+
+    def activate(self, symbol: str, version: str) -> Dict[str, Any]:
+        """Make an existing ``version`` the active model of ``symbol``."""
+        with self._locked_manifest() as manifest:
+            model_entry = manifest.get("models", {}).get(symbol)
+            if model_entry is None or version not in model_entry["versions"]:
+                raise KeyError(f"{symbol} has no version {version}")
+            self._switch(model_entry, version)
+            record = model_entry["versions"][version]
+        return self._entry(symbol, version, record)
+
+    def rollback(self, symbol: str) -> Dict[str, Any]:
+        """Reactivate the version that was active before the current one."""
+        with self._locked_manifest() as manifest:
+            model_entry = manifest.get("models", {}).get(symbol)
+            if not model_entry or not model_entry.get("history"):
+                raise KeyError(f"{symbol} has no previous version to roll back to")
+            version = model_entry["history"].pop()
+            model_entry["active"] = version
+            record = model_entry["versions"][version]
+        return self._entry(symbol, version, record)
+
+
+def import_legacy(root: str = "data/models") -> ModelRegistry:
+    """Register every unversioned ``{symbol}_risk_model.pkl`` in ``root``.
+
+    The files are registered in place as version ``legacy``; symbols that
+    already have an active version are left alone.
+    """
+    registry = ModelRegistry(root)
+    with registry._locked_manifest() as manifest:
+        models = manifest.setdefault("models", {})
+        for name in sorted(os.listdir(root)):
+            if not name.endswith(LEGACY_SUFFIX):
+                continue
+            symbol = name[: -len(LEGACY_SUFFIX)]
+            if models.get(symbol, {}).get("active"):
+                continue
+            path = os.path.join(root, name)
+            features = getattr(joblib.load(path), "feature_names_in_", None)
+            models[symbol] = {
+                "active": "legacy",
+                "history": [],
+                "versions": {"legacy": {
+                    "file": name,
+                    "features": [str(f) for f in features] if features is not None else None,
+                    "metrics": {},
+                    "sha256": file_sha256(path),
+                    "created_at": _now().isoformat(),
+                }},
+            }
+    return registry
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default="data/models")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show the active version of every symbol")
+    commands.add_parser("import-legacy", help="register unversioned {symbol}_risk_model.pkl files")
+    activate_cmd = commands.add_parser("activate", help="make a stored version active")
+    activate_cmd.add_argument("symbol")
+    activate_cmd.add_argument("version")
+    rollback_cmd = commands.add_parser("rollback", help="reactivate the previous version")
+    rollback_cmd.add_argument("symbol")
+    args = parser.parse_args()
+
+    if args.command == "import-legacy":
+        import_legacy(args.root)
+    registry = ModelRegistry(args.root)
+    if args.command == "activate":
+        print("[✓] Etkin:", registry.activate(args.symbol, args.version)["file"])
+    elif args.command == "rollback":
+        print("[✓] Geri alındı:", registry.rollback(args.symbol)["file"])
+    registry.refresh()
+    for symbol, entry in registry.entries().items():
+        print(f"{symbol:<10} {entry['version']:<22} {entry['metrics']}")
@@ -1,13 +1,15 @@
 """Advanced portfolio risk analysis utilities."""
 
-from typing import Any, Dict, List, Tuple
+import threading
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 
-from portfolio_risk import calculate_weighted_portfolio_risk
 
-
-def analyze_portfolio(positions: List[Dict[str, Any]], high_risk_threshold: float = 0.6) -> Dict[str, Any]:
+def analyze_portfolio(
+    positions: List[Dict[str, Any]], high_risk_threshold: float = 0.6, covariance_service: Any = None
+) -> Dict[str, Any]:
     """Analyze a portfolio and return risk-based suggestions.
 
     Parameters
@@ -17,6 +19,9 @@ def analyze_portfolio(positions: List[Dict[str, Any]], high_risk_threshold: floa
         ``risk_score`` and optionally ``sector`` and ``returns``.
     high_risk_threshold : float, optional
         Risk score above which a position is considered high risk.
+    covariance_service : CovarianceService, optional
+        When positions carry no ``returns``, the correlation check looks
+        their symbols up in this service instead.
 
     Returns
     -------
@@ -24,46 +29,44 @@ def analyze_portfolio(positions: List[Dict[str, Any]], high_risk_threshold: floa
         Analysis results including high-risk percentage, sector concentration,
         diversification score and suggestions.
     """
-    if not positions:
-        return {
-            "high_risk_percentage": 0.0,
-            "sector_distribution": {},
-            "diversification_score": 0.0,
-            "suggestions": [],
-        }
-
-    values = [pos.get("quantity", 0) * pos.get("price", 0.0) for pos in positions]
-    total_value = float(sum(values))
-    if total_value == 0:
-        return {
-            "high_risk_percentage": 0.0,
-            "sector_distribution": {},
-            "diversification_score": 0.0,
-            "suggestions": [],
-        }
+    # Keyed by position so repeated or missing symbols are never merged.
+    state = PortfolioState(high_risk_threshold=high_risk_threshold)
+    for i, pos in enumerate(positions):
+        state.add(pos, key=i)
+    summary = state.analysis()
+    if not summary["sector_distribution"]:
+        return summary
 
-    # High risk share
-    high_risk_value = 0.0
-    sector_weights: Dict[str, float] = {}
-
-    for pos, value in zip(positions, values):
-        risk = pos.get("risk_score", 0.0)
-        if risk >= high_risk_threshold:
-            high_risk_value += value
+    # Optional pairwise correlation analysis
+    if _highly_correlated(positions, covariance_service):
+        summary["suggestions"].append(
+            "Some portfolio holdings are highly correlated. Diversifying into"
+            " less correlated assets could reduce risk."
+        )
 
-        sector = pos.get("sector", "Unknown")
-        sector_weights[sector] = sector_weights.get(sector, 0.0) + value
+    return summary
 
-    high_risk_percentage = 100 * high_risk_value / total_value
 
-    # Normalize sector weights
-    for key in list(sector_weights.keys()):
-        sector_weights[key] = sector_weights[key] / total_value
+def _highly_correlated(positions: List[Dict[str, Any]], covariance_service: Any = None) -> bool:
+    returns_data = [pos.get("returns") for pos in positions if pos.get("returns")]
+    if len(returns_data) < 2 and covariance_service is not None:
+        symbols = list(dict.fromkeys(pos["symbol"] for pos in positions if pos.get("symbol")))
+        if len(symbols) < 2:
+            return False
+        corr_matrix = covariance_service.correlation(symbols)
+        return bool(corr_matrix[np.triu_indices_from(corr_matrix, k=1)].max() > 0.8)
+    if len(returns_data) < 2:
+        return False
+    try:
+        aligned_returns = np.array([r[-len(min(returns_data, key=len)) :] for r in returns_data])
+        corr_matrix = np.corrcoef(aligned_returns)
+        upper_triangle = corr_matrix[np.triu_indices_from(corr_matrix, k=1)]
+        return bool(np.nanmax(upper_triangle) > 0.8)
+    except Exception:
+        return False
 
-    # Diversification score using Herfindahl-Hirschman Index
-    hhi = sum(weight ** 2 for weight in sector_weights.values())
-    diversification_score = 1 - hhi
 
+def _suggestions(high_risk_percentage: float, max_sector: Tuple[Any, float], diversification_score: float) -> List[str]:
     suggestions: List[str] = []
     if high_risk_percentage > 50:
         suggestions.append(
@@ -71,7 +74,6 @@ def analyze_portfolio(positions: List[Dict[str, Any]], high_risk_threshold: floa
             " Consider diversifying with safer assets."
         )
 
-    max_sector = max(sector_weights.items(), key=lambda x: x[1]) if sector_weights else (None, 0)
     if max_sector[1] > 0.5:
         suggestions.append(
             f"Your portfolio is heavily concentrated in the {max_sector[0]} sector."
@@ -83,28 +85,203 @@ def analyze_portfolio(positions: List[Dict[str, Any]], high_risk_threshold: floa
             "Your portfolio diversification score is low. Consider spreading your"
             " investments across more sectors."
         )
+    return suggestions
 
-    # Optional pairwise correlation analysis
-    returns_data = [pos.get("returns") for pos in positions if pos.get("returns")]
-    if len(returns_data) > 1:
-        try:
-            aligned_returns = np.array([r[-len(min(returns_data, key=len)) :] for r in returns_data])
-            corr_matrix = np.corrcoef(aligned_returns)
-            upper_triangle = corr_matrix[np.triu_indices_from(corr_matrix, k=1)]
-            if np.nanmax(upper_triangle) > 0.8:
-                suggestions.append(
-                    "Some portfolio holdings are highly correlated. Diversifying into"
-                    " less correlated assets could reduce risk."
-                )
-        except Exception:
-            pass
 
-    return {
-        "high_risk_percentage": high_risk_percentage,
-        "sector_distribution": sector_weights,
-        "diversification_score": diversification_score,
-        "suggestions": suggestions,
-    }
+class PortfolioState:
+    """Running totals of a portfolio for cheap what-if analysis.
+
+    The state keeps the total value, the risk-weighted value (sum of
+    ``risk_score * value``), the value held above ``high_risk_threshold`` and
+    the value per sector. :meth:`add`, :meth:`remove` and :meth:`resize`
+    adjust those totals in O(1); summary metrics are read from them without
+    revisiting the positions.
+
+    Positions are keyed by ``symbol`` unless :meth:`add` is given a ``key``.
+    Adding a key that is already held merges into the existing holding and
+    its sector, which is what a what-if trade on a held symbol means.
+    """
+
+    def __init__(self, positions: Iterable[Dict[str, Any]] = (), high_risk_threshold: float = 0.6) -> None:
+        self.high_risk_threshold = high_risk_threshold
+        self.holdings: Dict[Any, Dict[str, Any]] = {}
+        self.total_value = 0.0
+        self.risk_value = 0.0
+        self.high_risk_value = 0.0
+        self.sector_values: Dict[str, float] = {}
+        self._sector_counts: Dict[str, int] = {}
+        for pos in positions:
+            self.add(pos)
+
+    def __len__(self) -> int:
+        return len(self.holdings)
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.holdings
+
+    # ------------------------------------------------------------- updates
+    def _apply(self, sector: str, value: float, risk_value: float, high_value: float) -> None:
+        self.total_value += value
+        self.risk_value += risk_value
+        self.high_risk_value += high_value
+        self.sector_values[sector] = self.sector_values.get(sector, 0.0) + value
+
+    def add(self, position: Dict[str, Any], key: Any = None) -> None:
+        """Add a position, merging it into an existing holding with the same key.
+
+        ``key`` defaults to the position's ``symbol``.
+        """
+        quantity = position.get("quantity", 0)
+        value = quantity * position.get("price", 0.0)
+        risk = position.get("risk_score", 0.0)
+        high_value = value if risk >= self.high_risk_threshold else 0.0
+        if key is None:
+            key = position.get("symbol")
+
+        holding = self.holdings.get(key)
+        if holding is None:
+            sector = position.get("sector", "Unknown")
+            holding = self.holdings[key] = {
+                "sector": sector, "quantity": 0, "value": 0.0, "risk_value": 0.0, "high_risk_value": 0.0,
+            }
+            self._sector_counts[sector] = self._sector_counts.get(sector, 0) + 1
+        holding["quantity"] += quantity
+        holding["value"] += value
+        holding["risk_value"] += risk * value
+        holding["high_risk_value"] += high_value
+        self._apply(holding["sector"], value, risk * value, high_value)
+
+    def remove(self, symbol) -> Optional[Dict[str, Any]]:
+        """Remove a holding and return it, or ``None`` if it is not held."""
+        holding = self.holdings.pop(symbol, None)
+        if holding is None:
+            return None
+        sector = holding["sector"]
+        self._apply(sector, -holding["value"], -holding["risk_value"], -holding["high_risk_value"])
+        self._sector_counts[sector] -= 1
+        if not self._sector_counts[sector]:
+            del self._sector_counts[sector], self.sector_values[sector]
+        if not self.holdings:
+            # Reset exactly so rounding error does not outlive the positions.
+            self.total_value = self.risk_value = self.high_risk_value = 0.0
+        return holding
+
+    def resize(self, symbol, quantity: float) -> None:
+        """Change the quantity of a holding, keeping its price and risk score."""
+        holding = self.holdings[symbol]
+        if not holding["quantity"]:
+            raise ValueError(f"cannot resize {symbol!r}: current quantity is zero")
+        factor = quantity / holding["quantity"] - 1.0
+        delta = {key: holding[key] * factor for key in ("value", "risk_value", "high_risk_value")}
+        for key, change in delta.items():
+            holding[key] += change
+        holding["quantity"] = quantity
+        self._apply(holding["sector"], delta["value"], delta["risk_value"], delta["high_risk_value"])
+
+    def apply(self, change: Dict[str, Any], action: str = "add") -> None:
+        """Apply an ``add``, ``remove`` or ``resize`` trade described by ``change``."""
+        if action == "add":
+            self.add(change)
+        elif action == "remove":
+            self.remove(change.get("symbol"))
+        elif action == "resize":
+            self.resize(change.get("symbol"), change.get("quantity", 0))
+        else:
+            raise ValueError(f"unknown action: {action!r}")
+
+    # ------------------------------------------------------------- metrics
+    @property
+    def portfolio_risk(self) -> float:
+        """Value-weighted risk score, as in ``calculate_weighted_portfolio_risk``."""
+        return self.risk_value / self.total_value if self.total_value else 0.0
+
+    def analysis(self) -> Dict[str, Any]:
+        """Return the :func:`analyze_portfolio` summary, without the correlation check."""
+        if not self.total_value:
+            return {
+                "high_risk_percentage": 0.0,
+                "sector_distribution": {},
+                "diversification_score": 0.0,
+                "suggestions": [],
+            }
+        total = self.total_value
+        sector_weights = {sector: value / total for sector, value in self.sector_values.items()}
+        high_risk_percentage = 100 * self.high_risk_value / total
+        diversification_score = 1 - sum(weight ** 2 for weight in sector_weights.values())
+        max_sector = max(sector_weights.items(), key=lambda x: x[1]) if sector_weights else (None, 0)
+        return {
+            "high_risk_percentage": high_risk_percentage,
+            "sector_distribution": sector_weights,
+            "diversification_score": diversification_score,
+            "suggestions": _suggestions(high_risk_percentage, max_sector, diversification_score),
+        }
+
+    def evaluate(self, candidates: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Score many independent candidate trades against the current state.
+
+        Each candidate is a position dict with an optional ``action``
+        (``add`` by default, ``remove`` or ``resize``). Every trade changes
+        the totals and exactly one sector, so all candidates are scored
+        together with array arithmetic; the state itself is not modified.
+
+        Returns
+        -------
+        dict
+            Arrays with one entry per candidate: ``portfolio_risk``,
+            ``risk_change``, ``high_risk_percentage``,
+            ``diversification_score`` and ``max_sector_weight``.
+        """
+        n = len(candidates)
+        sectors = list(self.sector_values)
+        sector_index = {sector: i for i, sector in enumerate(sectors)}
+        values = np.array([self.sector_values[s] for s in sectors] + [0.0])
+        new_sector = len(sectors)  # slot for sectors not yet in the portfolio
+
+        delta = np.zeros((3, n))  # value, risk_value, high_risk_value
+        sector_of = np.full(n, new_sector)
+        valid = np.ones(n, dtype=bool)
+        for i, change in enumerate(candidates):
+            action = change.get("action", "add")
+            symbol = change.get("symbol")
+            holding = self.holdings.get(symbol)
+            if action == "add":
+                value = change.get("quantity", 0) * change.get("price", 0.0)
+                risk = change.get("risk_score", 0.0)
+                delta[:, i] = value, risk * value, value if risk >= self.high_risk_threshold else 0.0
+                sector = holding["sector"] if holding else change.get("sector", "Unknown")
+            elif holding is None or (action == "resize" and not holding["quantity"]):
+                valid[i] = False
+                continue
+            else:
+                factor = -1.0 if action == "remove" else change.get("quantity", 0) / holding["quantity"] - 1.0
+                delta[:, i] = [holding[key] * factor for key in ("value", "risk_value", "high_risk_value")]
+                sector = holding["sector"]
+            sector_of[i] = sector_index.get(sector, new_sector)
+
+        total = self.total_value + delta[0]
+        changed = values[sector_of] + delta[0]
+        # Largest sector other than the changed one, from the top two values.
+        order = np.argsort(values[:-1])[::-1]
+        first = values[order[0]] if len(order) else 0.0
+        second = values[order[1]] if len(order) > 1 else 0.0
+        others_max = np.where(sector_of == (order[0] if len(order) else -1), second, first)
+        sum_sq = float(np.dot(values, values)) - values[sector_of] ** 2 + changed ** 2
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            nonzero = valid & (total != 0)
+            risk = np.where(nonzero, (self.risk_value + delta[1]) / total, 0.0)
+            high = np.where(nonzero, 100 * (self.high_risk_value + delta[2]) / total, 0.0)
+            diversification = np.where(nonzero, 1 - sum_sq / total ** 2, 0.0)
+            max_weight = np.where(nonzero, np.maximum(others_max, changed) / total, 0.0)
+
+        risk = np.where(valid, risk, np.nan)
+        return {
+            "portfolio_risk": risk,
+            "risk_change": risk - self.portfolio_risk,
+            "high_risk_percentage": np.where(valid, high, np.nan),
+            "diversification_score": np.where(valid, diversification, np.nan),
+            "max_sector_weight": np.where(valid, max_weight, np.nan),
+        }
 
 
 def simulate_portfolio_change(
@@ -113,57 +290,292 @@ def simulate_portfolio_change(
     action: str = "add",
     high_risk_threshold: float = 0.6,
 ) -> Dict[str, Any]:
-    """Simulate adding or removing a position and return updated risk metrics."""
-    new_positions = positions.copy()
-    if action == "add":
-        new_positions.append(change)
-    elif action == "remove":
-        new_positions = [p for p in new_positions if p.get("symbol") != change.get("symbol")]
+    """Simulate adding, removing or resizing a position and return updated risk metrics.
+
+    ``positions`` may also be a :class:`PortfolioState`, which is updated in
+    place so each what-if trade costs O(1); its analysis merges holdings by
+    symbol and skips the correlation check. A position list is still O(n)
+    per call: the totals are rebuilt and the analysis is
+    :func:`analyze_portfolio` of the changed list. Callers that try many
+    trades on one portfolio should keep a :class:`PortfolioState`.
+
+    An unknown ``action`` leaves the portfolio unchanged.
+    """
+    if isinstance(positions, PortfolioState):
+        state, new_positions = positions, None
+    else:
+        state = PortfolioState(positions, high_risk_threshold)
+        new_positions = list(positions)
+        if action == "add":
+            new_positions.append(change)
+        elif action == "remove":
+            new_positions = [p for p in new_positions if p.get("symbol") != change.get("symbol")]
+        elif action == "resize":
+            new_positions = [
+                dict(p, quantity=change.get("quantity", 0)) if p.get("symbol") == change.get("symbol") else p
+                for p in new_positions
+            ]
 
-    current = calculate_weighted_portfolio_risk(positions)
-    updated = calculate_weighted_portfolio_risk(new_positions)
+    old_risk = state.portfolio_risk
+    if action in ("add", "remove", "resize"):
+        state.apply(change, action)
+    new_risk = state.portfolio_risk
 
     suggestion = ""
-    if updated["portfolio_risk"] > current["portfolio_risk"]:
+    if new_risk > old_risk:
         suggestion = "Portfolio risk has increased."
-    elif updated["portfolio_risk"] < current["portfolio_risk"]:
+    elif new_risk < old_risk:
         suggestion = "Portfolio risk has decreased."
     else:
         suggestion = "Portfolio risk is unchanged."
 
-    analysis = analyze_portfolio(new_positions, high_risk_threshold)
+    if new_positions is None:
+        analysis = state.analysis()
+    else:
+        analysis = analyze_portfolio(new_positions, high_risk_threshold)
 
     return {
-        "new_risk": updated["portfolio_risk"],
-        "old_risk": current["portfolio_risk"],
-        "risk_change": updated["portfolio_risk"] - current["portfolio_risk"],
+        "new_risk": new_risk,
+        "old_risk": old_risk,
+        "risk_change": new_risk - old_risk,
         "analysis": analysis,
         "summary": suggestion,
     }
 
 
+def rank_candidates(
+    positions: List[Dict[str, Any]],
+    candidates: List[Dict[str, Any]],
+    high_risk_threshold: float = 0.6,
+    sort_by: str = "risk_change",
+    descending: bool = False,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Score candidate trades against one portfolio and return them ranked.
+
+    Candidates that cannot be applied (removing or resizing a symbol that is
+    not held) are listed last with an ``error``.
+    """
+    state = positions if isinstance(positions, PortfolioState) else PortfolioState(positions, high_risk_threshold)
+    scores = state.evaluate(candidates)
+    if sort_by not in scores:
+        raise ValueError(f"unknown sort key: {sort_by!r}")
+    key = scores[sort_by]
+    order = np.argsort(-key if descending else key, kind="stable")  # NaN sorts last
+
+    ranked = []
+    for i in order[:limit]:
+        entry = {"candidate": candidates[i]}
+        if np.isnan(scores["portfolio_risk"][i]):
+            entry["error"] = "Symbol not in portfolio"
+        else:
+            entry.update({name: float(values[i]) for name, values in scores.items()})
+        ranked.append(entry)
+    return ranked
+
+
+RISING_RISK_WARNING = (
+    "Your portfolio risk is expected to rise over the next few periods."
+    " Consider reducing high-risk holdings."
+)
+RISING_RISK_THRESHOLD = 0.1
+
+
+def _trend_fit(n: np.ndarray, sum_y: np.ndarray, sum_xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares slope and intercept of ``y`` on ``x = 0 .. n - 1`` from running sums.
+
+    The sums of ``x`` and ``x ** 2`` follow from ``n``, so three numbers per
+    series are enough. Series with fewer than two points get NaN.
+    """
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (sum_xy - (n - 1) / 2 * sum_y) / (n * (n * n - 1) / 12)
+        intercept = sum_y / n - slope * (n - 1) / 2
+    return slope, intercept
+
+
+def _trend_result(n, slope, intercept, last, forecast_periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(predictions, rising)`` for series of lengths ``n``."""
+    steps = np.asarray(n, dtype=np.float64)[:, None] + np.arange(forecast_periods)
+    predictions = slope[:, None] * steps + intercept[:, None]
+    final = predictions[:, -1] if forecast_periods else np.full(len(steps), np.nan)
+    with np.errstate(invalid="ignore"):
+        rising = final - last > RISING_RISK_THRESHOLD
+    return predictions, rising
+
+
+def _trend_dict(predictions: np.ndarray, rising: bool, n: int) -> Dict[str, Any]:
+    if n < 2:
+        return {"predictions": [], "warning": None}
+    return {"predictions": predictions.tolist(), "warning": RISING_RISK_WARNING if rising else None}
+
+
+def forecast_trends(
+    risks: np.ndarray, lengths: Optional[Sequence[int]] = None, forecast_periods: int = 5
+) -> Dict[str, np.ndarray]:
+    """Fit and extrapolate a linear trend for every row of a padded batch.
+
+    Parameters
+    ----------
+    risks : array_like
+        ``portfolios x periods`` risk scores. Row ``i`` holds its history in
+        the first ``lengths[i]`` columns; the padding after it is ignored.
+    lengths : sequence of int, optional
+        Length of each history, all rows are full when omitted.
+    forecast_periods : int, optional
+        Number of future periods to predict.
+
+    Returns
+    -------
+    dict
+        ``predictions`` (``portfolios x forecast_periods``), ``slope``,
+        ``last`` and ``rising``, which flags rows whose final prediction
+        exceeds the last risk by more than ``RISING_RISK_THRESHOLD``. Rows
+        with fewer than two points are NaN and never rising.
+    """
+    risks = np.asarray(risks, dtype=np.float64)
+    if risks.ndim != 2:
+        raise ValueError("risks must be a 2-D array")
+    rows, width = risks.shape
+    lengths = np.full(rows, width) if lengths is None else np.asarray(lengths, dtype=np.int64)
+    mask = np.arange(width) < lengths[:, None]
+    y = np.where(mask, risks, 0.0)
+    sum_y = y.sum(axis=1)
+    sum_xy = y @ np.arange(width, dtype=np.float64)
+    last = np.full(rows, np.nan)
+    filled = lengths > 0
+    last[filled] = risks[filled, lengths[filled] - 1]
+
+    slope, intercept = _trend_fit(lengths, sum_y, sum_xy)
+    predictions, rising = _trend_result(lengths, slope, intercept, last, forecast_periods)
+    return {"predictions": predictions, "slope": slope, "last": last, "rising": rising}
+
+
+def _risk_values(history: Sequence) -> Sequence[float]:
+    """Accept a history of ``(date, risk)`` pairs or of bare risk scores."""
+    if len(history) and isinstance(history[0], (list, tuple)):
+        return [risk for _, risk in history]
+    return history
+
+
+def predict_risk_trends(
+    histories: Sequence[Sequence], forecast_periods: int = 5, batch_size: int = 4096
+) -> List[Dict[str, Any]]:
+    """Run :func:`predict_risk_trend` for many histories at once.
+
+    Histories of different lengths are padded into ``batch_size`` rows at a
+    time and fitted together by :func:`forecast_trends`.
+    """
+    results: List[Dict[str, Any]] = []
+    for lo in range(0, len(histories), batch_size):
+        values = [_risk_values(history) for history in histories[lo:lo + batch_size]]
+        lengths = np.array([len(v) for v in values], dtype=np.int64)
+        padded = np.zeros((len(values), int(lengths.max(initial=0))))
+        rows = np.repeat(np.arange(len(values)), lengths)
+        columns = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        padded[rows, columns] = np.fromiter(chain.from_iterable(values), dtype=np.float64, count=len(rows))
+        batch = forecast_trends(padded, lengths, forecast_periods)
+        results.extend(
+            _trend_dict(batch["predictions"][i], batch["rising"][i], lengths[i]) for i in range(len(values))
+        )
+    return results
+
+
 def predict_risk_trend(
     risk_history: List[Tuple[str, float]], forecast_periods: int = 5
 ) -> Dict[str, Any]:
     """Predict portfolio risk trend using simple linear forecasting."""
-    if len(risk_history) < 2:
-        return {"predictions": [], "warning": None}
+    return predict_risk_trends([risk_history], forecast_periods)[0]
 
-    dates = np.arange(len(risk_history))
-    risks = np.array([r for _, r in risk_history])
-    coef = np.polyfit(dates, risks, 1)
-    future_dates = np.arange(len(risk_history), len(risk_history) + forecast_periods)
-    predictions = coef[0] * future_dates + coef[1]
-
-    warning = None
-    if predictions[-1] - risks[-1] > 0.1:
-        warning = (
-            "Your portfolio risk is expected to rise over the next few periods."
-            " Consider reducing high-risk holdings."
-        )
 
-    return {
-        "predictions": predictions.tolist(),
-        "warning": warning,
-    }
+class RiskTrendStream:
+    """Running least-squares trends of many portfolios' risk histories.
+
+    Each portfolio keeps its number of snapshots, the sum of its risks, the
+    sum of ``index * risk`` and its last risk, so :meth:`add` updates its
+    trend in O(1) and :meth:`forecast` gives the same result as
+    :func:`predict_risk_trend` over the full history.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._index: Dict[Any, int] = {}
+        self._keys: List[Any] = []
+        self._sums = np.zeros((4, max(capacity, 1)))  # n, sum_y, sum_xy, last
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def _slot(self, key) -> int:
+        slot = self._index.get(key)
+        if slot is None:
+            slot = self._index[key] = len(self._keys)
+            self._keys.append(key)
+            if slot >= self._sums.shape[1]:
+                self._sums = np.concatenate([self._sums, np.zeros_like(self._sums)], axis=1)
+        return slot
+
+    def add(self, key, risk: float) -> None:
+        """Append one risk snapshot to the history of portfolio ``key``."""
+        with self._lock:
+            slot = self._slot(key)
+            n = self._sums[0, slot]
+            self._sums[:, slot] += (1.0, risk, n * risk, 0.0)
+            self._sums[3, slot] = risk
+
+    def extend(self, key, history: Sequence) -> None:
+        """Append several snapshots (risks or ``(date, risk)`` pairs) to ``key``."""
+        values = np.asarray(_risk_values(history), dtype=np.float64)
+        if not len(values):
+            return
+        with self._lock:
+            slot = self._slot(key)
+            n = self._sums[0, slot]
+            self._sums[:, slot] += (len(values), values.sum(), (n + np.arange(len(values))) @ values, 0.0)
+            self._sums[3, slot] = values[-1]
+
+    def load(self, key, state: Sequence[float]) -> None:
+        """Set the running sums of ``key`` to a value saved by :meth:`state`."""
+        n, sum_y, sum_xy, last = (float(v) for v in state)
+        if n < 0 or n != int(n) or not np.isfinite([sum_y, sum_xy, last]).all():
+            raise ValueError(f"invalid trend state for {key!r}: {list(state)}")
+        with self._lock:
+            self._sums[:, self._slot(key)] = (n, sum_y, sum_xy, last)
+
+    def state(self, keys: Optional[Iterable] = None) -> Dict[Any, List[float]]:
+        """Return ``{key: [n, sum_y, sum_xy, last]}`` for ``keys`` (all by default)."""
+        with self._lock:
+            keys = list(self._keys) if keys is None else list(keys)
+            return {k: self._sums[:, self._index[k]].tolist() for k in keys if k in self._index}
+
+    def remove(self, key) -> None:
+        """Forget portfolio ``key``; its slot is reused by the next new portfolio."""
+        with self._lock:
+            slot = self._index.pop(key, None)
+            if slot is None:
+                return
+            # Move the last portfolio into the freed slot to keep the arrays dense.
+            last_key = self._keys.pop()
+            moved = len(self._keys)
+            if slot != moved:
+                self._keys[slot] = last_key
+                self._index[last_key] = slot
+                self._sums[:, slot] = self._sums[:, moved]
+            self._sums[:, moved] = 0.0
+
+    def forecast(self, keys: Optional[Iterable] = None, forecast_periods: int = 5) -> Dict[Any, Dict[str, Any]]:
+        """Return ``{key: predict_risk_trend result}`` for ``keys`` (all by default).
 
+        Unknown keys get an empty prediction.
+        """
+        with self._lock:
+            keys = list(self._keys) if keys is None else list(keys)
+            slots = np.array([self._index.get(k, -1) for k in keys], dtype=np.int64)
+            sums = np.where(slots >= 0, self._sums[:, np.maximum(slots, 0)], 0.0)
+        n, sum_y, sum_xy, last = sums
+        slope, intercept = _trend_fit(n, sum_y, sum_xy)
+        predictions, rising = _trend_result(n, slope, intercept, last, forecast_periods)
+        return {key: _trend_dict(predictions[i], rising[i], n[i]) for i, key in enumerate(keys)}
@@ -1,6 +1,7 @@
 """Utility functions for calculating portfolio risk."""
 
-from typing import Any, Dict, List
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
@@ -43,81 +44,311 @@ def calculate_weighted_portfolio_risk(positions: List[Dict[str, Any]]) -> Dict[s
 
 def value_at_risk(returns: List[float], confidence: float = 0.95) -> float:
     """Calculate the Value-at-Risk (VaR) for a list of returns."""
-    if not returns:
+    if not len(returns):
         return 0.0
-    percentile = np.percentile(returns, (1 - confidence) * 100)
-    return abs(percentile)
+    return abs(float(risk_measures(returns, confidence)["var"][0, 0]))
 
 
 def conditional_value_at_risk(returns: List[float], confidence: float = 0.95) -> float:
     """Calculate the Conditional VaR (Expected Shortfall)."""
-    if not returns:
+    if not len(returns):
         return 0.0
-    var_threshold = np.percentile(returns, (1 - confidence) * 100)
-    tail_losses = [r for r in returns if r <= var_threshold]
-    if not tail_losses:
-        return 0.0
-    return abs(float(np.mean(tail_losses)))
+    return abs(float(risk_measures(returns, confidence)["cvar"][0, 0]))
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linear interpolation computed like ``np.percentile`` does."""
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def _quantiles(tail: np.ndarray, n_obs: int, levels: np.ndarray) -> np.ndarray:
+    """Return ``(P, C)`` empirical quantiles from each row's smallest values.
+
+    ``tail`` holds at least the ``floor((n_obs - 1) * q) + 2`` smallest
+    observations of every row for each tail probability ``q`` in ``levels``.
+    """
+    tail = np.sort(tail, axis=1)
+    pos = (n_obs - 1) * levels
+    lower = np.floor(pos).astype(int)
+    upper = np.minimum(lower + 1, n_obs - 1)
+    return _lerp(tail[:, lower], tail[:, upper], pos - lower)
+
+
+def _tail_mean(values: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+    """Mean of the values at or below each quantile, shape ``(P, C)``."""
+    means = np.empty_like(quantiles)
+    for j in range(quantiles.shape[1]):
+        in_tail = values <= quantiles[:, j:j + 1]
+        means[:, j] = np.where(in_tail, values, 0.0).sum(axis=1) / np.maximum(in_tail.sum(axis=1), 1)
+    return means
+
+
+def _tail_size(n_obs: int, levels: np.ndarray) -> int:
+    return int(min(n_obs, np.floor((n_obs - 1) * levels.max()) + 2))
+
+
+def _smallest(values: np.ndarray, k: int) -> np.ndarray:
+    """Partial sort: the ``k`` smallest values of each row, unordered."""
+    if k >= values.shape[1]:
+        return values
+    return np.partition(values, k - 1, axis=1)[:, :k]
+
+
+def risk_measures(
+    returns: Optional[Sequence] = None,
+    confidence: Union[float, Sequence[float]] = 0.95,
+    method: str = "historical",
+    weights: Optional[Sequence] = None,
+    asset_returns: Optional[Sequence[Sequence[float]]] = None,
+    n_simulations: int = 10000,
+    chunk_size: int = 2000,
+    seed: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """Compute VaR and CVaR for many portfolios and confidence levels at once.
+
+    Parameters
+    ----------
+    returns : array-like, optional
+        Portfolio return series, one series or ``P x T`` for ``P``
+        portfolios. Not needed when ``weights`` and ``asset_returns`` are given.
+    confidence : float or sequence of float
+        Confidence levels, e.g. ``[0.95, 0.99]``.
+    method : {"historical", "parametric", "monte_carlo"}
+        ``historical`` uses empirical quantiles found with partial sorts,
+        ``parametric`` assumes normal returns, and ``monte_carlo`` simulates
+        normal returns with the estimated mean and covariance.
+    weights : array-like, optional
+        ``P x n`` (or length ``n``) asset weights applied to ``asset_returns``.
+    asset_returns : array-like, optional
+        ``n x T`` asset return series, aligned on their shortest common tail.
+    n_simulations, chunk_size, seed : int, optional
+        Monte Carlo settings. Simulations run ``chunk_size`` at a time and
+        only the worst ``(1 - min(confidence)) * n_simulations`` draws of each
+        portfolio are kept between chunks, so memory is ``P`` times
+        ``chunk_size`` plus that tail rather than ``P x n_simulations``.
+        ``n_simulations`` and ``chunk_size`` must be at least 1.
+
+    Returns
+    -------
+    dict
+        ``var`` and ``cvar`` arrays of shape ``(P, C)``, reported as positive
+        losses, and the ``confidence`` levels.
+    """
+    levels = 1 - np.atleast_1d(np.asarray(confidence, dtype=np.float64))
+    if np.any((levels <= 0) | (levels >= 1)):
+        raise ValueError("confidence levels must be between 0 and 1")
+    if method == "monte_carlo" and (n_simulations < 1 or chunk_size < 1):
+        raise ValueError("n_simulations and chunk_size must be at least 1")
+
+    assets = None
+    if asset_returns is not None:
+        assets = _aligned_returns(asset_returns, np.float64)
+        w = np.atleast_2d(np.asarray(weights if weights is not None else np.ones(len(assets)) / len(assets), dtype=np.float64))
+        portfolio = w @ assets
+    elif isinstance(returns, np.ndarray) or (returns is not None and len(returns) and np.ndim(returns[0]) == 0):
+        portfolio = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    else:
+        portfolio = _aligned_returns(returns, np.float64)
+
+    n_obs = portfolio.shape[1]
+    if n_obs == 0:
+        empty = np.zeros((portfolio.shape[0], len(levels)))
+        return {"var": empty, "cvar": empty.copy(), "confidence": 1 - levels}
+
+    if method == "historical":
+        quantiles = _quantiles(_smallest(portfolio, _tail_size(n_obs, levels)), n_obs, levels)
+        var, cvar = -quantiles, -_tail_mean(portfolio, quantiles)
+    elif method == "parametric":
+        mu = portfolio.mean(axis=1, keepdims=True)
+        sigma = portfolio.std(axis=1, ddof=1, keepdims=True) if n_obs > 1 else np.zeros_like(mu)
+        z = np.array([NormalDist().inv_cdf(q) for q in levels])
+        density = np.exp(-0.5 * z ** 2) / np.sqrt(2 * np.pi)
+        var = -(mu + sigma * z)
+        cvar = -(mu - sigma * density / levels)
+    elif method == "monte_carlo":
+        rng = np.random.default_rng(seed)
+        keep = _tail_size(n_simulations, levels)
+        if assets is not None:
+            mean = assets.mean(axis=1)
+            cov = np.atleast_2d(np.cov(assets))
+            eigvals, eigvecs = np.linalg.eigh(cov)
+            factor = eigvecs * np.sqrt(np.clip(eigvals, 0, None))
+            loadings = w @ factor
+            offset = (w @ mean)[:, None]
+        else:
+            loadings = portfolio.std(axis=1, ddof=1)[:, None] if n_obs > 1 else np.zeros((len(portfolio), 1))
+            offset = portfolio.mean(axis=1)[:, None]
+        tail = np.empty((len(offset), 0))
+        for start in range(0, n_simulations, chunk_size):
+            draws = rng.standard_normal((loadings.shape[1], min(chunk_size, n_simulations - start)))
+            simulated = offset + loadings @ draws
+            tail = _smallest(np.concatenate([tail, simulated], axis=1), keep)
+        quantiles = _quantiles(tail, n_simulations, levels)
+        var, cvar = -quantiles, -_tail_mean(tail, quantiles)
+    else:
+        raise ValueError(f"unknown method: {method}")
 
+    return {"var": var, "cvar": cvar, "confidence": 1 - levels}
 
-def calculate_portfolio_risk_advanced(positions: List[Dict[str, Any]]) -> Dict[str, Any]:
+
+def _aligned_returns(returns: Sequence[Sequence[float]], dtype) -> np.ndarray:
+    """Stack return series into an ``n x T`` array, keeping the shortest common tail."""
+    if isinstance(returns, np.ndarray) and returns.ndim == 2:
+        return returns.astype(dtype, copy=False)
+    min_len = min(len(r) for r in returns)
+    if min_len == 0:
+        return np.empty((len(returns), 0), dtype=dtype)
+    return np.array([r[-min_len:] for r in returns], dtype=dtype)
+
+
+def _correlation_matvec(returns: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Return ``C @ x`` where ``C = corrcoef(returns)``, without forming ``C``.
+
+    Uses ``C = Z Z^T / (T - 1)`` with standardized returns ``Z``, so memory is
+    ``O(n * T)`` instead of ``O(n^2)``. Series with zero variance are treated
+    as uncorrelated with everything else.
+    """
+    n_obs = returns.shape[1]
+    if n_obs < 2:
+        return x.copy()
+    centered = returns - returns.mean(axis=1, keepdims=True)
+    std = centered.std(axis=1, ddof=1, keepdims=True)
+    flat = (std == 0).ravel()
+    std[flat] = 1
+    z = centered / std
+    z[flat] = 0
+    result = z @ (z.T @ x) / (n_obs - 1)
+    result[flat] = x[flat]
+    return result
+
+
+def portfolio_risk_decomposition(
+    weights: Sequence[float],
+    volatilities: Optional[Sequence[float]] = None,
+    returns: Optional[Sequence[Sequence[float]]] = None,
+    covariance: Optional[Sequence[Sequence[float]]] = None,
+    dtype: Any = np.float64,
+) -> Dict[str, Any]:
+    """Compute portfolio variance ``w·Σ·w`` and per-position risk contributions.
+
+    Parameters
+    ----------
+    weights : array-like
+        Position weights.
+    volatilities : array-like, optional
+        Per-position volatilities. Required unless ``covariance`` is given.
+    returns : array-like, optional
+        Per-position return series. Their correlation matrix is combined with
+        ``volatilities`` into ``Σ = D·C·D``; without returns ``C`` is the
+        identity. Series are aligned on their shortest common tail.
+    covariance : array-like, optional
+        Precomputed covariance matrix ``Σ``. Takes precedence over
+        ``volatilities`` and ``returns``.
+    dtype : numpy dtype, optional
+        Use ``np.float32`` to halve memory for very large portfolios.
+
+    Returns
+    -------
+    dict
+        ``variance`` and ``volatility`` of the portfolio, the ``marginal``
+        contribution ``dσ/dw`` of each position and its ``component``
+        contribution ``w·dσ/dw``. Components sum to ``volatility``.
+    """
+    w = np.asarray(weights, dtype=dtype)
+    if covariance is not None:
+        sigma_w = np.asarray(covariance, dtype=dtype) @ w
+    else:
+        vol = np.asarray(volatilities, dtype=dtype)
+        scaled = vol * w
+        if returns is not None and len(returns):
+            scaled = _correlation_matvec(_aligned_returns(returns, dtype), scaled)
+        sigma_w = vol * scaled
+
+    variance = max(float(w @ sigma_w), 0.0)
+    volatility = variance ** 0.5
+    if volatility > 0:
+        marginal = sigma_w / volatility
+    else:
+        marginal = np.zeros_like(w)
+    return {
+        "variance": variance,
+        "volatility": volatility,
+        "marginal": marginal,
+        "component": w * marginal,
+    }
+
+
+def calculate_portfolio_risk_advanced(
+    positions: List[Dict[str, Any]],
+    covariance: Optional[Sequence[Sequence[float]]] = None,
+    include_contributions: bool = False,
+    dtype: Any = np.float64,
+    covariance_service: Any = None,
+    shrinkage: Any = None,
+) -> Dict[str, Any]:
     """Estimate portfolio risk using weights, volatility and correlations.
 
     Each position dictionary may include ``volatility`` (daily standard
     deviation of returns), ``beta`` and a list of ``returns`` for optional
-    correlation calculations.
+    correlation calculations. A precomputed ``covariance`` matrix, ordered
+    like ``positions``, replaces volatilities and correlations.
+
+    With a :class:`~covariance_service.CovarianceService`, positions without
+    ``returns`` are looked up by ``symbol``: correlations come from the
+    date-aligned stored histories (optionally ``shrinkage``-adjusted) and
+    measured volatilities fill in where a position gives none.
 
     The resulting risk score combines weighted portfolio volatility and
-    average beta as a simple proxy for systematic risk.
+    average beta as a simple proxy for systematic risk. With
+    ``include_contributions`` the per-position marginal and component risk
+    contributions are returned as well.
     """
 
     if not positions:
         return {"portfolio_risk": 0.0, "weighted_beta": 0.0}
 
-    values = [pos.get("quantity", 0) * pos.get("price", 0.0) for pos in positions]
-    total_value = float(sum(values))
+    values = np.array([pos.get("quantity", 0) * pos.get("price", 0.0) for pos in positions], dtype=np.float64)
+    total_value = float(values.sum())
 
     if total_value == 0:
         return {"portfolio_risk": 0.0, "weighted_beta": 0.0}
 
-    weights = [v / total_value for v in values]
+    weights = values / total_value
     volatilities = [pos.get("volatility", 0.0) for pos in positions]
-    betas = [pos.get("beta", 1.0) for pos in positions]
+    betas = np.array([pos.get("beta", 1.0) for pos in positions], dtype=np.float64)
     returns = [pos.get("returns") for pos in positions if pos.get("returns")]
 
-    # Correlation matrix if returns are provided
-    if len(returns) == len(positions):
-        min_len = min(len(r) for r in returns)
-        aligned = [r[-min_len:] for r in returns]
-        corr_matrix = list(
-            map(list, (  # type: ignore[list-item]
-                __import__("numpy").corrcoef(aligned)
-            ))
+    # Correlations are only used when every position provides returns
+    if covariance is None and covariance_service is not None and len(returns) < len(positions):
+        given = [pos.get("volatility", np.nan) for pos in positions]
+        covariance = covariance_service.covariance(
+            [pos.get("symbol") for pos in positions], shrinkage=shrinkage, volatilities=given
         )
-    else:
-        corr_matrix = [[1.0 if i == j else 0.0 for j in range(len(positions))] for i in range(len(positions))]
-
-    # Portfolio variance
-    port_var = 0.0
-    for i in range(len(positions)):
-        for j in range(len(positions)):
-            port_var += (
-                weights[i]
-                * weights[j]
-                * volatilities[i]
-                * volatilities[j]
-                * corr_matrix[i][j]
-            )
-
-    weighted_beta = sum(w * b for w, b in zip(weights, betas))
+    decomposition = portfolio_risk_decomposition(
+        weights,
+        volatilities=volatilities,
+        returns=returns if len(returns) == len(positions) else None,
+        covariance=covariance,
+        dtype=dtype,
+    )
+    port_vol = decomposition["volatility"]
+
+    weighted_beta = float(weights @ betas)
     # Simple risk score scaled between 0 and 1
-    risk_score = min(1.0, (port_var ** 0.5) * 0.5 + weighted_beta * 0.5)
+    risk_score = min(1.0, port_vol * 0.5 + weighted_beta * 0.5)
 
-    return {
+    result = {
         "portfolio_risk": risk_score,
         "weighted_beta": weighted_beta,
-        "portfolio_volatility": port_var ** 0.5,
+        "portfolio_volatility": port_vol,
     }
+    if include_contributions:
+        result["risk_contributions"] = [
+            {"symbol": pos.get("symbol"), "marginal": float(m), "component": float(c)}
+            for pos, m, c in zip(positions, decomposition["marginal"], decomposition["component"])
+        ]
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,300 @@
+"""Date-aligned, memory-mapped store of daily closing prices.
+
+The store keeps one ``dates x symbols`` float64 matrix in a raw binary file
+that readers memory-map, so loading the whole universe costs no parsing and
+worker processes share the same pages. Layout of the store directory::
+
+    meta.json              symbols, row count, current generation and a
+                           per-symbol write counter
+    dates.<gen>.npy        int64 days since epoch, one per row
+    closes.<gen>.f64       row-major float64 matrix, NaN where no price
+
+New trading days are appended in place. Changes that need new columns or
+rows in the middle (a new symbol, older history) rewrite the matrix into a
+new generation and switch ``meta.json`` atomically.
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from lazy_import import lazy_import
+
+pd = lazy_import("pandas")
+
+META_FILE = "meta.json"
+
+
+def _to_days(dates: Iterable) -> np.ndarray:
+    return pd.to_datetime(pd.Index(dates)).values.astype("datetime64[D]").astype(np.int64)
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        write(fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class PriceStore:
+    """Read and write the closing-price panel stored under ``root``.
+
+    Any number of processes may read the store; writes must come from a
+    single process at a time.
+    """
+
+    def __init__(self, root: str = "data/store") -> None:
+        self.root = root
+        self._lock = threading.Lock()
+        self._meta_signature: Optional[Tuple[int, int, int]] = None
+        self._meta: Dict = {}
+        self._dates = np.empty(0, dtype=np.int64)
+        self._closes = np.empty((0, 0))
+        self._index: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------ read
+    def _meta_path(self) -> str:
+        return os.path.join(self.root, META_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._meta_path())
+
+    def _refresh(self) -> None:
+        """Reopen the memory map if another process changed the store."""
+        try:
+            st = os.stat(self._meta_path())
+        except FileNotFoundError:
+            self._meta_signature = None
+            self._meta, self._index = {}, {}
+            self._dates = np.empty(0, dtype=np.int64)
+            self._closes = np.empty((0, 0))
+            return
+        # meta.json is replaced on every write, so a new inode marks a new
+        # version even when the mtime is too coarse to tell two writes apart.
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature == self._meta_signature:
+            return
+        with open(self._meta_path()) as fh:
+            meta = json.load(fh)
+        n_dates, symbols, gen = meta["n_dates"], meta["symbols"], meta["generation"]
+        dates = np.load(os.path.join(self.root, f"dates.{gen}.npy"))[:n_dates]
+        if n_dates and symbols:
+            closes = np.memmap(
+                os.path.join(self.root, f"closes.{gen}.f64"),
+                dtype=np.float64,
+                mode="r",
+                shape=(n_dates, len(symbols)),
+            )
+        else:
+            closes = np.empty((n_dates, len(symbols)))
+        self._meta, self._dates, self._closes = meta, dates, closes
+        self._index = {s: i for i, s in enumerate(symbols)}
+        self._meta_signature = signature
+
+    @property
+    def symbols(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._meta.get("symbols", []))
+
+    def __contains__(self, symbol: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return symbol in self._index
+
+    def _row_slice(self, start, end) -> slice:
+        lo = 0 if start is None else int(np.searchsorted(self._dates, _to_days([start])[0], "left"))
+        hi = len(self._dates) if end is None else int(np.searchsorted(self._dates, _to_days([end])[0], "right"))
+        return slice(lo, hi)
+
+    def panel(self, start=None, end=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(dates, closes)`` for every symbol without copying.
+
+        ``closes`` is a read-only ``dates x symbols`` view; use ``closes.T`` for
+        the ``symbols x dates`` layout expected by :mod:`indicators`.
+        """
+        with self._lock:
+            self._refresh()
+            rows = self._row_slice(start, end)
+            return self._dates[rows].astype("datetime64[D]"), self._closes[rows]
+
+    def series(self, symbol: str, start=None, end=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(dates, closes)`` for one symbol without copying.
+
+        Raises ``KeyError`` if the symbol is not stored.
+        """
+        with self._lock:
+            self._refresh()
+            col = self._index[symbol]
+            rows = self._row_slice(start, end)
+            return self._dates[rows].astype("datetime64[D]"), self._closes[rows, col]
+
+    def frame(self, symbol: str) -> "pd.DataFrame":
+        """Return a ``date``/``close`` DataFrame like the legacy history CSVs."""
+        dates, closes = self.series(symbol)
+        mask = ~np.isnan(closes)
+        return pd.DataFrame({
+            "date": pd.to_datetime(dates[mask]).strftime("%Y-%m-%d"),
+            "close": closes[mask],
+        })
+
+    @property
+    def signature(self) -> Optional[Tuple[int, int, int]]:
+        """Return a value that changes whenever any price in the store changes."""
+        with self._lock:
+            self._refresh()
+            return self._meta_signature
+
+    def version(self, symbol: str) -> Optional[Tuple[int, int]]:
+        """Return a value that changes whenever the symbol's prices change.
+
+        The generation covers rewrites that move rows; the symbol's write
+        counter covers in-place appends and corrections of past closes.
+        """
+        with self._lock:
+            self._refresh()
+            if symbol not in self._index:
+                return None
+            return self._meta["generation"], self._meta.get("writes", {}).get(symbol, 0)
+
+    def last_date(self, symbol: Optional[str] = None):
+        """Return the last stored date, overall or for one symbol, or ``None``."""
+        with self._lock:
+            self._refresh()
+            if symbol is None:
+                return self._dates[-1].astype("datetime64[D]") if len(self._dates) else None
+            if symbol not in self._index:
+                return None
+            last = self._meta["last_valid"][symbol]
+            return self._dates[last].astype("datetime64[D]") if last >= 0 else None
+
+    # ----------------------------------------------------------------- write
+    def write(self, updates: Dict[str, "pd.Series"]) -> None:
+        """Merge closing prices into the store.
+
+        Parameters
+        ----------
+        updates : dict
+            Maps symbol to a Series of closes indexed by date. Existing values
+            on the same dates are overwritten.
+        """
+        updates = {s: v.dropna() for s, v in updates.items()}
+        updates = {s: v for s, v in updates.items() if len(v)}
+        if not updates:
+            return
+        with self._lock:
+            self._refresh()
+            days = {s: _to_days(v.index) for s, v in updates.items()}
+            incoming = np.unique(np.concatenate(list(days.values())))
+            last = self._dates[-1] if len(self._dates) else None
+            known_symbols = all(s in self._index for s in updates)
+            old_days = incoming if last is None else incoming[incoming <= last]
+            rows_exist = np.isin(old_days, self._dates).all()
+            if self.exists() and known_symbols and rows_exist:
+                self._append(incoming[incoming > last] if last is not None else incoming, updates, days)
+            else:
+                self._rewrite(incoming, updates, days)
+            self._meta_signature = None
+            self._refresh()
+
+    def _write_meta(self, meta: Dict) -> None:
+        _atomic_write(self._meta_path(), lambda fh: fh.write(json.dumps(meta).encode()))
+
+    def _last_valid(self, closes: np.ndarray, symbols: List[str]) -> Dict[str, int]:
+        valid = ~np.isnan(closes)
+        has_any = valid.any(axis=0)
+        last = closes.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+        return {s: int(last[i]) if has_any[i] else -1 for i, s in enumerate(symbols)}
+
+    def _append(self, new_days: np.ndarray, updates, days) -> None:
+        meta = dict(self._meta)
+        gen, symbols = meta["generation"], meta["symbols"]
+        n_old = meta["n_dates"]
+        closes_path = os.path.join(self.root, f"closes.{gen}.f64")
+        dates = np.concatenate([self._dates, new_days])
+
+        tail = np.full((len(new_days), len(symbols)), np.nan)
+        with open(closes_path, "r+b") as fh:
+            fh.truncate(n_old * len(symbols) * 8)  # drop bytes of an interrupted append
+            fh.seek(0, os.SEEK_END)
+            fh.write(tail.tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        closes = np.memmap(closes_path, dtype=np.float64, mode="r+", shape=(len(dates), len(symbols)))
+        last_valid = dict(meta["last_valid"])
+        writes = dict(meta.get("writes", {}))
+        for symbol, series in updates.items():
+            col = self._index[symbol]
+            rows = np.searchsorted(dates, days[symbol])
+            closes[rows, col] = series.to_numpy(dtype=np.float64)
+            last_valid[symbol] = max(last_valid[symbol], int(rows.max()))
+            writes[symbol] = writes.get(symbol, 0) + 1
+        closes.flush()
+        del closes
+
+        _atomic_write(os.path.join(self.root, f"dates.{gen}.npy"), lambda fh: np.save(fh, dates))
+        meta.update(n_dates=len(dates), last_valid=last_valid, writes=writes)
+        self._write_meta(meta)
+
+    def _rewrite(self, incoming: np.ndarray, updates, days) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        old_symbols = list(self._meta.get("symbols", []))
+        symbols = old_symbols + sorted(s for s in updates if s not in self._index)
+        dates = np.union1d(self._dates, incoming)
+
+        closes = np.full((len(dates), len(symbols)), np.nan)
+        if len(self._dates) and old_symbols:
+            closes[np.searchsorted(dates, self._dates), : len(old_symbols)] = self._closes
+        col_of = {s: i for i, s in enumerate(symbols)}
+        for symbol, series in updates.items():
+            closes[np.searchsorted(dates, days[symbol]), col_of[symbol]] = series.to_numpy(dtype=np.float64)
+
+        writes = dict(self._meta.get("writes", {}))
+        for symbol in updates:
+            writes[symbol] = writes.get(symbol, 0) + 1
+        old_gen = self._meta.get("generation")
+        gen = 0 if old_gen is None else old_gen + 1
+        _atomic_write(os.path.join(self.root, f"closes.{gen}.f64"), lambda fh: fh.write(closes.tobytes()))
+        _atomic_write(os.path.join(self.root, f"dates.{gen}.npy"), lambda fh: np.save(fh, dates))
+        self._write_meta({
+            "generation": gen,
+            "symbols": symbols,
+            "n_dates": len(dates),
+            "last_valid": self._last_valid(closes, symbols),
+            "writes": writes,
+        })
+        if old_gen is not None:
+            # Readers that still map the old files keep working after unlink.
+            for name in (f"closes.{old_gen}.f64", f"dates.{old_gen}.npy"):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+
+
+def import_csv_dir(csv_dir: str = "data/csv", root: str = "data/store") -> PriceStore:
+    """Load every ``{symbol}_history.csv`` in ``csv_dir`` into the store at ``root``."""
+    updates = {}
+    for path in sorted(glob.glob(os.path.join(csv_dir, "*_history.csv"))):
+        symbol = os.path.basename(path)[: -len("_history.csv")]
+        df = pd.read_csv(path).dropna(subset=["date", "close"])
+        updates[symbol] = df.drop_duplicates("date", keep="last").set_index("date")["close"]
+    store = PriceStore(root)
+    store.write(updates)
+    return store
+
+
+if __name__ == "__main__":
+    csv_dir = sys.argv[1] if len(sys.argv) > 1 else "data/csv"
+    root = sys.argv[2] if len(sys.argv) > 2 else "data/store"
+    store = import_csv_dir(csv_dir, root)
+    dates, closes = store.panel()
+    print(f"[✓] {len(store.symbols)} sembol, {len(dates)} gün → {root}")
@@ -0,0 +1,124 @@
+"""Memoized JSON responses keyed by a canonical hash of the request.
+
+Deterministic endpoints compute the same response for the same body and
+model version. :meth:`ResponseCache.key` hashes a canonical form of both;
+the hash doubles as the response ``ETag``, so a client that sends it back in
+``If-None-Match`` can be answered with 304 before any work is done.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def quantize_floats(obj: Any, digits: int) -> Any:
+    """Round every float in ``obj`` to ``digits`` significant digits."""
+    if isinstance(obj, float):
+        return float(f"{obj:.{digits}g}")
+    if isinstance(obj, dict):
+        return {k: quantize_floats(v, digits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [quantize_floats(v, digits) for v in obj]
+    return obj
+
+
+def canonical_json(obj: Any) -> str:
+    """Serialize ``obj`` with sorted keys and no whitespace."""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ResponseCache:
+    """Bounded LRU of response bodies with a time-to-live.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum number of stored responses; the least recently used is
+        dropped first.
+    ttl : float, optional
+        Seconds a stored response stays valid.
+    quantize : int, optional
+        When set, floats in the request are rounded to this many significant
+        digits before hashing, so nearly identical requests share an entry.
+    clock : callable, optional
+        Time source, ``time.monotonic`` by default.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 300.0,
+        quantize: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.quantize = quantize
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def key(self, payload: Any, version: Any = None) -> str:
+        """Return the cache key and ETag for ``payload`` under ``version``."""
+        if self.quantize is not None:
+            payload = quantize_floats(payload, self.quantize)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(canonical_json([version, payload]).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored body for ``key`` or ``None`` if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self._clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "not_modified": self.not_modified,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,180 +1,1023 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, make_response, request, jsonify
 from flask_cors import CORS
-import joblib
-import pandas as pd
+import functools
+import logging
 import os
-from portfolio_analysis import analyze_portfolio
-from portfolio_risk import calculate_portfolio_risk_advanced
+import random
+import threading
+import time
 
-# SHAP (optional)
-try:
-    import shap  # type: ignore
-except Exception:  # pragma: no cover - optional dependency
-    shap = None
+import numpy as np
+
+import indicators
+import market_beta
+from covariance_service import CovarianceService
+from lazy_import import lazy_import, optional_import, preload
+from metrics import Registry
+from model_cache import ModelCache
+from model_registry import POOLED_SYMBOL, ModelRegistry
+from portfolio_analysis import RiskTrendStream, analyze_portfolio, predict_risk_trends, rank_candidates
+from portfolio_risk import calculate_portfolio_risk_advanced, calculate_weighted_portfolio_risk, risk_measures
+from price_store import PriceStore
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from tree_inference import compile_model
+from universe_scores import ScoreTable, file_signature, model_symbols
+
+# Heavy libraries are imported on the first request that needs them so the
+# API starts quickly; set RISK_API_EAGER_IMPORTS=1 (or call warm_up) to load
+# them at start-up instead.
+joblib = lazy_import("joblib")
+pd = lazy_import("pandas")
+HEAVY_MODULES = ("pandas", "joblib", "sklearn.ensemble")
+
+
+def load_shap():
+    """Return the ``shap`` module, imported on first use, or ``None`` if it is not installed."""
+    return optional_import("shap")
+
+
+def preload_imports(explainers=True):
+    """Import the heavy libraries now; returns the seconds each import took."""
+    return preload(HEAVY_MODULES + (("shap",) if explainers else ()))
+
+
+if os.getenv("RISK_API_EAGER_IMPORTS", "0") == "1":
+    preload_imports()
 
 app = Flask(__name__)
 CORS(app)
 
 MODEL_DIR = "data/models"
 CSV_DIR = "data/csv"
+PRICE_STORE = PriceStore(os.getenv("PRICE_STORE_DIR", "data/store"))
+COVARIANCE_SERVICE = CovarianceService(PRICE_STORE, window=int(os.getenv("COVARIANCE_WINDOW", "252")))
+FEATURE_COLUMNS = ["rsi", "sma_20", "volatility", "beta"]
+MARKET_SYMBOL = "SPY"
+# "symbol" serves per-ticker models only, "pooled" serves every symbol from
+# the cross-symbol model, "auto" prefers a symbol's own model and falls back
+# to the pooled one.
+MODEL_MODE = os.getenv("RISK_MODEL_MODE", "auto")
+
+log = logging.getLogger("risk_api")
+# Fraction of requests whose payload and result are logged (0 disables).
+DEBUG_SAMPLE_RATE = float(os.getenv("RISK_API_DEBUG_SAMPLE_RATE", "0"))
+
+METRICS = Registry()
+REQUEST_SECONDS = METRICS.histogram(
+    "risk_api_request_seconds", "Request latency by route.", ["route", "method", "status"]
+)
+STAGE_SECONDS = METRICS.histogram(
+    "risk_api_stage_seconds",
+    "Time spent in model_load, compile, shap_build, features, predict and shap.",
+    ["stage"],
+)
+SYMBOL_ERRORS = METRICS.counter(
+    "risk_api_symbol_errors_total", "Failed rows by symbol and HTTP status.", ["symbol", "status"], max_series=500
+)
+
+
+def _debug_sample(message, *args):
+    """Log ``message`` for a ``DEBUG_SAMPLE_RATE`` fraction of calls."""
+    if DEBUG_SAMPLE_RATE and random.random() < DEBUG_SAMPLE_RATE:
+        log.info(message, *args)
+
+
+def _load_model_file(path):
+    with STAGE_SECONDS.time(stage="model_load"):
+        return joblib.load(path)
+
+
+MODEL_CACHE = ModelCache(max_size=int(os.getenv("MODEL_CACHE_SIZE", "64")), loader=_load_model_file)
+
+for _stat in ("hits", "misses", "evictions", "invalidations", "derived_hits", "derived_misses",
+              "load_joins", "derived_joins"):
+    METRICS.gauge(
+        f"risk_api_model_cache_{_stat}", f"Model cache {_stat.replace('_', ' ')} since start.",
+        lambda stat=_stat: MODEL_CACHE.stats()[stat],
+    )
+METRICS.gauge("risk_api_model_cache_hit_rate", "Model cache hit rate.", lambda: MODEL_CACHE.stats()["hit_rate"])
+METRICS.gauge("risk_api_model_cache_size", "Models held in the cache.", lambda: MODEL_CACHE.stats()["size"])
+
+# Concurrent predictions of the same model on the same rows run once.
+PREDICTIONS = SingleFlight()
+METRICS.gauge(
+    "risk_api_predict_joins", "Predict calls that joined an identical in-flight call since start.",
+    lambda: PREDICTIONS.stats()["joined"],
+)
+
+_quantize = os.getenv("RESPONSE_CACHE_QUANTIZE")
+RESPONSE_CACHE = ResponseCache(
+    max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "300")),
+    quantize=int(_quantize) if _quantize else None,
+)
+# Part of every response cache key; bump when a memoized route's output changes.
+RESPONSE_VERSION = 1
+
+for _stat in ("hits", "misses", "expired", "evictions", "not_modified"):
+    METRICS.gauge(
+        f"risk_api_response_cache_{_stat}", f"Response cache {_stat.replace('_', ' ')} since start.",
+        lambda stat=_stat: RESPONSE_CACHE.stats()[stat],
+    )
+METRICS.gauge("risk_api_response_cache_hit_rate", "Response cache hit rate.", lambda: RESPONSE_CACHE.stats()["hit_rate"])
+
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _observe_latency(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start, route=route, method=request.method, status=response.status_code
+        )
+    return response
+
+
+MODEL_REGISTRY = ModelRegistry(MODEL_DIR)
+MODEL_REGISTRY.refresh()
+
+
+def model_path(symbol):
+    """Return the active model file of ``symbol``.
+
+    Registered symbols resolve from the in-memory registry; others fall back
+    to the unversioned ``{symbol}_risk_model.pkl`` file.
+    """
+    entry = MODEL_REGISTRY.active(symbol)
+    if entry is not None:
+        return entry["path"]
+    return os.path.join(MODEL_DIR, f"{symbol}_risk_model.pkl")
+
+
+def _has_own_model(symbol):
+    if MODEL_REGISTRY.active(symbol) is not None:
+        return True
+    return os.path.exists(os.path.join(MODEL_DIR, f"{symbol}_risk_model.pkl"))
+
+
+def model_key(symbol):
+    """Return the name of the model that scores ``symbol`` under ``MODEL_MODE``."""
+    if MODEL_MODE == "symbol" or MODEL_REGISTRY.active(POOLED_SYMBOL) is None:
+        return symbol
+    if MODEL_MODE == "auto" and _has_own_model(symbol):
+        return symbol
+    return POOLED_SYMBOL
+
+
+def model_features(symbol):
+    """Return the feature columns the active model of ``symbol`` expects."""
+    entry = MODEL_REGISTRY.active(symbol)
+    if entry is not None and entry.get("features"):
+        return entry["features"]
+    return FEATURE_COLUMNS
+
+
+def _cached(symbol, name=None, factory=None):
+    # Registry files never change once published, so skip the per-request stat.
+    immutable = MODEL_REGISTRY.active(symbol) is not None
+    try:
+        if name is None:
+            return MODEL_CACHE.get(model_path(symbol), immutable)
+        return MODEL_CACHE.get_derived(model_path(symbol), name, factory, immutable)
+    except FileNotFoundError:
+        return None
+
+
+def model_versions():
+    """Return ``{symbol: version}`` for every servable model.
+
+    Registered models are versioned by checksum; unregistered legacy files
+    by their file signature.
+    """
+    versions = {symbol: file_signature(model_path(symbol)) for symbol in model_symbols(MODEL_DIR)}
+    versions.update((symbol, entry["sha256"]) for symbol, entry in MODEL_REGISTRY.entries().items())
+    versions.pop(POOLED_SYMBOL, None)
+    pooled = MODEL_REGISTRY.active(POOLED_SYMBOL)
+    if pooled is None or MODEL_MODE == "symbol":
+        return versions
+    universe = pooled.get("universe", [])
+    if MODEL_MODE == "pooled":
+        return dict.fromkeys(sorted(set(versions) | set(universe)), pooled["sha256"])
+    for symbol in universe:
+        versions.setdefault(symbol, pooled["sha256"])
+    return versions
+
+
+def load_model(symbol):
+    """Return the cached model for ``symbol`` or ``None`` if it has no model file."""
+    return _cached(symbol)
+
+
+def memoized(version=None):
+    """Serve a deterministic JSON route from ``RESPONSE_CACHE``.
+
+    The key is a hash of the request body, ``RESPONSE_VERSION`` and
+    ``version(body)`` (for example the model file signature). It is sent as
+    the ``ETag``; a request whose ``If-None-Match`` carries it gets a 304
+    without running the route, and repeated bodies are answered from the
+    cache until the TTL expires. Only 200 responses are stored.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(force=True, silent=True)
+            if data is None:
+                return view(*args, **kwargs)
+            etag = RESPONSE_CACHE.key(data, [RESPONSE_VERSION, version(data) if version else None])
+            if etag in request.if_none_match:
+                RESPONSE_CACHE.record_not_modified()
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            body = RESPONSE_CACHE.get(etag)
+            if body is not None:
+                response = Response(body, mimetype="application/json")
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                RESPONSE_CACHE.put(etag, response.get_data())
+            response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def _model_version(data):
+    symbol = data.get("symbol") if isinstance(data, dict) else None
+    if not symbol:
+        return None
+    key = model_key(symbol)
+    entry = MODEL_REGISTRY.active(key)
+    return entry["sha256"] if entry is not None else file_signature(model_path(key))
+
+
+def _build_explainer(model):
+    with STAGE_SECONDS.time(stage="shap_build"):
+        return load_shap().TreeExplainer(model)
+
+
+def _compile(model):
+    with STAGE_SECONDS.time(stage="compile"):
+        return compile_model(model, FEATURE_COLUMNS)
+
+
+def load_explainer(symbol):
+    """Return ``(model, explainer)`` for ``symbol`` or ``None`` if it has no model file.
+
+    The SHAP explainer is cached next to the model and rebuilt only when the
+    model file changes.
+    """
+    return _cached(symbol, "shap", _build_explainer)
+
+
+def load_compiled(symbol):
+    """Return ``(model, compiled)`` for ``symbol`` or ``None`` if it has no model file.
+
+    ``compiled`` is the flat-array form of the model from
+    :func:`tree_inference.compile_model`, or ``None`` for unsupported models.
+    """
+    return _cached(symbol, "compiled", _compile)
+
+
+def _is_finite_number(value):
+    try:
+        return bool(np.isfinite(float(value)))
+    except (TypeError, ValueError):
+        return False
+
+
+def _group_rows(rows, results):
+    """Group valid feature rows by the model that scores them.
+
+    Keys are :func:`model_key` names, so under a pooled model every row lands
+    in one group. Rows with missing or non-finite features get a 400 in
+    ``results`` and are left out, so they cannot fail the rest of the group.
+    """
+    groups = {}
+    for i, row in enumerate(rows):
+        symbol = row.get("symbol") if isinstance(row, dict) else None
+        if not symbol:
+            results[i] = {"error": "Hisse sembolü (symbol) eksik", "status": 400}
+            continue
+        key = model_key(symbol)
+        missing = [feature for feature in model_features(key) if feature not in row]
+        if missing:
+            results[i] = {"symbol": symbol, "error": f"Eksik özellik: {', '.join(missing)}", "status": 400}
+            continue
+        invalid = [feature for feature in model_features(key) if not _is_finite_number(row[feature])]
+        if invalid:
+            results[i] = {"symbol": symbol, "error": f"Geçersiz özellik: {', '.join(invalid)}", "status": 400}
+            continue
+        groups.setdefault(key, []).append(i)
+    return groups
+
+
+def _missing_model(rows, indices, results):
+    for i in indices:
+        symbol = rows[i]["symbol"]
+        results[i] = {"symbol": symbol, "error": f"Model bulunamadı: {symbol}", "status": 404}
+
+
+def _count_errors(results):
+    for result in results:
+        if result is not None and "error" in result:
+            SYMBOL_ERRORS.inc(symbol=result.get("symbol", ""), status=result["status"])
+    return results
+
+
+def _feature_frame(rows, indices, features=FEATURE_COLUMNS):
+    return pd.DataFrame([[rows[i][key] for key in features] for i in indices], columns=features)
+
+
+def _input_key(X):
+    """Hashable form of a feature matrix or DataFrame."""
+    values = X.to_numpy() if hasattr(X, "to_numpy") else X
+    return values.dtype.str, values.shape, values.tobytes()
+
+
+def _coalesced(stage, predictor, X, fn):
+    # ``predictor`` is held by every caller in flight, so its id is stable here.
+    return PREDICTIONS.do((stage, id(predictor), _input_key(X)), fn)
+
+
+def _row_shap_values(shap_values, row, class_index):
+    """Return one row's SHAP values for regressors and (multi-)class models."""
+    if isinstance(shap_values, list):
+        return shap_values[class_index][row]
+    values = shap_values[row]
+    if values.ndim == 2:
+        return values[:, class_index]
+    return values
+
+
+def explain_rows(rows):
+    """Predict and explain many feature rows with one SHAP call per model.
+
+    Returns a list aligned with ``rows``. Successful rows contain ``symbol``,
+    ``risk_percentage`` and ``feature_importance``; failed rows contain
+    ``error`` and ``status``.
+    """
+    results = [None] * len(rows)
+    groups = _group_rows(rows, results)
+
+    for key, indices in groups.items():
+        loaded = load_explainer(key)
+        if loaded is None:
+            _missing_model(rows, indices, results)
+            continue
+        model, explainer = loaded
+        features = model_features(key)
+
+        try:
+            with STAGE_SECONDS.time(stage="features"):
+                df = _feature_frame(rows, indices, features)
+            with STAGE_SECONDS.time(stage="predict"):
+                raw_scores = _coalesced("predict", model, df, lambda: model.predict(df))
+            with STAGE_SECONDS.time(stage="shap"):
+                shap_values = _coalesced("shap", explainer, df, lambda: explainer.shap_values(df))
+        except Exception as e:
+            for i in indices:
+                results[i] = {"symbol": rows[i]["symbol"], "error": str(e), "status": 500}
+            continue
+
+        classes = list(getattr(model, "classes_", []))
+        for pos, (i, raw_score) in enumerate(zip(indices, raw_scores)):
+            class_index = classes.index(raw_score) if raw_score in classes else 0
+            values = _row_shap_values(shap_values, pos, class_index)
+            symbol = rows[i]["symbol"]
+            try:
+                score = float(raw_score)
+            except (ValueError, TypeError):
+                results[i] = {"symbol": symbol, "error": f"Model output not numeric: {raw_score}", "status": 500}
+                continue
+            results[i] = {
+                "symbol": symbol,
+                "risk_percentage": round(score * 100),
+                "feature_importance": {col: float(v) for col, v in zip(features, values)},
+            }
+    return _count_errors(results)
+
 
 @app.route("/predict-risk-explain", methods=["POST"])
 def predict_risk_explain():
-    if shap is None:
+    """Explain one feature row, or many when the body contains ``rows``."""
+    if load_shap() is None:
         return jsonify({"error": "SHAP kütüphanesi yüklü değil"}), 500
 
     try:
         data = request.get_json(force=True)
-        symbol = data.get("symbol")
-        features = {key: data[key] for key in ['rsi', 'sma_20', 'volatility', 'beta'] if key in data}
-        df = pd.DataFrame([features])
-        model_path = os.path.join(MODEL_DIR, f"{symbol}_risk_model.pkl")
-        if not os.path.exists(model_path):
-            return jsonify({"error": f"Model bulunamadı: {symbol}"}), 404
-        model = joblib.load(model_path)
-        # SHAP açıklaması (TreeExplainer RandomForest için uygun)
-        explainer = shap.TreeExplainer(model)
-        shap_values = explainer.shap_values(df)
-        importance = dict(zip(df.columns, shap_values[0]))
-        score = float(model.predict(df)[0])
-        risk_percentage = round(score * 100)
+        if isinstance(data, dict) and "rows" in data:
+            if not isinstance(data["rows"], list):
+                return jsonify({"error": "rows bir liste olmalı"}), 400
+            return jsonify({"results": explain_rows(data["rows"])})
+
+        result = explain_rows([data])[0]
+        if "error" in result:
+            return jsonify({"error": result["error"]}), result["status"]
         return jsonify({
-            "risk_percentage": risk_percentage,
-            "feature_importance": importance
+            "risk_percentage": result["risk_percentage"],
+            "feature_importance": result["feature_importance"]
         })
     except Exception as e:
-        print("SHAP HATA:", str(e))
+        log.error("SHAP HATA: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/predict-risk", methods=["POST"])
-def predict_risk():
-    try:
-        data = request.get_json(force=True)
-        symbol = data.get("symbol")
-        print("Gelen veri:", data, symbol)
+def predict_rows(rows):
+    """Predict risk for many feature rows with one vectorized predict per model.
 
-        if not symbol:
-            return jsonify({"error": "Hisse sembolü (symbol) eksik"}), 400
+    Rows are grouped by :func:`model_key`, so symbols served by the pooled
+    model share a single predict call. Tree models are evaluated from their
+    compiled flat-array form; other models go through ``model.predict`` on a
+    DataFrame.
 
-        features = {key: data[key] for key in ['rsi', 'sma_20', 'volatility', 'beta'] if key in data}
-        df = pd.DataFrame([features])
-        print("Tahmin verisi:", df)
+    Parameters
+    ----------
+    rows : list of dict
+        Each dict must contain ``symbol`` and the features of the symbol's
+        model (``FEATURE_COLUMNS`` for unregistered models).
 
-        model_path = os.path.join(MODEL_DIR, f"{symbol}_risk_model.pkl")
-        if not os.path.exists(model_path):
-            return jsonify({"error": f"Model bulunamadı: {symbol}"}), 404
+    Returns
+    -------
+    list of dict
+        One result per input row, in input order. Successful rows contain
+        ``symbol``, ``risk_percentage`` and ``breakdown``; failed rows contain
+        ``error`` and the HTTP ``status`` the single-row route would return.
+    """
+    results = [None] * len(rows)
+    groups = _group_rows(rows, results)
+
+    for key, indices in groups.items():
+        loaded = load_compiled(key)
+        if loaded is None:
+            _missing_model(rows, indices, results)
+            continue
+        model, compiled = loaded
+        features = model_features(key)
 
-        model = joblib.load(model_path)
-        raw_score = model.predict(df)[0]
         try:
-            score = float(raw_score)
-        except (ValueError, TypeError):
-            return jsonify({"error": f"Model output not numeric: {raw_score}"}), 500
+            with STAGE_SECONDS.time(stage="features"):
+                if compiled is not None:
+                    X = compiled.buffer([rows[i] for i in indices])
+                else:
+                    X = _feature_frame(rows, indices, features)
+            predictor = model if compiled is None else compiled
+            with STAGE_SECONDS.time(stage="predict"):
+                raw_scores = _coalesced("predict", predictor, X, lambda: predictor.predict(X))
+        except Exception as e:
+            for i in indices:
+                results[i] = {"symbol": rows[i]["symbol"], "error": str(e), "status": 500}
+            continue
 
-        risk_percentage = round(score * 100)
+        for i, raw_score in zip(indices, raw_scores):
+            symbol = rows[i]["symbol"]
+            try:
+                score = float(raw_score)
+            except (ValueError, TypeError):
+                results[i] = {"symbol": symbol, "error": f"Model output not numeric: {raw_score}", "status": 500}
+                continue
+            results[i] = {
+                "symbol": symbol,
+                "risk_percentage": round(score * 100),
+                "breakdown": {key: rows[i][key] for key in features},
+            }
+    return _count_errors(results)
 
-        print("Tahmin skoru (%):", risk_percentage)
+
+@app.route("/predict-risk", methods=["POST"])
+@memoized(version=_model_version)
+def predict_risk():
+    try:
+        data = request.get_json(force=True)
+        _debug_sample("Gelen veri: %s", data)
+
+        result = predict_rows([data])[0]
+        if "error" in result:
+            return jsonify({"error": result["error"]}), result["status"]
+
+        _debug_sample("Tahmin skoru (%%): %s", result["risk_percentage"])
 
         return jsonify({
-            "risk_percentage": risk_percentage,
-            "breakdown": {
-                "rsi": data['rsi'],
-                "sma_20": data['sma_20'],
-                "volatility": data['volatility'],
-                "beta": data['beta']
-            }
+            "risk_percentage": result["risk_percentage"],
+            "breakdown": result["breakdown"],
         })
 
     except Exception as e:
-        print("HATA:", str(e))
+        log.error("HATA: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/predict-risk-batch", methods=["POST"])
+def predict_risk_batch():
+    """Predict risk for a list of ``{symbol, rsi, sma_20, volatility, beta}`` rows.
+
+    Rows are grouped by symbol so each model runs a single vectorized
+    prediction. A failing row reports its own error without failing the batch.
+    """
+    try:
+        data = request.get_json(force=True)
+        rows = data.get("rows", []) if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            return jsonify({"error": "rows bir liste olmalı"}), 400
+        return jsonify({"results": predict_rows(rows)})
+    except Exception as e:
+        log.error("BATCH HATA: %s", e)
         return jsonify({"error": str(e)}), 500
 
+def history_path(symbol):
+    return os.path.join(CSV_DIR, f"{symbol}_history.csv")
+
+
+def load_history(symbol):
+    """Return ``symbol``'s ``date``/``close`` history, preferring the price store."""
+    if symbol in PRICE_STORE:
+        return PRICE_STORE.frame(symbol)
+    if os.path.exists(history_path(symbol)):
+        return pd.read_csv(history_path(symbol)).dropna().sort_values("date")
+    return None
+
+
+def history_signature(symbol):
+    if symbol in PRICE_STORE:
+        return PRICE_STORE.version(symbol)
+    return file_signature(history_path(symbol))
+
+
+def score_signature(symbol):
+    """Version of the data a symbol's score depends on: its prices and the market's."""
+    signature = history_signature(symbol)
+    if signature is None:
+        return None
+    return signature, history_signature(MARKET_SYMBOL)
+
+
+def _on_dates(dates, df):
+    """Place ``df``'s closes on the sorted ``dates`` axis, NaN where it has none."""
+    closes = np.full(len(dates), np.nan)
+    closes[np.searchsorted(dates, df['date'].to_numpy(dtype=str))] = df['close'].to_numpy(dtype=np.float64)
+    return closes
+
+
+def _history_beta(df, market):
+    """Beta of ``df`` against the market history, or 1.0 without enough data."""
+    if market is None:
+        return 1.0
+    dates = np.union1d(df['date'].to_numpy(dtype=str), market['date'].to_numpy(dtype=str))
+    stock_returns, market_returns = market_beta.aligned_returns(_on_dates(dates, df), _on_dates(dates, market))
+    beta = market_beta.batch_beta(stock_returns, market_returns, min_periods=20)[0]
+    return 1.0 if np.isnan(beta) else float(beta)
+
+
+def latest_features(symbol, market=None):
+    """Return the feature row of ``symbol`` for its last trading day, or ``None``."""
+    df = load_history(symbol)
+    if df is None or df.shape[0] < 20:
+        return None
+
+    close = df['close'].to_numpy(dtype=np.float64)
+    features = np.vstack([
+        indicators.rsi(close),
+        indicators.sma(close, 20),
+        indicators.rolling_volatility(close, 20),
+    ])
+    complete = np.flatnonzero(~np.isnan(features).any(axis=0))
+    if not len(complete):
+        return None
+
+    rsi, sma_20, volatility = features[:, complete[-1]]
+    return {
+        "symbol": symbol,
+        "rsi": float(rsi),
+        "sma_20": float(sma_20),
+        "volatility": float(volatility),
+        "beta": _history_beta(df, market),
+    }
+
+
+def score_symbols(symbols):
+    """Score many symbols from their price histories with one predict per model.
+
+    Returns ``{symbol: score_row}`` for the symbols that could be scored.
+    """
+    market = load_history(MARKET_SYMBOL)
+    rows = [row for row in (latest_features(symbol, market) for symbol in symbols) if row is not None]
+    scores = {}
+    for row, result in zip(rows, predict_rows(rows)):
+        if "error" in result:
+            _debug_sample("Invalid score for %s: %s", row["symbol"], result["error"])
+            continue
+        scores[row["symbol"]] = {"risk_percentage": result["risk_percentage"], **result["breakdown"]}
+    return scores
+
+
+def score_symbol(symbol):
+    """Score ``symbol`` from the last row of its price history."""
+    return score_symbols([symbol]).get(symbol)
+
+
+SCORE_TABLE = ScoreTable(
+    MODEL_DIR, score_symbol, score_signature, model_versions=model_versions, score_many=score_symbols
+)
+
+
 @app.route("/recommend-low-risk", methods=["GET"])
 def recommend_low_risk():
+    """Serve low-risk symbols from the precomputed score table.
+
+    Query parameters are ``min_risk`` (inclusive), ``max_risk`` (exclusive,
+    default 30 when neither bound is given), ``sort`` (a score column,
+    default ``risk_percentage``), ``order`` (``asc`` or ``desc``) and
+    ``limit``. When no filter is given and nothing is below 30, the first
+    ``limit`` (default 3) symbols of the whole table in the requested order
+    are returned. The time of the last table refresh is sent in the
+    ``Last-Modified`` header.
+    """
     try:
-        all_scores = []
-        recommendations = []
-        for filename in os.listdir(MODEL_DIR):
-            if filename.endswith("_risk_model.pkl"):
-                symbol = filename.replace("_risk_model.pkl", "")
-                model_path = os.path.join(MODEL_DIR, filename)
-                data_path = os.path.join(CSV_DIR, f"{symbol}_history.csv")
-
-                if not os.path.exists(data_path):
-                    continue
-
-                df = pd.read_csv(data_path).dropna().sort_values("date")
-                if df.shape[0] < 20:
-                    continue
-
-                df['rsi'] = df['close'].pct_change().rolling(14).apply(
-                    lambda x: 100 - (100 / (1 + (x[x > 0].mean() / abs(x[x < 0].mean()))) if abs(x[x < 0].mean()) != 0 else 0)
-                )
-                df['sma_20'] = df['close'].rolling(20).mean()
-                df['volatility'] = df['close'].rolling(20).std()
-                df.dropna(inplace=True)
-
-                if df.empty:
-                    continue
-
-                last = df.iloc[-1]
-                features = {
-                    "rsi": last['rsi'],
-                    "sma_20": last['sma_20'],
-                    "volatility": last['volatility'],
-                    "beta": 1.0  
-                }
-
-                df_model = pd.DataFrame([features])
-                model = joblib.load(model_path)
-                raw_score = model.predict(df_model)[0]
-                try:
-                    score = float(raw_score)
-                except (ValueError, TypeError):
-                    print(f"Invalid score for {symbol}: {raw_score}")
-                    continue
-                risk = round(score * 100)
-                all_scores.append({"symbol": symbol, "risk_percentage": risk})
-
-                if risk < 30:
-                    recommendations.append({"symbol": symbol, "risk_percentage": risk})
-
-        if not recommendations:
-            all_scores.sort(key=lambda x: x["risk_percentage"])
-            recommendations = all_scores[:3]
-
-        return jsonify(recommendations)
+        args = request.args
+        min_risk = args.get("min_risk", type=float)
+        max_risk = args.get("max_risk", type=float)
+        sort = args.get("sort", "risk_percentage")
+        descending = args.get("order", "asc") == "desc"
+        limit = args.get("limit", type=int)
+
+        unfiltered = min_risk is None and max_risk is None
+        recommendations = SCORE_TABLE.query(
+            min_risk=min_risk,
+            max_risk=30 if unfiltered else max_risk,
+            sort=sort,
+            descending=descending,
+            limit=limit,
+        )
+        if not recommendations and unfiltered:
+            recommendations = SCORE_TABLE.query(sort=sort, descending=descending, limit=limit or 3)
+
+        response = jsonify(recommendations)
+        response.last_modified = SCORE_TABLE.refreshed_at
+        return response
 
     except Exception as e:
-        print("Öneri hatası:", str(e))
+        log.error("Öneri hatası: %s", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Expose latency, stage timing, cache and error metrics for Prometheus."""
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/model-cache/stats", methods=["GET"])
+def model_cache_stats():
+    """Return hit/miss/eviction counters of the in-process model cache."""
+    return jsonify(MODEL_CACHE.stats())
+
+
+READY = threading.Event()
+
+
+def _prepare_model(symbol, entry):
+    """Load and compile a newly published model before it takes traffic."""
+    MODEL_CACHE.get_derived(entry["path"], "compiled", _compile, immutable=True)
+
+
+def _on_models_swapped(changes):
+    for symbol, (old, new) in changes.items():
+        log.info("Model değişti %s: %s -> %s", symbol,
+                 old["version"] if old else None, new["version"] if new else None)
+        if old is not None:
+            MODEL_CACHE.invalidate(old["path"])
+    SCORE_TABLE.refresh()
+
+
+def start_background():
+    """Start the score refresher and the model registry watcher of this process."""
+    SCORE_TABLE.start(interval=float(os.getenv("SCORE_REFRESH_INTERVAL", "300")))
+    MODEL_REGISTRY.watch(float(os.getenv("MODEL_REGISTRY_POLL", "2")), _prepare_model, _on_models_swapped)
+
+
+def warm_up(explainers=True):
+    """Load and compile every model (and SHAP explainer) and run one request through each.
+
+    Called once before serving. Under the production server this runs in the
+    master process before workers fork, so the loaded models are shared
+    copy-on-write. ``READY`` is set when it finishes.
+
+    Returns a summary with the number of models, explainers and scored
+    symbols and the elapsed seconds.
+    """
+    start = time.perf_counter()
+    imports = preload_imports(explainers)
+    MODEL_REGISTRY.refresh(_prepare_model)
+    symbols = sorted(model_versions())
+    n_models = len({model_key(symbol) for symbol in symbols})
+    if n_models > MODEL_CACHE.max_size:
+        log.info("Model önbelleği %d modele büyütüldü", n_models)
+        MODEL_CACHE.max_size = n_models
+
+    rows = [dict({key: 0.0 for key in model_features(model_key(symbol))}, symbol=symbol) for symbol in symbols]
+    predicted = predict_rows(rows)
+    explained = explain_rows(rows) if explainers and load_shap() is not None else []
+    SCORE_TABLE.refresh()
+    READY.set()
+    return {
+        "models": sum(1 for r in predicted if r.get("status") != 404),
+        "explainers": sum(1 for r in explained if r.get("status") != 404),
+        "scored": len(SCORE_TABLE.snapshot()),
+        "imports": imports,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once warm-up has finished, 503 before."""
+    if not READY.is_set():
+        return jsonify({"status": "warming_up"}), 503
+    return jsonify({"status": "ready"})
+
+
+def _price_version(data):
+    # Symbol lookups read stored prices, so a price update changes the response.
+    return COVARIANCE_SERVICE.store.signature
+
+
 @app.route("/portfolio-analysis", methods=["POST"])
+@memoized(version=_price_version)
 def portfolio_analysis_endpoint():
     """Return advanced portfolio risk analysis."""
     try:
         data = request.get_json(force=True)
         positions = data.get("positions", [])
         threshold = data.get("high_risk_threshold", 0.5)
-        result = analyze_portfolio(positions, high_risk_threshold=threshold)
+        result = analyze_portfolio(positions, high_risk_threshold=threshold, covariance_service=COVARIANCE_SERVICE)
         return jsonify(result)
     except Exception as e:
-        print("ANALYSIS ERROR:", str(e))
+        log.error("ANALYSIS ERROR: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/portfolio-what-if", methods=["POST"])
+def portfolio_what_if_endpoint():
+    """Score candidate trades against one portfolio and return them ranked.
+
+    The body holds ``positions`` and ``candidates``; each candidate is a
+    position with an optional ``action`` (``add``, ``remove`` or ``resize``).
+    ``sort`` picks the ranking metric (default ``risk_change``), ``order``
+    is ``asc`` or ``desc`` and ``limit`` caps the result.
+    """
+    try:
+        data = request.get_json(force=True)
+        limit = data.get("limit")
+        results = rank_candidates(
+            data.get("positions", []),
+            data.get("candidates", []),
+            high_risk_threshold=data.get("high_risk_threshold", 0.5),
+            sort_by=data.get("sort", "risk_change"),
+            descending=data.get("order", "asc") == "desc",
+            limit=int(limit) if limit is not None else None,
+        )
+        return jsonify({"results": results})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.error("WHAT-IF ERROR: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
 @app.route("/portfolio-risk", methods=["POST"])
+@memoized(version=_price_version)
 def portfolio_risk_endpoint():
-    """Return overall portfolio risk score using advanced calculation."""
+    """Return overall portfolio risk score using advanced calculation.
+
+    Positions without ``returns`` get correlations and missing volatilities
+    from the stored price histories; ``shrinkage`` (a number in ``[0, 1]``
+    or ``"oas"``) stabilizes the correlation matrix of large portfolios.
+    """
     try:
         data = request.get_json(force=True)
         positions = data.get("positions", [])
-        result = calculate_portfolio_risk_advanced(positions)
+        result = calculate_portfolio_risk_advanced(
+            positions,
+            covariance=data.get("covariance"),
+            include_contributions=bool(data.get("include_contributions", False)),
+            covariance_service=COVARIANCE_SERVICE,
+            shrinkage=data.get("shrinkage"),
+        )
         return jsonify(result)
     except Exception as e:
-        print("PORTFOLIO RISK ERROR:", str(e))
+        log.error("PORTFOLIO RISK ERROR: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/risk-trend", methods=["POST"])
+def risk_trend_endpoint():
+    """Forecast the risk trend of many portfolios in one batch.
+
+    ``histories`` maps a portfolio id to its risk history, either bare risk
+    scores or ``[date, risk]`` pairs, oldest first. ``forecast_periods``
+    defaults to 5.
+    """
+    try:
+        data = request.get_json(force=True)
+        histories = data.get("histories") or {}
+        periods = int(data.get("forecast_periods", 5))
+        results = predict_risk_trends(list(histories.values()), forecast_periods=periods)
+        return jsonify({"forecasts": dict(zip(histories, results))})
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.error("RISK TREND ERROR: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/risk-trend/update", methods=["POST"])
+def risk_trend_update_endpoint():
+    """Append risk snapshots to running trends and return their forecasts.
+
+    ``state`` maps a portfolio id to the ``[n, sum_y, sum_xy, last]`` sums
+    returned by a previous call; the caller keeps them, so any worker can
+    serve the next update. ``histories`` (as for ``/risk-trend``) extends
+    whole histories, then each ``{"portfolio": id, "risk": score}`` in
+    ``snapshots`` updates that portfolio's trend in O(1). The response
+    holds the forecasts and the new ``state`` of every portfolio touched;
+    an invalid request returns 400 and no new state.
+    """
+    try:
+        data = request.get_json(force=True)
+        periods = int(data.get("forecast_periods", 5))
+        histories = data.get("histories") or {}
+        # JSON object keys are strings, so ids in snapshots must be too.
+        snapshots = [(str(s["portfolio"]), float(s["risk"])) for s in data.get("snapshots") or []]
+        trends = RiskTrendStream()
+        for key, state in (data.get("state") or {}).items():
+            trends.load(key, state)
+        touched = dict.fromkeys(list(histories) + [key for key, _ in snapshots])
+        for key, history in histories.items():
+            trends.extend(key, history)
+        for key, risk in snapshots:
+            trends.add(key, risk)
+        return jsonify({
+            "forecasts": trends.forecast(touched, forecast_periods=periods),
+            "state": trends.state(touched),
+        })
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.error("RISK TREND ERROR: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+def score_holdings(symbols):
+    """Score ``symbols`` from their stored histories, keeping the reason for failures.
+
+    Returns ``{symbol: result}`` where a result is a :func:`predict_rows`
+    row, or ``error``/``status`` when the symbol has too little history.
+    """
+    market = load_history(MARKET_SYMBOL)
+    rows, results = [], {}
+    for symbol in symbols:
+        row = latest_features(symbol, market)
+        if row is None:
+            results[symbol] = {"symbol": symbol, "error": "Yeterli fiyat geçmişi yok", "status": 404}
+        else:
+            rows.append(row)
+    for row, result in zip(rows, predict_rows(rows)):
+        results[row["symbol"]] = result
+    return results
+
+
+def _holdings_version(data):
+    # Depends on the models and price histories of the held symbols.
+    holdings = data.get("holdings") if isinstance(data, dict) else None
+    if not isinstance(holdings, list):
+        return None
+    symbols = sorted({h.get("symbol") for h in holdings if isinstance(h, dict) and h.get("symbol")}, key=str)
+    return [
+        PRICE_STORE.signature,
+        history_signature(MARKET_SYMBOL),
+        [(_model_version({"symbol": s}), history_signature(s)) for s in symbols],
+    ]
+
+
+@app.route("/portfolio-full", methods=["POST"])
+@memoized(version=_holdings_version)
+def portfolio_full_endpoint():
+    """Score every holding and analyze the portfolio in one request.
+
+    The body holds ``holdings`` (``symbol``, ``quantity``, ``price`` and
+    optionally ``sector``) and optionally ``high_risk_threshold`` (default
+    0.5), ``shrinkage`` and ``include_contributions``. Indicators and beta are
+    computed from the stored price histories and all holdings are predicted
+    in one batch per model. The response holds per-symbol ``risks`` and the
+    results of :func:`calculate_weighted_portfolio_risk`,
+    :func:`calculate_portfolio_risk_advanced` and :func:`analyze_portfolio`
+    over the holdings that could be scored; the others are listed in
+    ``risks`` with an ``error``.
+    """
+    try:
+        data = request.get_json(force=True)
+        holdings = data.get("holdings")
+        if not isinstance(holdings, list) or not all(isinstance(h, dict) and h.get("symbol") for h in holdings):
+            return jsonify({"error": "holdings symbol içeren bir liste olmalı"}), 400
+
+        scores = score_holdings(list(dict.fromkeys(h["symbol"] for h in holdings)))
+        positions = []
+        for holding in holdings:
+            result = scores[holding["symbol"]]
+            if "error" in result:
+                continue
+            positions.append({
+                "symbol": holding["symbol"],
+                "quantity": holding.get("quantity", 1),
+                "price": holding.get("price", 1.0),
+                "sector": holding.get("sector") or "Unknown",
+                "risk_score": result["risk_percentage"] / 100,
+                "beta": result["breakdown"].get("beta", 1.0),
+            })
+
+        return jsonify({
+            "risks": [
+                {key: value for key, value in result.items() if key != "status"}
+                for result in scores.values()
+            ],
+            "weighted": calculate_weighted_portfolio_risk(positions),
+            "advanced": calculate_portfolio_risk_advanced(
+                positions,
+                include_contributions=bool(data.get("include_contributions", False)),
+                covariance_service=COVARIANCE_SERVICE,
+                shrinkage=data.get("shrinkage"),
+            ),
+            "analysis": analyze_portfolio(
+                positions,
+                high_risk_threshold=data.get("high_risk_threshold", 0.5),
+                covariance_service=COVARIANCE_SERVICE,
+            ),
+        })
+    except Exception as e:
+        log.error("PORTFOLIO FULL ERROR: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
+MAX_SIMULATIONS = 1_000_000
+
+
+@app.route("/portfolio-var", methods=["POST"])
+def portfolio_var_endpoint():
+    """Return VaR and CVaR for one or more portfolios at several confidence levels.
+
+    The body holds either ``returns`` (one return series or a list of series,
+    one per portfolio) or ``positions`` with ``quantity``, ``price`` and
+    ``returns``, weighted by value into a single portfolio. Optional keys are
+    ``confidence`` (float or list), ``method`` (``historical``,
+    ``parametric`` or ``monte_carlo``), ``n_simulations`` and ``seed``.
+    """
+    try:
+        data = request.get_json(force=True)
+        kwargs = {
+            "confidence": data.get("confidence", [0.95, 0.99]),
+            "method": data.get("method", "historical"),
+            "n_simulations": min(int(data.get("n_simulations", 10000)), MAX_SIMULATIONS),
+            "seed": data.get("seed"),
+        }
+        positions = data.get("positions")
+        if positions:
+            if not all(pos.get("returns") for pos in positions):
+                return jsonify({"error": "Her pozisyon için returns gerekli"}), 400
+            values = [pos.get("quantity", 0) * pos.get("price", 0.0) for pos in positions]
+            total = sum(values)
+            if total == 0:
+                return jsonify({"error": "Portföy değeri sıfır"}), 400
+            result = risk_measures(
+                weights=[v / total for v in values],
+                asset_returns=[pos["returns"] for pos in positions],
+                **kwargs,
+            )
+        elif data.get("returns"):
+            result = risk_measures(data["returns"], **kwargs)
+        else:
+            return jsonify({"error": "returns veya positions gerekli"}), 400
+
+        return jsonify({
+            "method": kwargs["method"],
+            "confidence": result["confidence"].tolist(),
+            "var": result["var"].tolist(),
+            "cvar": result["cvar"].tolist(),
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.error("VAR ERROR: %s", e)
         return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # Development server; use serve.py for production.
+    start_background()
+    READY.set()
     app.run(debug=True, host="0.0.0.0", port=5050)
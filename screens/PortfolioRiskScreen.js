@@ -269,7 +269,6 @@ const PortfolioRiskScreen = () => {
     setLoading(true);
     try {
       const symbols = [...new Set(stocks.map(s => s.symbol))];
-      const riskDataPromises = [];
       const detailPromises = symbols.map(sym =>
         getStockDetails(sym).catch(() => null)
       );
@@ -281,29 +280,36 @@ const PortfolioRiskScreen = () => {
         Promise.all(historyPromises)
       ]);
 
+      const rows = [];
       histories.forEach((history, idx) => {
         const symbol = symbols[idx];
         if (!history || history.length === 0) return;
         const indicators = calculateIndicators(history);
         const beta = calculateBeta(history, marketHistory);
         if (!indicators || beta === null) return;
-        const payload = { ...indicators, beta, symbol };
-        riskDataPromises.push(
-          fetch(`${ML_BASE_URL}/predict-risk`, {
+        rows.push({ ...indicators, beta, symbol });
+      });
+
+      let results = [];
+      if (rows.length > 0) {
+        try {
+          const batchRes = await fetch(`${ML_BASE_URL}/predict-risk-batch`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify(payload),
-          })
-            .then(res => res.json())
-            .then(json => ({
-              symbol,
-              risk: parseFloat(json.risk_percentage) || 0,
-              breakdown: json.breakdown || { rsi: 0, sma_20: 0, volatility: 0, beta: 0 }
-            }))
-            .catch(() => null)
-        );
-      });
-      const results = (await Promise.all(riskDataPromises)).filter(r => r !== null);
+            body: JSON.stringify({ rows }),
+          });
+          const batchJson = await batchRes.json();
+          results = (batchJson.results || [])
+            .filter(r => r && !r.error)
+            .map(r => ({
+              symbol: r.symbol,
+              risk: parseFloat(r.risk_percentage) || 0,
+              breakdown: r.breakdown || { rsi: 0, sma_20: 0, volatility: 0, beta: 0 }
+            }));
+        } catch (e) {
+          results = [];
+        }
+      }
       const detailResults = await Promise.all(detailPromises);
       const sectorMap = {};
       detailResults.forEach((d, idx) => {
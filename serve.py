@@ -0,0 +1,108 @@
+"""Production entry point for the risk API.
+
+Runs :mod:`risk_api` under gunicorn with several worker processes. Models,
+SHAP explainers and the recommendation table are loaded and warmed up once in
+the master process before workers fork, so every worker starts ready and
+shares the loaded objects copy-on-write::
+
+    python serve.py --workers 4 --threads 4
+
+Every option can also be set through the environment (``RISK_API_BIND``,
+``RISK_API_WORKERS``, ``RISK_API_THREADS``, ``RISK_API_TIMEOUT``,
+``RISK_API_GRACEFUL_TIMEOUT``, ``RISK_API_KEEPALIVE``). ``GET /ready`` answers
+503 until warm-up has finished. ``GET /metrics`` reports the metrics of the
+worker that serves the scrape. Models published to the registry are picked
+up by every worker within ``MODEL_REGISTRY_POLL`` seconds without a restart.
+"""
+
+import argparse
+import gc
+import logging
+import os
+
+try:
+    from gunicorn.app.base import BaseApplication
+except Exception:  # pragma: no cover - optional dependency
+    BaseApplication = None
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bind", default=os.getenv("RISK_API_BIND", "0.0.0.0:5050"))
+    parser.add_argument("--workers", type=int, default=_env_int("RISK_API_WORKERS", os.cpu_count() or 1))
+    parser.add_argument("--threads", type=int, default=_env_int("RISK_API_THREADS", 4),
+                        help="request threads per worker")
+    parser.add_argument("--timeout", type=int, default=_env_int("RISK_API_TIMEOUT", 60),
+                        help="seconds before a silent worker is restarted")
+    parser.add_argument("--graceful-timeout", type=int, default=_env_int("RISK_API_GRACEFUL_TIMEOUT", 30))
+    parser.add_argument("--keepalive", type=int, default=_env_int("RISK_API_KEEPALIVE", 5))
+    parser.add_argument("--blas-threads", type=int, default=_env_int("RISK_API_BLAS_THREADS", 1),
+                        help="BLAS/OpenMP threads per worker")
+    parser.add_argument("--no-explainers", action="store_true", help="skip preloading SHAP explainers")
+    return parser.parse_args(argv)
+
+
+def _limit_threads(n_threads):
+    """Cap BLAS/OpenMP threads in a worker so workers don't oversubscribe cores."""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except Exception:
+        pass
+
+
+def _post_fork(blas_threads):
+    def post_fork(server, worker):
+        import risk_api
+
+        _limit_threads(blas_threads)
+        # Threads do not survive fork, so each worker runs its own score
+        # refresher and model registry watcher.
+        risk_api.start_background()
+
+    return post_fork
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if BaseApplication is None:
+        raise SystemExit("gunicorn yüklü değil: pip install gunicorn")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+    import risk_api
+
+    summary = risk_api.warm_up(explainers=not args.no_explainers)
+    print(f"[✓] Isınma tamamlandı: {summary}")
+    # Move preloaded objects out of the collector's generations so the
+    # workers' garbage collections don't write to (and copy) shared pages.
+    gc.freeze()
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": args.keepalive,
+        "preload_app": True,
+        "post_fork": _post_fork(args.blas_threads),
+    }
+
+    class RiskAPIApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return risk_api.app
+
+    RiskAPIApplication().run()
+
+
+if __name__ == "__main__":
+    main()
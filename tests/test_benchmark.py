@@ -0,0 +1,28 @@
+import unittest
+import os
+import sys
+import warnings
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import benchmark
+
+
+class BenchmarkSmokeTest(unittest.TestCase):
+    def test_tiny_run_produces_comparable_results(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            report = benchmark.run(sizes=[5], history=30, repeat=1, route_sizes=[5], api_symbols=2, verbose=False,
+                                   include_startup=False)
+        names = {r['name'] for r in report['results']}
+        self.assertIn('analyze_portfolio', names)
+        self.assertIn('POST /portfolio-risk', names)
+        self.assertTrue(all('median_s' in r or 'skipped' in r for r in report['results']))
+
+        baseline = [dict(r, median_s=r['median_s'] / 10) for r in report['results'] if 'median_s' in r]
+        rows = benchmark.compare(report['results'], baseline, tolerance=0.5)
+        self.assertEqual(len(rows), len(baseline))
+        self.assertTrue(all(row['regression'] for row in rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from covariance_service import CovarianceService, window_returns
+from portfolio_analysis import analyze_portfolio
+from portfolio_risk import calculate_portfolio_risk_advanced
+from price_store import PriceStore
+
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD']
+
+
+class CovarianceServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PriceStore(self.tmp.name)
+        rng = np.random.default_rng(0)
+        self.dates = pd.bdate_range('2023-01-02', periods=200).strftime('%Y-%m-%d')
+        market = rng.normal(0, 0.01, 200)
+        self.prices = {}
+        for i, symbol in enumerate(SYMBOLS):
+            returns = market * i + rng.normal(0, 0.01, 200)
+            series = pd.Series(100 * np.cumprod(1 + returns), index=self.dates)
+            if symbol == 'CCC':
+                series = series.iloc[80:]  # listed later
+            if symbol == 'DDD':
+                series = series.drop(series.sample(30, random_state=1).index)  # gaps
+            self.prices[symbol] = series
+        self.store.write(self.prices)
+        self.service = CovarianceService(self.store, window=100, min_periods=20)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def expected(self, symbols, window=100):
+        closes = self.store_frame().reindex(columns=symbols).iloc[-(window + 1):]
+        returns = pd.DataFrame(window_returns(closes.to_numpy()), columns=symbols)
+        return returns.cov(min_periods=20).to_numpy(), returns.corr(min_periods=20).to_numpy()
+
+    def store_frame(self):
+        dates, closes = self.store.panel()
+        return pd.DataFrame(np.array(closes), index=dates, columns=self.store.symbols)
+
+    def test_matches_pandas_on_date_aligned_returns(self):
+        symbols = ['DDD', 'AAA', 'CCC']
+        stats = self.service.statistics(symbols)
+        covariance, correlation = self.expected(symbols)
+        np.testing.assert_allclose(stats['covariance'], covariance, atol=1e-12)
+        np.testing.assert_allclose(stats['correlation'], correlation, atol=1e-12)
+
+    def test_incremental_updates_match_fresh_build(self):
+        self.service.statistics(SYMBOLS)
+        new_days = pd.bdate_range(self.dates[-1], periods=4)[1:].strftime('%Y-%m-%d')
+        self.store.write({s: pd.Series([100.0, 101.0, 99.5], index=new_days) for s in SYMBOLS})
+        self.store.write({'AAA': pd.Series([123.0], index=[self.dates[-5]])})  # corrected close
+        updated = self.service.statistics(['BBB', 'AAA'])
+        fresh = CovarianceService(self.store, window=100, min_periods=20).statistics(['BBB', 'AAA'])
+        np.testing.assert_allclose(updated['covariance'], fresh['covariance'], atol=1e-12)
+        stats = self.service.stats()
+        self.assertEqual((stats['misses'], stats['incremental_updates']), (1, 1))
+
+    def test_shrinkage_pulls_toward_identity(self):
+        raw = self.service.correlation(SYMBOLS)
+        half = self.service.correlation(SYMBOLS, shrinkage=0.5)
+        oas = self.service.correlation(SYMBOLS, shrinkage='oas')
+        np.testing.assert_allclose(half, (raw + np.eye(4)) / 2)
+        np.testing.assert_allclose(np.diag(oas), 1.0)
+        self.assertTrue(np.all(np.abs(oas) <= np.abs(raw) + 1e-12))
+        with self.assertRaises(ValueError):
+            self.service.correlation(SYMBOLS, shrinkage=1.5)
+
+    def test_portfolio_functions_look_up_symbols(self):
+        positions = [
+            {'symbol': 'AAA', 'quantity': 10, 'price': 10.0, 'beta': 1.0, 'risk_score': 0.3},
+            {'symbol': 'DDD', 'quantity': 10, 'price': 10.0, 'beta': 1.0, 'risk_score': 0.3, 'volatility': 0.02},
+            {'symbol': 'ZZZ', 'quantity': 10, 'price': 10.0, 'beta': 1.0, 'risk_score': 0.3},
+        ]
+        result = calculate_portfolio_risk_advanced(positions, covariance_service=self.service)
+        covariance, _ = self.expected(['AAA', 'DDD'])
+        vol = np.array([np.sqrt(covariance[0, 0]), 0.02, 0.0])
+        correlation = self.service.correlation(['AAA', 'DDD', 'ZZZ'])
+        expected = np.sqrt(np.ones(3) / 3 @ (correlation * np.outer(vol, vol)) @ np.ones(3) / 3)
+        self.assertAlmostEqual(result['portfolio_volatility'], expected)
+        suggestions = analyze_portfolio(positions, covariance_service=self.service)['suggestions']
+        self.assertFalse(any('correlated' in s for s in suggestions))
+        self.store.write({'EEE': self.prices['AAA'] * 2})  # moves exactly with AAA
+        positions[1]['symbol'] = 'EEE'
+        suggestions = analyze_portfolio(positions, covariance_service=self.service)['suggestions']
+        self.assertTrue(any('highly correlated' in s for s in suggestions))
+
+
+if __name__ == '__main__':
+    unittest.main()
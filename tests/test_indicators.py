@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import indicators
+
+try:
+    import pandas_ta as ta
+except Exception:  # pragma: no cover - optional dependency
+    ta = None
+
+TOLERANCE = 1e-8
+
+
+# Reference definitions written with pandas, following pandas_ta defaults.
+def ref_rma(s, length):
+    return s.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+
+def ref_ema(s, length):
+    s = s.copy()
+    first = s.first_valid_index()
+    s = s.loc[first:]
+    seed = s.iloc[:length].mean()
+    s.iloc[:length - 1] = np.nan
+    s.iloc[length - 1] = seed
+    return s.ewm(span=length, adjust=False).mean().reindex(range(first + len(s)))
+
+
+def ref_rsi(close, length=14):
+    diff = close.diff()
+    pos, neg = diff.copy(), diff.copy()
+    pos[pos < 0] = 0
+    neg[neg > 0] = 0
+    pos_avg, neg_avg = ref_rma(pos, length), ref_rma(neg, length)
+    return 100 * pos_avg / (pos_avg + neg_avg.abs())
+
+
+def ref_atr(high, low, close, length=14):
+    prev = close.shift(1)
+    tr = pd.concat([high - low, high - prev, prev - low], axis=1).abs().max(axis=1)
+    tr.iloc[0] = np.nan
+    return ref_rma(tr, length)
+
+
+def ref_stoch_k(high, low, close, k=14, smooth_k=3):
+    lowest = low.rolling(k).min()
+    highest = high.rolling(k).max()
+    raw = 100 * (close - lowest) / (highest - lowest)
+    return raw.rolling(smooth_k).mean()
+
+
+def _random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+
+class IndicatorsTest(unittest.TestCase):
+    def setUp(self):
+        self.close = pd.Series(_random_walk(600, 1))
+        self.high = self.close * 1.01
+        self.low = self.close * 0.99
+
+    def assertClose(self, actual, expected):
+        expected = np.asarray(expected, dtype=float)
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+        np.testing.assert_allclose(actual, expected, rtol=TOLERANCE, atol=TOLERANCE, equal_nan=True)
+
+    def test_matches_pandas_reference(self):
+        c = self.close
+        self.assertClose(indicators.sma(c, 20), c.rolling(20).mean())
+        self.assertClose(indicators.rolling_volatility(c, 20), c.rolling(20).std())
+        self.assertClose(indicators.ema(c, 20), ref_ema(c, 20))
+        self.assertClose(indicators.rsi(c), ref_rsi(c))
+        self.assertClose(indicators.atr(self.high, self.low, c), ref_atr(self.high, self.low, c))
+        stoch_k, _ = indicators.stoch(self.high, self.low, c)
+        self.assertClose(stoch_k, ref_stoch_k(self.high, self.low, c))
+        line, signal, _ = indicators.macd(c)
+        ref_line = ref_ema(c, 12) - ref_ema(c, 26)
+        self.assertClose(line, ref_line)
+        self.assertClose(signal, ref_ema(ref_line, 9))
+
+    @unittest.skipIf(ta is None, 'pandas_ta not installed')
+    def test_matches_pandas_ta(self):
+        c = self.close
+        self.assertClose(indicators.rsi(c), ta.rsi(c))
+        self.assertClose(indicators.ema(c, 20), ta.ema(c, length=20))
+        self.assertClose(indicators.macd(c)[0], ta.macd(c)['MACD_12_26_9'])
+        self.assertClose(indicators.atr(self.high, self.low, c), ta.atr(self.high, self.low, c))
+        self.assertClose(indicators.stoch(self.high, self.low, c)[0], ta.stoch(self.high, self.low, c)['STOCHk_14_3_3'])
+
+    def test_panel_matches_rows(self):
+        panel = np.vstack([_random_walk(300, 2), _random_walk(300, 3)])
+        panel[1, :40] = np.nan  # symbol listed later
+        for func in (indicators.rsi, indicators.sma, indicators.ema, indicators.rolling_volatility):
+            result = func(panel)
+            for row in range(panel.shape[0]):
+                np.testing.assert_allclose(result[row], func(panel[row]), rtol=1e-12, equal_nan=True)
+        late = pd.Series(panel[1])
+        self.assertClose(indicators.rsi(panel)[1], ref_rsi(late))
+        self.assertClose(indicators.ema(panel, 20)[1], ref_ema(late, 20))
+
+    def test_long_series_is_stable(self):
+        c = pd.Series(_random_walk(20000, 4))
+        self.assertClose(indicators.rsi(c), ref_rsi(c))
+        self.assertClose(indicators.ema(c, 12), ref_ema(c, 12))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'finover-ml'))
+from price_store import PriceStore
+from ingestion import MarketDataClient, ingest
+import fixture_server
+
+
+class IngestionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_dir = os.path.join(self.tmp.name, 'csv')
+        os.makedirs(self.csv_dir)
+        dates = pd.bdate_range('2024-01-01', periods=30).strftime('%Y-%m-%d')
+        for i, symbol in enumerate(['AAA', 'BBB', 'CCC']):
+            self._write(symbol, dates, [100.0 + i + d for d in range(len(dates))])
+        self.server = fixture_server.serve(self.csv_dir)
+        self.client = MarketDataClient('test', base_url=self.server.base_url, pool_size=4)
+        self.store = PriceStore(os.path.join(self.tmp.name, 'store'))
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _write(self, symbol, dates, closes):
+        pd.DataFrame({'date': dates, 'close': closes}).to_csv(
+            os.path.join(self.csv_dir, f'{symbol}_history.csv'), index=False)
+
+    def test_initial_then_incremental_fetch(self):
+        report = ingest(['AAA', 'BBB', 'CCC', 'MISSING'], self.store, self.client, concurrency=4)
+        self.assertEqual(report['AAA'], {'status': 'updated', 'rows': 30})
+        self.assertEqual(report['MISSING']['status'], 'unchanged')
+        self.assertTrue(all('from' not in params for _, params in self.server.requests))
+        pd.testing.assert_frame_equal(
+            self.store.frame('BBB'), pd.read_csv(os.path.join(self.csv_dir, 'BBB_history.csv')))
+
+        df = pd.read_csv(os.path.join(self.csv_dir, 'AAA_history.csv'))
+        self._write('AAA', list(df['date']) + ['2024-02-12', '2024-02-13'], list(df['close']) + [1.0, 2.0])
+        self.server.requests.clear()
+        report = ingest(['AAA', 'BBB'], self.store, self.client, concurrency=4)
+        self.assertEqual(report['AAA'], {'status': 'updated', 'rows': 2})
+        self.assertEqual(report['BBB'], {'status': 'unchanged', 'rows': 0})
+        self.assertEqual(dict(self.server.requests)['AAA']['from'], '2024-02-10')
+        self.assertEqual(self.store.frame('AAA')['close'].tolist()[-2:], [1.0, 2.0])
+        self.assertEqual(str(self.store.last_date('BBB')), '2024-02-09')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import market_beta
+
+
+def reference_beta(stock_df, market_df):
+    """The original per-symbol inner-join implementation."""
+    merged = pd.merge(stock_df, market_df, on='date', how='inner')
+    merged['stock_return'] = merged['close'].pct_change()
+    merged['market_return'] = merged['spy_close'].pct_change()
+    merged.dropna(inplace=True)
+    covariance = np.cov(merged['stock_return'], merged['market_return'])[0][1]
+    return covariance / np.var(merged['market_return'], ddof=1)
+
+
+class MarketBetaTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.dates = pd.bdate_range('2023-01-02', periods=200).strftime('%Y-%m-%d')
+        market_ret = rng.normal(0, 0.01, 200)
+        self.market = 100 * np.cumprod(1 + market_ret)
+        self.market[[10, 50]] = np.nan  # market holidays
+        self.closes = np.empty((4, 200))
+        for i, true_beta in enumerate([0.5, 1.0, 1.5, 2.0]):
+            self.closes[i] = 50 * np.cumprod(1 + true_beta * market_ret + rng.normal(0, 0.005, 200))
+        self.closes[1, :30] = np.nan  # listed later
+        self.closes[2, rng.choice(200, 15, replace=False)] = np.nan  # scattered gaps
+
+    def test_matches_inner_join_reference(self):
+        stock_ret, market_ret = market_beta.aligned_returns(self.closes, self.market)
+        betas = market_beta.batch_beta(stock_ret, market_ret)
+        market_df = pd.DataFrame({'date': self.dates, 'spy_close': self.market}).dropna()
+        for i in range(4):
+            stock_df = pd.DataFrame({'date': self.dates, 'close': self.closes[i]}).dropna()
+            self.assertAlmostEqual(betas[i], reference_beta(stock_df, market_df), places=10)
+
+    def test_too_little_data_is_nan(self):
+        closes = self.closes.copy()
+        closes[0, 15:] = np.nan
+        betas = market_beta.batch_beta(*market_beta.aligned_returns(closes, self.market))
+        self.assertTrue(np.isnan(betas[0]))
+        self.assertFalse(np.isnan(betas[3]))
+
+    def test_streaming_matches_rolling(self):
+        stock_ret, market_ret = market_beta.aligned_returns(self.closes, self.market)
+        window = 60
+        rolling = market_beta.rolling_beta(stock_ret, market_ret, window, min_periods=20)
+        stream = market_beta.RollingBeta(4, window, min_periods=20, resync=7)
+        for t in range(200):
+            current = stream.update(stock_ret[:, t], market_ret[:, t])
+            np.testing.assert_allclose(current, rolling[:, t], rtol=1e-9, atol=1e-12)
+        last = market_beta.batch_beta(stock_ret[:, -window:], market_ret[:, -window:])
+        np.testing.assert_allclose(rolling[:, -1], last, rtol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from metrics import Registry
+
+
+class MetricsTest(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = Registry()
+        hist = registry.histogram('latency_seconds', 'Latency.', ['route'], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            hist.observe(value, route='/x')
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{route="/x",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="1.0"} 3', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{route="/x"} 4', text)
+        self.assertEqual(hist.snapshot(route='/x'), {'count': 4, 'sum': 4.05})
+
+    def test_label_sets_are_capped(self):
+        registry = Registry()
+        errors = registry.counter('errors_total', 'Errors.', ['symbol'], max_series=2)
+        for symbol in ('A', 'B', 'C', 'D', 'A'):
+            errors.inc(symbol=symbol)
+        self.assertEqual(errors.value(symbol='A'), 2)
+        self.assertEqual(errors.value(symbol='_other'), 2)
+        with self.assertRaises(ValueError):
+            errors.inc(sector='x')
+
+
+if __name__ == '__main__':
+    unittest.main()
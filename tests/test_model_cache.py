@@ -0,0 +1,106 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from model_cache import ModelCache
+
+
+class ModelCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.loads = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _loader(self, path):
+        self.loads.append(path)
+        with open(path) as fh:
+            return fh.read()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as fh:
+            fh.write(content)
+        return path
+
+    def test_hit_after_first_load(self):
+        cache = ModelCache(max_size=2, loader=self._loader)
+        path = self._write('a.pkl', 'A')
+        self.assertEqual(cache.get(path), 'A')
+        self.assertEqual(cache.get(path), 'A')
+        self.assertEqual(len(self.loads), 1)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_lru_eviction(self):
+        cache = ModelCache(max_size=2, loader=self._loader)
+        a, b, c = (self._write(n, n) for n in ('a', 'b', 'c'))
+        cache.get(a)
+        cache.get(b)
+        cache.get(a)
+        cache.get(c)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.get(a)
+        self.assertEqual(self.loads.count(b), 1)
+        cache.get(b)
+        self.assertEqual(self.loads.count(b), 2)
+
+    def test_reload_when_file_changes(self):
+        cache = ModelCache(loader=self._loader)
+        path = self._write('a.pkl', 'old')
+        cache.get(path)
+        self._write('a.pkl', 'newer')
+        self.assertEqual(cache.get(path), 'newer')
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_derived_object_follows_model_version(self):
+        cache = ModelCache(loader=self._loader)
+        path = self._write('a.pkl', 'old')
+        built = []
+        factory = lambda model: built.append(model) or model.upper()
+        self.assertEqual(cache.get_derived(path, 'upper', factory), ('old', 'OLD'))
+        cache.get_derived(path, 'upper', factory)
+        self.assertEqual(built, ['old'])
+        self._write('a.pkl', 'newer')
+        self.assertEqual(cache.get_derived(path, 'upper', factory), ('newer', 'NEWER'))
+        self.assertEqual(built, ['old', 'newer'])
+
+    def test_concurrent_misses_share_one_load(self):
+        release = threading.Event()
+
+        def slow_loader(path):
+            release.wait(5)
+            return self._loader(path)
+
+        cache = ModelCache(loader=slow_loader)
+        path = self._write('a.pkl', 'a')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_derived(path, 'upper', str.upper)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 5
+        while cache.stats()['load_joins'] < 7:
+            if time.monotonic() > deadline:
+                release.set()
+                self.fail(f"only {cache.stats()['load_joins']} of 7 loads joined the in-flight one")
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [('a', 'A')] * 8)
+        self.assertEqual(self.loads, [path])
+
+    def test_missing_file(self):
+        cache = ModelCache(loader=self._loader)
+        with self.assertRaises(FileNotFoundError):
+            cache.get(os.path.join(self.tmp.name, 'missing.pkl'))
+
+
+if __name__ == '__main__':
+    unittest.main()
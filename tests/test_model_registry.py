@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from model_registry import ModelRegistry, import_legacy
+
+
+def _model(slope):
+    X = np.arange(10, dtype=float).reshape(-1, 1)
+    return LinearRegression().fit(X, slope * X.ravel())
+
+
+class ModelRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.registry = ModelRegistry(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_publish_activate_and_rollback(self):
+        self.registry.publish('AAA', _model(1), ['x'], {'mae': 0.3}, version='v1')
+        self.registry.publish('AAA', _model(2), ['x'], {'mae': 0.2}, version='v2')
+        self.registry.refresh()
+        self.assertEqual(self.registry.active('AAA')['version'], 'v2')
+        self.assertEqual([e['version'] for e in self.registry.versions('AAA')], ['v1', 'v2'])
+
+        self.registry.rollback('AAA')
+        changes = self.registry.refresh()
+        self.assertEqual(changes['AAA'][1]['version'], 'v1')
+        self.assertAlmostEqual(joblib.load(self.registry.active('AAA')['path']).coef_[0], 1)
+        with self.assertRaises(KeyError):
+            self.registry.rollback('AAA')
+
+        self.registry.activate('AAA', 'v2')
+        self.registry.refresh()
+        self.assertEqual(self.registry.active('AAA')['metrics'], {'mae': 0.2})
+        with self.assertRaises(KeyError):
+            self.registry.activate('AAA', 'v9')
+
+    def test_unpublished_version_is_not_visible(self):
+        self.registry.publish('AAA', _model(1), ['x'], version='v1')
+        self.registry.publish('AAA', _model(2), ['x'], version='v2', activate=False)
+        self.registry.refresh()
+        self.assertEqual(self.registry.active('AAA')['version'], 'v1')
+
+    def test_refresh_only_rereads_changed_manifest(self):
+        self.registry.publish('AAA', _model(1), ['x'], version='v1')
+        prepared = []
+        self.assertEqual(set(self.registry.refresh(lambda s, e: prepared.append(e['version']))), {'AAA'})
+        self.assertEqual(self.registry.refresh(lambda s, e: prepared.append(e['version'])), {})
+        self.registry.publish('BBB', _model(3), ['x'], version='v1')
+        self.assertEqual(set(self.registry.refresh(lambda s, e: prepared.append(s))), {'BBB'})
+        self.assertEqual(prepared, ['v1', 'BBB'])
+
+    def test_failed_prepare_or_checksum_keeps_previous_model(self):
+        self.registry.publish('AAA', _model(1), ['x'], version='v1')
+        self.registry.refresh()
+        self.registry.publish('AAA', _model(2), ['x'], version='v2')
+
+        def fail(symbol, entry):
+            raise RuntimeError('bozuk model')
+
+        self.assertEqual(self.registry.refresh(fail), {})
+        self.assertEqual(self.registry.active('AAA')['version'], 'v1')
+
+        entry = self.registry.publish('AAA', _model(3), ['x'], version='v3')
+        with open(entry['path'], 'ab') as fh:
+            fh.write(b'x')
+        self.assertEqual(self.registry.refresh(), {})
+        self.assertEqual(self.registry.active('AAA')['version'], 'v1')
+
+    def test_import_legacy(self):
+        joblib.dump(_model(1), os.path.join(self.root, 'AAA_risk_model.pkl'))
+        registry = import_legacy(self.root)
+        registry.refresh()
+        entry = registry.active('AAA')
+        self.assertEqual(entry['version'], 'legacy')
+        self.assertEqual(entry['path'], os.path.join(self.root, 'AAA_risk_model.pkl'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import TimeSeriesSplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'finover-ml'))
+from model_search import _fit_fold, budgeted_search
+
+
+class _XGBStub:
+    """Records what an XGBoost regressor would be fitted and early-stopped on."""
+    __module__ = 'xgboost.sklearn'
+    best_iteration = 3
+
+    def set_params(self, **params):
+        self.params = params
+        return self
+
+    def fit(self, X, y, eval_set=None, verbose=None):
+        self.fit_rows, self.eval_rows = list(X.index), list(eval_set[0][0].index)
+        return self
+
+
+class BudgetedSearchTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = pd.DataFrame(rng.random((400, 3)), columns=['a', 'b', 'c'])
+        self.y = 2 * self.X['a'] - self.X['b'] + rng.normal(0, 0.05, 400)
+
+    def test_winner_scores_are_full_window_time_series_cv(self):
+        result = budgeted_search(Ridge(), {'alpha': [0.01, 0.1, 1.0, 10.0]}, self.X, self.y)
+        self.assertEqual(result['fraction'], 1.0)
+        # 4 + 2 + 1 candidates over 3 folds, plus the final refit
+        self.assertEqual(result['fits'], 22)
+        expected = []
+        for train_idx, test_idx in TimeSeriesSplit(n_splits=3).split(self.X):
+            model = Ridge(**result['params']).fit(self.X.iloc[train_idx], self.y.iloc[train_idx])
+            expected.append(mean_absolute_error(self.y.iloc[test_idx], model.predict(self.X.iloc[test_idx])))
+        np.testing.assert_allclose(result['fold_mae'], expected)
+        self.assertAlmostEqual(result['mae'], float(np.mean(expected)))
+
+    def test_tree_sizes_share_one_fit(self):
+        grid = {'n_estimators': [5, 10, 20], 'max_depth': [2, None]}
+        result = budgeted_search(RandomForestRegressor(random_state=0), grid, self.X, self.y)
+        # one fit per depth and fold in the first rung, then one per fold per
+        # surviving depth, instead of one per candidate
+        self.assertLess(result['fits'], 6 * 3)
+        self.assertIn(result['params']['n_estimators'], grid['n_estimators'])
+        self.assertEqual(result['model'].n_estimators, result['params']['n_estimators'])
+
+    def test_fit_budget_stops_the_search(self):
+        result = budgeted_search(Ridge(), {'alpha': [0.01, 0.1, 1.0, 10.0]}, self.X, self.y, max_fits=13)
+        self.assertTrue(result['exhausted'])
+        self.assertEqual(result['fits'], 14)
+        self.assertLess(result['fraction'], 1.0)
+        self.assertEqual(len(result['rungs']), 1)
+
+    def test_early_stopping_watches_the_training_tail(self):
+        train_idx = np.arange(100, 200)
+        model, best_iteration = _fit_fold(_XGBStub(), self.X, self.y, train_idx, 20)
+        self.assertEqual(best_iteration, 3)
+        self.assertEqual(model.fit_rows, list(range(100, 180)))
+        self.assertEqual(model.eval_rows, list(range(180, 200)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'finover-ml'))
+import data_preparation
+from model_registry import POOLED_SYMBOL, ModelRegistry
+
+
+def _frame(seed, beta, n=120):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    df = pd.DataFrame({'date': pd.bdate_range('2024-01-01', periods=n).strftime('%Y-%m-%d'), 'close': close})
+    return data_preparation.add_indicators(df, beta)
+
+
+class PooledTrainingTest(unittest.TestCase):
+    def setUp(self):
+        self.frames = {'AAA': _frame(0, 0.8), 'BBB': _frame(1, 1.5, n=90)}
+
+    def test_holdout_keeps_the_last_rows_of_each_symbol(self):
+        stacked = data_preparation.stack_universe(self.frames)
+        self.assertTrue(stacked['date'].is_monotonic_increasing)
+        train, test = data_preparation.holdout_split(stacked, test_size=0.25)
+        for symbol, group in stacked.groupby('symbol'):
+            held = test[test['symbol'] == symbol]
+            self.assertEqual(len(held), len(group) - int(np.ceil(len(group) * 0.75)))
+            self.assertGreater(held['date'].min(), train[train['symbol'] == symbol]['date'].max())
+
+    def test_train_pooled_model_publishes_and_compares(self):
+        with tempfile.TemporaryDirectory() as root:
+            registry = ModelRegistry(root)
+            report = data_preparation.train_pooled_model(self.frames, registry=registry)
+            registry.refresh()
+            entry = registry.active(POOLED_SYMBOL)
+        self.assertEqual(entry['universe'], ['AAA', 'BBB'])
+        self.assertEqual(entry['features'], data_preparation.POOLED_FEATURES)
+        self.assertNotIn('sma_20', entry['features'])  # a price level, not comparable across symbols
+        self.assertEqual(set(report['symbols']), {'AAA', 'BBB'})
+        for row in report['symbols'].values():
+            self.assertIn('pooled_mae', row)
+            self.assertIn('per_symbol_mae', row)
+        self.assertIn('per_symbol_mae', entry['metrics'])
+
+
+if __name__ == '__main__':
+    unittest.main()
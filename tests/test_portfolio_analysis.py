@@ -0,0 +1,135 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import numpy as np
+
+from portfolio_analysis import (
+    PortfolioState,
+    RiskTrendStream,
+    analyze_portfolio,
+    predict_risk_trend,
+    predict_risk_trends,
+    rank_candidates,
+    simulate_portfolio_change,
+)
+
+
+POSITIONS = [
+    {'symbol': 'AAA', 'quantity': 10, 'price': 10.0, 'risk_score': 0.8, 'sector': 'Tech'},
+    {'symbol': 'BBB', 'quantity': 5, 'price': 20.0, 'risk_score': 0.2, 'sector': 'Energy'},
+    {'symbol': 'CCC', 'quantity': 2, 'price': 50.0, 'risk_score': 0.4, 'sector': 'Tech'},
+]
+
+
+class PortfolioStateTest(unittest.TestCase):
+    def test_updates_match_full_analysis(self):
+        state = PortfolioState(POSITIONS, high_risk_threshold=0.5)
+        new = {'symbol': 'DDD', 'quantity': 4, 'price': 25.0, 'risk_score': 0.9, 'sector': 'Health'}
+        state.add(new)
+        state.remove('BBB')
+        state.resize('CCC', 4)
+        expected_positions = [POSITIONS[0], dict(POSITIONS[2], quantity=4), new]
+
+        expected = analyze_portfolio(expected_positions, high_risk_threshold=0.5)
+        actual = state.analysis()
+        self.assertAlmostEqual(actual['high_risk_percentage'], expected['high_risk_percentage'])
+        self.assertAlmostEqual(actual['diversification_score'], expected['diversification_score'])
+        self.assertEqual(actual['suggestions'], expected['suggestions'])
+        self.assertAlmostEqual(state.portfolio_risk, (100 * 0.8 + 200 * 0.4 + 100 * 0.9) / 400)
+
+    def test_analysis_keeps_each_position_sector(self):
+        no_symbol = [
+            {'quantity': 1, 'price': 100, 'risk_score': 0.9, 'sector': 'Tech'},
+            {'quantity': 1, 'price': 100, 'risk_score': 0.1, 'sector': 'Energy'},
+        ]
+        same_symbol = [dict(p, symbol='AAA') for p in no_symbol]
+        for positions in (no_symbol, same_symbol):
+            result = analyze_portfolio(positions)
+            self.assertEqual(result['sector_distribution'], {'Tech': 0.5, 'Energy': 0.5})
+            self.assertAlmostEqual(result['diversification_score'], 0.5)
+            self.assertEqual(result['suggestions'], [])
+        added = simulate_portfolio_change(no_symbol[:1], no_symbol[1])
+        self.assertEqual(added['analysis']['sector_distribution'], {'Tech': 0.5, 'Energy': 0.5})
+
+    def test_simulate_accepts_state(self):
+        state = PortfolioState(POSITIONS)
+        from_list = simulate_portfolio_change(POSITIONS, {'symbol': 'BBB'}, action='remove')
+        from_state = simulate_portfolio_change(state, {'symbol': 'BBB'}, action='remove')
+        self.assertAlmostEqual(from_state['new_risk'], from_list['new_risk'])
+        self.assertEqual(from_state['summary'], 'Portfolio risk has increased.')
+        self.assertNotIn('BBB', state)
+
+    def test_simulate_unknown_action_changes_nothing(self):
+        result = simulate_portfolio_change(POSITIONS, {'symbol': 'BBB'}, action='swap')
+        self.assertEqual(result['risk_change'], 0.0)
+        self.assertEqual(result['summary'], 'Portfolio risk is unchanged.')
+        self.assertEqual(result['analysis'], analyze_portfolio(POSITIONS, 0.6))
+
+    def test_evaluate_matches_applying_each_trade(self):
+        state = PortfolioState(POSITIONS, high_risk_threshold=0.5)
+        candidates = [
+            {'symbol': 'EEE', 'quantity': 3, 'price': 40.0, 'risk_score': 0.1, 'sector': 'Utilities'},
+            {'action': 'remove', 'symbol': 'AAA'},
+            {'action': 'resize', 'symbol': 'BBB', 'quantity': 20},
+            {'action': 'remove', 'symbol': 'ZZZ'},
+        ]
+        scores = state.evaluate(candidates)
+        for i, change in enumerate(candidates[:3]):
+            trial = PortfolioState(POSITIONS, high_risk_threshold=0.5)
+            trial.apply(change, change.get('action', 'add'))
+            analysis = trial.analysis()
+            self.assertAlmostEqual(scores['portfolio_risk'][i], trial.portfolio_risk)
+            self.assertAlmostEqual(scores['high_risk_percentage'][i], analysis['high_risk_percentage'])
+            self.assertAlmostEqual(scores['diversification_score'][i], analysis['diversification_score'])
+            self.assertAlmostEqual(scores['max_sector_weight'][i], max(analysis['sector_distribution'].values()))
+        self.assertEqual(len(state), 3)
+
+        ranked = rank_candidates(POSITIONS, candidates)
+        self.assertEqual(ranked[0]['candidate']['symbol'], 'AAA')
+        self.assertEqual(ranked[-1]['error'], 'Symbol not in portfolio')
+
+
+class RiskTrendTest(unittest.TestCase):
+    HISTORIES = [
+        [('d0', 0.2), ('d1', 0.25), ('d2', 0.4), ('d3', 0.45)],
+        [0.5, 0.48, 0.47],
+        [0.3],
+        [],
+        [0.1 + 0.05 * i for i in range(12)],
+    ]
+
+    def test_batch_matches_polyfit_on_ragged_histories(self):
+        results = predict_risk_trends(self.HISTORIES, forecast_periods=3, batch_size=2)
+        for history, result in zip(self.HISTORIES, results):
+            risks = [r[1] if isinstance(r, tuple) else r for r in history]
+            if len(risks) < 2:
+                self.assertEqual(result, {'predictions': [], 'warning': None})
+                continue
+            coef = np.polyfit(np.arange(len(risks)), risks, 1)
+            expected = np.polyval(coef, np.arange(len(risks), len(risks) + 3))
+            np.testing.assert_allclose(result['predictions'], expected, atol=1e-12)
+            self.assertEqual(result['warning'] is not None, expected[-1] - risks[-1] > 0.1)
+        self.assertIsNotNone(results[-1]['warning'])
+        single = predict_risk_trend(self.HISTORIES[0], 3)
+        np.testing.assert_allclose(single['predictions'], results[0]['predictions'])
+
+    def test_stream_matches_batch(self):
+        stream = RiskTrendStream(capacity=1)
+        stream.extend('gone', [0.9, 0.1])
+        for key, history in enumerate(self.HISTORIES):
+            for item in history[:2]:
+                stream.add(key, item[1] if isinstance(item, tuple) else item)
+            stream.extend(key, history[2:])
+        stream.remove('gone')
+        self.assertEqual(sorted(stream.forecast()), [0, 1, 2, 4])  # empty histories are not tracked
+        forecasts = stream.forecast(range(len(self.HISTORIES)), forecast_periods=3)
+        for key, expected in enumerate(predict_risk_trends(self.HISTORIES, forecast_periods=3)):
+            np.testing.assert_allclose(forecasts[key]['predictions'], expected['predictions'], atol=1e-12)
+            self.assertEqual(forecasts[key]['warning'], expected['warning'])
+        self.assertEqual(stream.forecast(['missing'])['missing']['predictions'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,9 +2,13 @@ import unittest
 import os
 import sys
 
+import numpy as np
+
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from portfolio_risk import (
     calculate_portfolio_risk_advanced,
+    portfolio_risk_decomposition,
+    risk_measures,
     value_at_risk,
     conditional_value_at_risk,
 )
@@ -29,5 +33,68 @@ class PortfolioRiskTest(unittest.TestCase):
         cvar = conditional_value_at_risk(returns, confidence=0.95)
         self.assertGreaterEqual(cvar, var)
 
+    def test_matches_pairwise_formula(self):
+        rng = np.random.default_rng(0)
+        positions = [
+            {'symbol': f'S{i}', 'quantity': int(rng.integers(1, 10)), 'price': float(rng.uniform(10, 100)),
+             'volatility': float(rng.uniform(0.01, 0.05)), 'beta': float(rng.uniform(0.5, 1.5)),
+             'returns': list(rng.normal(0, 0.02, int(rng.integers(30, 40))))}
+            for i in range(6)
+        ]
+        values = [p['quantity'] * p['price'] for p in positions]
+        weights = [v / sum(values) for v in values]
+        vols = [p['volatility'] for p in positions]
+        min_len = min(len(p['returns']) for p in positions)
+        corr = np.corrcoef([p['returns'][-min_len:] for p in positions])
+        expected_var = sum(
+            weights[i] * weights[j] * vols[i] * vols[j] * corr[i][j]
+            for i in range(6) for j in range(6)
+        )
+        result = calculate_portfolio_risk_advanced(positions, include_contributions=True)
+        self.assertAlmostEqual(result['portfolio_volatility'], expected_var ** 0.5)
+        components = sum(c['component'] for c in result['risk_contributions'])
+        self.assertAlmostEqual(components, result['portfolio_volatility'])
+
+        covariance = np.outer(vols, vols) * corr
+        with_cov = calculate_portfolio_risk_advanced(positions, covariance=covariance)
+        self.assertAlmostEqual(with_cov['portfolio_risk'], result['portfolio_risk'])
+
+    def test_float32_mode(self):
+        rng = np.random.default_rng(1)
+        weights = rng.dirichlet(np.ones(500))
+        vols = rng.uniform(0.01, 0.05, 500)
+        returns = rng.normal(0, 0.02, (500, 60))
+        exact = portfolio_risk_decomposition(weights, vols, returns)
+        approx = portfolio_risk_decomposition(weights, vols, returns, dtype=np.float32)
+        self.assertEqual(approx['component'].dtype, np.float32)
+        self.assertAlmostEqual(approx['volatility'], exact['volatility'], places=5)
+
+    def test_risk_measures_match_percentile(self):
+        rng = np.random.default_rng(2)
+        returns = np.round(rng.normal(0, 0.02, (20, 250)), 3)  # rounding creates ties
+        levels = [0.9, 0.95, 0.99]
+        result = risk_measures(returns, levels)
+        self.assertEqual(result['var'].shape, (20, 3))
+        for p in range(20):
+            for c, conf in enumerate(levels):
+                threshold = np.percentile(returns[p], (1 - conf) * 100)
+                self.assertAlmostEqual(result['var'][p, c], -threshold)
+                self.assertAlmostEqual(result['cvar'][p, c], -returns[p][returns[p] <= threshold].mean())
+
+    def test_monte_carlo_is_seeded_and_close_to_parametric(self):
+        rng = np.random.default_rng(3)
+        assets = rng.normal(0.001, 0.02, (4, 500))
+        weights = [[0.25, 0.25, 0.25, 0.25], [1.0, 0.0, 0.0, 0.0]]
+        kwargs = dict(confidence=[0.95, 0.99], weights=weights, asset_returns=assets)
+        mc = risk_measures(method='monte_carlo', n_simulations=100000, chunk_size=7000, seed=42, **kwargs)
+        again = risk_measures(method='monte_carlo', n_simulations=100000, chunk_size=7000, seed=42, **kwargs)
+        parametric = risk_measures(method='parametric', **kwargs)
+        np.testing.assert_array_equal(mc['var'], again['var'])
+        np.testing.assert_allclose(mc['var'], parametric['var'], rtol=0.03)
+        np.testing.assert_allclose(mc['cvar'], parametric['cvar'], rtol=0.03)
+        with self.assertRaises(ValueError):
+            risk_measures(method='monte_carlo', n_simulations=0, **kwargs)
+
+
 if __name__ == '__main__':
     unittest.main()
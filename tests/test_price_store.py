@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from price_store import PriceStore, import_csv_dir
+
+
+class PriceStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_dir = os.path.join(self.tmp.name, 'csv')
+        self.root = os.path.join(self.tmp.name, 'store')
+        os.makedirs(self.csv_dir)
+        pd.DataFrame({'date': ['2024-01-02', '2024-01-03', '2024-01-04'], 'close': [1.0, 2.0, 3.0]}).to_csv(
+            os.path.join(self.csv_dir, 'AAA_history.csv'), index=False)
+        pd.DataFrame({'date': ['2024-01-03', '2024-01-04'], 'close': [10.0, 11.0]}).to_csv(
+            os.path.join(self.csv_dir, 'BBB_history.csv'), index=False)
+        self.store = import_csv_dir(self.csv_dir, self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_import_aligns_dates(self):
+        dates, closes = self.store.panel()
+        self.assertEqual(self.store.symbols, ['AAA', 'BBB'])
+        self.assertEqual(len(dates), 3)
+        np.testing.assert_array_equal(closes[:, 1], [np.nan, 10.0, 11.0])
+        self.assertEqual(self.store.frame('BBB')['date'].tolist(), ['2024-01-03', '2024-01-04'])
+
+    def test_reads_are_memory_mapped_views(self):
+        _, closes = self.store.panel()
+        _, column = self.store.series('AAA')
+        self.assertIsInstance(closes, np.memmap)
+        self.assertTrue(np.shares_memory(closes, column))
+
+    def test_append_new_days_is_visible_to_other_readers(self):
+        reader = PriceStore(self.root)
+        reader.panel()
+        self.store.write({'AAA': pd.Series([4.0], index=['2024-01-05'])})
+        dates, closes = reader.series('AAA', start='2024-01-04')
+        np.testing.assert_array_equal(closes, [3.0, 4.0])
+        self.assertEqual(str(reader.last_date('BBB')), '2024-01-04')
+        self.assertEqual(str(reader.last_date()), '2024-01-05')
+
+    def test_new_symbol_rewrites_and_keeps_data(self):
+        version = self.store.version('AAA')
+        self.store.write({'CCC': pd.Series([7.0], index=['2024-01-01'])})
+        self.assertEqual(self.store.symbols, ['AAA', 'BBB', 'CCC'])
+        _, closes = self.store.series('AAA')
+        np.testing.assert_array_equal(closes, [np.nan, 1.0, 2.0, 3.0])
+        self.assertNotEqual(self.store.version('AAA'), version)
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'closes.0.f64')))
+
+    def test_correcting_a_close_changes_version(self):
+        version, other = self.store.version('AAA'), self.store.version('BBB')
+        self.store.write({'AAA': pd.Series([2.5], index=['2024-01-03'])})
+        np.testing.assert_array_equal(self.store.series('AAA')[1], [1.0, 2.5, 3.0])
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'closes.1.f64')))  # written in place
+        self.assertNotEqual(PriceStore(self.root).version('AAA'), version)
+        self.assertEqual(self.store.version('BBB'), other)
+
+    def test_signature_changes_when_mtime_does_not(self):
+        self.store.write({'AAA': pd.Series([2.5], index=['2024-01-03'])})
+        meta = os.path.join(self.root, 'meta.json')
+        st = os.stat(meta)
+        reader = PriceStore(self.root)
+        signature = reader.signature
+        self.store.write({'AAA': pd.Series([2.0], index=['2024-01-03'])})
+        os.utime(meta, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(os.path.getsize(meta), st.st_size)
+        self.assertNotEqual(reader.signature, signature)
+        self.assertEqual(reader.series('AAA')[1][1], 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
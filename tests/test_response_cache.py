@@ -0,0 +1,33 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from response_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_key_is_canonical_and_versioned(self):
+        cache = ResponseCache()
+        self.assertEqual(cache.key({'a': 1, 'b': [1.5]}), cache.key({'b': [1.5], 'a': 1}))
+        self.assertNotEqual(cache.key({'a': 1}, version=1), cache.key({'a': 1}, version=2))
+        quantized = ResponseCache(quantize=4)
+        self.assertEqual(quantized.key({'price': 101.23001}), quantized.key({'price': 101.22999}))
+        self.assertNotEqual(cache.key({'price': 101.23001}), cache.key({'price': 101.22999}))
+
+    def test_ttl_and_lru_bound(self):
+        now = [0.0]
+        cache = ResponseCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+        self.assertEqual(cache.get('a'), b'1')
+        cache.put('c', b'3')  # evicts 'b', the least recently used
+        self.assertIsNone(cache.get('b'))
+        now[0] = 11
+        self.assertIsNone(cache.get('a'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['evictions'], stats['expired']), (1, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,309 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import risk_api
+from model_registry import POOLED_SYMBOL, ModelRegistry
+from universe_scores import ScoreTable
+
+
+def _train_tiny_model(seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.random((60, len(risk_api.FEATURE_COLUMNS))), columns=risk_api.FEATURE_COLUMNS)
+    y = X.mean(axis=1)
+    model = RandomForestRegressor(n_estimators=5, max_depth=3, random_state=seed)
+    return model.fit(X, y)
+
+
+class RiskApiTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.model_dir = os.path.join(cls.tmp.name, 'models')
+        os.makedirs(cls.model_dir)
+        for i, symbol in enumerate(['AAA', 'BBB']):
+            joblib.dump(_train_tiny_model(i), os.path.join(cls.model_dir, f'{symbol}_risk_model.pkl'))
+        cls._orig = (risk_api.MODEL_DIR, risk_api.MODEL_REGISTRY)
+        risk_api.MODEL_DIR = cls.model_dir
+        risk_api.MODEL_REGISTRY = ModelRegistry(cls.model_dir)
+        risk_api.MODEL_CACHE.invalidate()
+        cls.client = risk_api.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        risk_api.MODEL_DIR, risk_api.MODEL_REGISTRY = cls._orig
+        risk_api.MODEL_CACHE.invalidate()
+        cls.tmp.cleanup()
+
+    def _row(self, symbol, value=0.5):
+        return {'symbol': symbol, 'rsi': value, 'sma_20': value, 'volatility': value, 'beta': value}
+
+    def test_single_row_matches_batch(self):
+        single = self.client.post('/predict-risk', json=self._row('AAA', 0.3)).get_json()
+        batch = self.client.post('/predict-risk-batch', json={'rows': [self._row('AAA', 0.3)]}).get_json()
+        self.assertEqual(single['risk_percentage'], batch['results'][0]['risk_percentage'])
+        self.assertEqual(single['breakdown'], batch['results'][0]['breakdown'])
+
+    def test_bad_rows_do_not_fail_their_group(self):
+        rows = [self._row('AAA', 0.3), dict(self._row('AAA'), rsi='x'), dict(self._row('AAA'), beta=None),
+                self._row('AAA', 0.6)]
+        results = self.client.post('/predict-risk-batch', json={'rows': rows}).get_json()['results']
+        self.assertEqual([r.get('status') for r in results], [None, 400, 400, None])
+        self.assertIn('rsi', results[1]['error'])
+        single = self.client.post('/predict-risk', json=self._row('AAA', 0.6)).get_json()
+        self.assertEqual(results[3]['risk_percentage'], single['risk_percentage'])
+        self.assertEqual(self.client.post('/predict-risk', json=rows[1]).status_code, 400)
+
+    def test_recommend_low_risk_bounds_and_fallback(self):
+        risks = {'AAA': 45, 'BBB': 60, 'CCC': 35, 'DDD': 80}
+        table = ScoreTable(self.model_dir, lambda s: {'risk_percentage': risks[s]}, lambda s: 1,
+                           model_versions=lambda: dict.fromkeys(risks, 1))
+        orig, risk_api.SCORE_TABLE = risk_api.SCORE_TABLE, table
+        try:
+            def symbols(query):
+                return [r['symbol'] for r in self.client.get('/recommend-low-risk' + query).get_json()]
+
+            self.assertEqual(symbols('?min_risk=40'), ['AAA', 'BBB', 'DDD'])
+            self.assertEqual(symbols('?max_risk=50'), ['CCC', 'AAA'])
+            self.assertEqual(symbols(''), ['CCC', 'AAA', 'BBB'])  # nothing below 30
+            self.assertEqual(symbols('?order=desc&limit=2'), ['DDD', 'BBB'])
+        finally:
+            risk_api.SCORE_TABLE = orig
+
+    def test_risk_trend_batch_and_stream_agree(self):
+        histories = {'p1': [0.2, 0.3, 0.45], 'p2': [['2024-01-01', 0.5]]}
+        batch = self.client.post('/risk-trend', json={'histories': histories}).get_json()['forecasts']
+        self.assertEqual(batch['p2'], {'predictions': [], 'warning': None})
+        state = self.client.post('/risk-trend/update', json={'histories': {'p1': [0.2, 0.3]}}).get_json()['state']
+        self.assertEqual(state, {'p1': [2.0, 0.5, 0.3, 0.3]})
+        resp = self.client.post('/risk-trend/update', json={
+            'state': state, 'snapshots': [{'portfolio': 'p1', 'risk': 0.45}]}).get_json()
+        streamed = resp['forecasts']
+        self.assertEqual(list(streamed), ['p1'])
+        for got, expected in zip(streamed['p1']['predictions'], batch['p1']['predictions']):
+            self.assertAlmostEqual(got, expected)
+        self.assertEqual(resp['state']['p1'][0], 3.0)
+        bad = {'state': state, 'snapshots': [{'portfolio': 'p1', 'risk': 0.5}, {}]}
+        self.assertEqual(self.client.post('/risk-trend/update', json=bad).status_code, 400)
+        bad = {'state': {'p1': [1.5, 0.0, 0.0, 0.0]}}
+        self.assertEqual(self.client.post('/risk-trend/update', json=bad).status_code, 400)
+
+    def test_portfolio_full_scores_from_stored_histories(self):
+        rng = np.random.default_rng(3)
+        dates = pd.bdate_range('2024-01-01', periods=60).strftime('%Y-%m-%d')
+        orig = (risk_api.PRICE_STORE, risk_api.COVARIANCE_SERVICE)
+        with tempfile.TemporaryDirectory() as root:
+            store = risk_api.PriceStore(root)
+            store.write({s: pd.Series(100 * np.cumprod(1 + rng.normal(0, 0.01, 60)), index=dates)
+                         for s in ['AAA', 'BBB', 'CCC', 'SPY']})
+            risk_api.PRICE_STORE = store
+            risk_api.COVARIANCE_SERVICE = risk_api.CovarianceService(store)
+            try:
+                holdings = [
+                    {'symbol': 'AAA', 'quantity': 2, 'price': 10.0, 'sector': 'Tech'},
+                    {'symbol': 'BBB', 'quantity': 1, 'price': 30.0},
+                    {'symbol': 'CCC', 'quantity': 1, 'price': 5.0},
+                    {'symbol': 'DDD', 'quantity': 1, 'price': 5.0},
+                ]
+                resp = self.client.post('/portfolio-full', json={'holdings': holdings})
+                self.assertEqual(resp.status_code, 200)
+                body = resp.get_json()
+                risks = {r['symbol']: r for r in body['risks']}
+                market = risk_api.load_history('SPY')
+                expected = self.client.post('/predict-risk', json=risk_api.latest_features('AAA', market)).get_json()
+                self.assertEqual(risks['AAA']['risk_percentage'], expected['risk_percentage'])
+                self.assertIn('error', risks['CCC'])  # no model
+                self.assertIn('error', risks['DDD'])  # no history
+                weights = np.array([20.0, 30.0]) / 50
+                scores = np.array([risks['AAA']['risk_percentage'], risks['BBB']['risk_percentage']]) / 100
+                self.assertAlmostEqual(body['weighted']['portfolio_risk'], weights @ scores)
+                self.assertGreater(body['advanced']['portfolio_volatility'], 0)
+                self.assertEqual(body['analysis']['sector_distribution'], {'Tech': 0.4, 'Unknown': 0.6})
+                bad = self.client.post('/portfolio-full', json={'holdings': [{'quantity': 1}]})
+                self.assertEqual(bad.status_code, 400)
+            finally:
+                risk_api.PRICE_STORE, risk_api.COVARIANCE_SERVICE = orig
+
+    def test_batch_reports_per_row_errors(self):
+        rows = [self._row('AAA'), self._row('ZZZ'), {'rsi': 1}, self._row('BBB'), self._row('AAA', 0.9)]
+        resp = self.client.post('/predict-risk-batch', json={'rows': rows})
+        self.assertEqual(resp.status_code, 200)
+        results = resp.get_json()['results']
+        self.assertEqual(len(results), len(rows))
+        self.assertIn('risk_percentage', results[0])
+        self.assertEqual(results[1]['status'], 404)
+        self.assertEqual(results[2]['status'], 400)
+        self.assertEqual(results[3]['symbol'], 'BBB')
+        self.assertIn('risk_percentage', results[4])
+
+    def test_ready_after_warm_up(self):
+        risk_api.READY.clear()
+        self.assertEqual(self.client.get('/ready').status_code, 503)
+        summary = risk_api.warm_up(explainers=False)
+        self.assertEqual(summary['models'], 2)
+        self.assertEqual(self.client.get('/ready').get_json(), {'status': 'ready'})
+        self.assertEqual(risk_api.MODEL_CACHE.stats()['size'], 2)
+
+    def test_metrics_report_latency_stages_and_errors(self):
+        self.client.post('/predict-risk', json=self._row('AAA'))
+        self.client.post('/predict-risk', json=self._row('ZZZ'))
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('risk_api_request_seconds_count{route="/predict-risk",method="POST",status="200"}', text)
+        self.assertIn('risk_api_stage_seconds_count{stage="predict"}', text)
+        self.assertIn('risk_api_symbol_errors_total{symbol="ZZZ",status="404"}', text)
+        self.assertIn('risk_api_model_cache_hit_rate', text)
+        self.assertIn('risk_api_predict_joins', text)
+        self.assertIn('risk_api_model_cache_load_joins', text)
+
+    def test_identical_concurrent_predictions_run_once(self):
+        release = threading.Event()
+        calls = []
+
+        class SlowPredictor:
+            def predict(self, X):
+                calls.append(X.copy())
+                release.wait(5)
+                return np.full(len(X), 0.25)
+
+        model, compiled = risk_api.load_compiled('AAA')
+        slow = SlowPredictor()
+        slow.buffer = compiled.buffer
+        orig = risk_api.load_compiled
+        risk_api.load_compiled = lambda key: (model, slow)
+        joined = risk_api.PREDICTIONS.stats()['joined']
+        results = []
+        try:
+            threads = [threading.Thread(target=lambda: results.append(risk_api.predict_rows([self._row('AAA', 0.7)])))
+                       for _ in range(5)]
+            for t in threads:
+                t.start()
+            deadline = time.monotonic() + 5
+            while risk_api.PREDICTIONS.stats()['joined'] < joined + 4:
+                if time.monotonic() > deadline:
+                    release.set()
+                    self.fail('concurrent predictions did not join the in-flight one')
+                time.sleep(0.001)
+            release.set()
+            for t in threads:
+                t.join()
+        finally:
+            risk_api.load_compiled = orig
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r[0]['risk_percentage'] for r in results], [25] * 5)
+
+    def test_predict_risk_etag_and_model_version(self):
+        row = self._row('BBB', 0.42)
+        first = self.client.post('/predict-risk', json=row)
+        etag = first.headers['ETag'].strip('"')
+        cached = self.client.post('/predict-risk', json=row)
+        self.assertEqual(cached.get_json(), first.get_json())
+        self.assertEqual(cached.headers['ETag'], first.headers['ETag'])
+
+        stats = risk_api.RESPONSE_CACHE.stats()
+        not_modified = self.client.post('/predict-risk', json=row, headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(risk_api.RESPONSE_CACHE.stats()['not_modified'], stats['not_modified'] + 1)
+
+        path = os.path.join(self.model_dir, 'BBB_risk_model.pkl')
+        joblib.dump(_train_tiny_model(7), path)
+        os.utime(path, ns=(1, 1))
+        refreshed = self.client.post('/predict-risk', json=row, headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed.headers['ETag'], first.headers['ETag'])
+
+    def test_registry_hot_swap_and_rollback(self):
+        registry = ModelRegistry(os.path.join(self.tmp.name, 'registry'))
+        orig, risk_api.MODEL_REGISTRY = risk_api.MODEL_REGISTRY, registry
+        try:
+            features = risk_api.FEATURE_COLUMNS
+            registry.publish('CCC', _train_tiny_model(1), features, {'mae': 0.1}, version='v1')
+            registry.refresh(risk_api._prepare_model)
+            row = self._row('CCC', 0.8)
+            first = self.client.post('/predict-risk', json=row)
+            self.assertEqual(first.status_code, 200)
+
+            registry.publish('CCC', _train_tiny_model(5), features, {'mae': 0.2}, version='v2')
+            changes = registry.refresh(risk_api._prepare_model)
+            self.assertEqual([e['version'] for e in changes['CCC']], ['v1', 'v2'])
+            risk_api._on_models_swapped(changes)
+            second = self.client.post('/predict-risk', json=row)
+            self.assertNotEqual(second.headers['ETag'], first.headers['ETag'])
+            self.assertNotEqual(second.get_json()['risk_percentage'], first.get_json()['risk_percentage'])
+
+            registry.rollback('CCC')
+            risk_api._on_models_swapped(registry.refresh(risk_api._prepare_model))
+            third = self.client.post('/predict-risk', json=row)
+            self.assertEqual(third.get_json(), first.get_json())
+            self.assertIn('CCC', risk_api.model_versions())
+        finally:
+            risk_api.MODEL_REGISTRY = orig
+            risk_api.MODEL_CACHE.invalidate()
+
+    def test_pooled_model_serves_universe_in_one_predict(self):
+        registry = ModelRegistry(os.path.join(self.tmp.name, 'pooled'))
+        registry.publish(POOLED_SYMBOL, _train_tiny_model(3), risk_api.FEATURE_COLUMNS, universe=['DDD'])
+        registry.refresh()
+        orig = (risk_api.MODEL_REGISTRY, risk_api.MODEL_MODE)
+        risk_api.MODEL_REGISTRY = registry
+        rows = [self._row('AAA', 0.2), self._row('DDD', 0.2), self._row('BBB', 0.6)]
+        try:
+            risk_api.MODEL_MODE = 'auto'
+            self.assertEqual(risk_api.model_key('AAA'), 'AAA')
+            self.assertEqual(risk_api.model_key('DDD'), POOLED_SYMBOL)
+            self.assertEqual(sorted(risk_api.model_versions()), ['AAA', 'BBB', 'DDD'])
+
+            risk_api.MODEL_MODE = 'pooled'
+            before = risk_api.STAGE_SECONDS.snapshot(stage='predict')['count']
+            results = risk_api.predict_rows(rows)
+            self.assertEqual(risk_api.STAGE_SECONDS.snapshot(stage='predict')['count'], before + 1)
+            self.assertEqual([r['symbol'] for r in results], ['AAA', 'DDD', 'BBB'])
+            self.assertEqual(results[0]['risk_percentage'], results[1]['risk_percentage'])
+
+            risk_api.MODEL_MODE = 'symbol'
+            self.assertEqual(risk_api.predict_rows(rows)[1]['status'], 404)
+        finally:
+            risk_api.MODEL_REGISTRY, risk_api.MODEL_MODE = orig
+            risk_api.MODEL_CACHE.invalidate()
+
+    def test_missing_model_single_row(self):
+        resp = self.client.post('/predict-risk', json=self._row('ZZZ'))
+        self.assertEqual(resp.status_code, 404)
+
+    @unittest.skipIf(risk_api.load_shap() is None, 'shap not installed')
+    def test_explain_batch_matches_single_and_reuses_explainer(self):
+        single = self.client.post('/predict-risk-explain', json=self._row('AAA', 0.3)).get_json()
+        rows = [self._row('AAA', 0.3), self._row('BBB', 0.7), self._row('ZZZ')]
+        before = risk_api.MODEL_CACHE.stats()['derived_misses']
+        results = self.client.post('/predict-risk-explain', json={'rows': rows}).get_json()['results']
+        self.assertEqual(risk_api.MODEL_CACHE.stats()['derived_misses'], before + 1)
+        self.assertEqual(results[0]['risk_percentage'], single['risk_percentage'])
+        for col in risk_api.FEATURE_COLUMNS:
+            self.assertAlmostEqual(results[0]['feature_importance'][col], single['feature_importance'][col])
+        self.assertIn('feature_importance', results[1])
+        self.assertEqual(results[2]['status'], 404)
+
+
+class StartupTest(unittest.TestCase):
+    def test_import_defers_heavy_libraries(self):
+        script = (
+            "import sys, risk_api\n"
+            "print(','.join(m for m in ('pandas', 'joblib', 'sklearn', 'shap') if m in sys.modules))"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, RISK_API_EAGER_IMPORTS='0')
+        out = subprocess.run([sys.executable, '-c', script], cwd=root, env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'finover-ml'))
+import data_preparation
+from price_store import PriceStore
+
+
+class RunUniverseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)  # training writes under data/ relative to the working directory
+        os.makedirs('data/csv')
+        os.makedirs('data/models')
+        self.store = PriceStore(os.path.join(self.tmp.name, 'store'))
+        self.saved_store, data_preparation.PRICE_STORE = data_preparation.PRICE_STORE, self.store
+        rng = np.random.default_rng(0)
+        dates = pd.bdate_range('2024-01-01', periods=80).strftime('%Y-%m-%d')
+        market = rng.normal(0, 0.01, 80)
+        self.store.write({
+            symbol: pd.Series(100 * np.cumprod(1 + market * beta + rng.normal(0, 0.01, 80)), index=dates)
+            for symbol, beta in (('SPY', 1.0), ('AAA', 0.8), ('BBB', 1.4))
+        })
+        self.market = data_preparation.get_market_data(fetch=False)
+
+    def tearDown(self):
+        data_preparation.PRICE_STORE = self.saved_store
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def run_universe(self, **kwargs):
+        return data_preparation.run_universe(
+            ['AAA', 'BBB'], self.market, workers=1, fetch=False, search={'max_fits': 2}, **kwargs)
+
+    def statuses(self, summary):
+        return {row['symbol']: row['status'] for row in summary['symbols']}
+
+    def test_unchanged_symbols_are_skipped_unless_forced(self):
+        first = self.run_universe()
+        self.assertEqual(self.statuses(first), {'AAA': 'trained', 'BBB': 'trained'})
+        with open(data_preparation.STATE_PATH) as fh:
+            state = json.load(fh)
+        self.assertEqual(set(state), {'AAA', 'BBB'})
+        with open(data_preparation.REPORT_PATH) as fh:
+            self.assertEqual(json.load(fh)['counts'], {'trained': 2})
+
+        second = self.run_universe()
+        self.assertEqual(self.statuses(second), {'AAA': 'skipped', 'BBB': 'skipped'})
+        self.assertEqual(second['symbols'][0]['model_path'], state['AAA']['model_path'])
+
+        forced = self.run_universe(force=True)
+        self.assertEqual(self.statuses(forced), {'AAA': 'trained', 'BBB': 'trained'})
+
+
+if __name__ == '__main__':
+    unittest.main()
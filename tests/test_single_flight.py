@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    def _burst(self, flight, fn, n=6):
+        started, release = threading.Event(), threading.Event()
+        outcomes = []
+
+        def leader_fn():
+            started.set()
+            release.wait(5)
+            return fn()
+
+        def call(work):
+            try:
+                outcomes.append(flight.do('key', work))
+            except ValueError as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=call, args=(leader_fn,))]
+        threads[0].start()
+        started.wait(5)
+        threads += [threading.Thread(target=call, args=(fn,)) for _ in range(n - 1)]
+        for t in threads[1:]:
+            t.start()
+        deadline = time.monotonic() + 5
+        while flight.stats()['joined'] < n - 1:
+            if time.monotonic() > deadline:
+                release.set()
+                self.fail(f"only {flight.stats()['joined']} of {n - 1} callers joined the leader")
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+        return outcomes
+
+    def test_joiners_share_the_leaders_result(self):
+        flight = SingleFlight()
+        runs = []
+        outcomes = self._burst(flight, lambda: runs.append(1) or len(runs))
+        self.assertEqual(outcomes, [1] * 6)
+        self.assertEqual(flight.stats(), {'in_flight': 0, 'calls': 1, 'joined': 5})
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')  # nothing is cached
+
+    def test_joiners_get_the_leaders_exception(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('boom')
+
+        outcomes = self._burst(flight, fail, n=3)
+        self.assertTrue(all(isinstance(o, ValueError) for o in outcomes))
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
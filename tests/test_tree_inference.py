@@ -0,0 +1,71 @@
+import unittest
+import glob
+import os
+import sys
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.append(ROOT)
+from tree_inference import compile_model
+
+FEATURES = ['rsi', 'sma_20', 'volatility', 'beta']
+
+
+def _feature_rows(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(0, 100, n),
+        rng.uniform(0, 500, n),
+        rng.uniform(0, 0.1, n),
+        rng.uniform(-1, 3, n),
+    ])
+    X[::11, 2] = np.nan
+    return X
+
+
+class TreeInferenceTest(unittest.TestCase):
+    def test_parity_with_every_shipped_model(self):
+        paths = sorted(glob.glob(os.path.join(ROOT, 'data', 'models', '*_risk_model.pkl')))
+        if not paths:
+            self.skipTest('no models in data/models')
+        X = _feature_rows()
+        for path in paths:
+            with self.subTest(model=os.path.basename(path)), warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                model = joblib.load(path)
+                compiled = compile_model(model, FEATURES)
+                self.assertIsNotNone(compiled)
+                frame = pd.DataFrame(X, columns=compiled.feature_names)
+                np.testing.assert_array_equal(compiled.predict(X), model.predict(frame))
+                np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(frame))
+                np.testing.assert_array_equal(compiled.predict(X[0]), model.predict(frame.iloc[:1]))
+
+    def test_regressors_and_single_trees(self):
+        rng = np.random.default_rng(1)
+        X = rng.random((200, 4))
+        y = X @ [1.0, -2.0, 0.5, 3.0]
+        for model in (
+            RandomForestRegressor(n_estimators=10, random_state=0),
+            DecisionTreeRegressor(max_depth=6, random_state=0),
+            ExtraTreesClassifier(n_estimators=10, random_state=0),
+        ):
+            target = y if not hasattr(model, 'predict_proba') else (y > 1).astype(int)
+            model.fit(X, target)
+            compiled = compile_model(model, FEATURES)
+            test = rng.random((50, 4))
+            np.testing.assert_allclose(compiled.predict(test), model.predict(test))
+            rows = [dict(zip(FEATURES, row)) for row in test[:3]]
+            np.testing.assert_allclose(compiled.predict(compiled.buffer(rows)), model.predict(test[:3]), rtol=1e-6)
+
+    def test_unsupported_model_returns_none(self):
+        self.assertIsNone(compile_model(object(), FEATURES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from universe_scores import ScoreTable, file_signature
+
+
+class ScoreTableTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model_dir = os.path.join(self.tmp.name, 'models')
+        self.csv_dir = os.path.join(self.tmp.name, 'csv')
+        os.makedirs(self.model_dir)
+        os.makedirs(self.csv_dir)
+        self.calls = []
+        self.risks = {'AAA': 10, 'BBB': 50, 'CCC': 25}
+        for symbol in self.risks:
+            self._touch(self.model_dir, f'{symbol}_risk_model.pkl', 'model')
+            self._touch(self.csv_dir, f'{symbol}_history.csv', 'date,close\n')
+        self.table = ScoreTable(self.model_dir, self._scorer, self._signature)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _touch(self, directory, name, content):
+        with open(os.path.join(directory, name), 'w') as fh:
+            fh.write(content)
+
+    def _signature(self, symbol):
+        return file_signature(os.path.join(self.csv_dir, f'{symbol}_history.csv'))
+
+    def _scorer(self, symbol):
+        self.calls.append(symbol)
+        return {'risk_percentage': self.risks[symbol]}
+
+    def test_only_changed_symbols_are_rescored(self):
+        self.assertEqual(self.table.refresh(), {'rescored': 3, 'unchanged': 0, 'removed': 0})
+        self._touch(self.csv_dir, 'BBB_history.csv', 'date,close\n2024-01-01,1\n')
+        self.risks['BBB'] = 5
+        self.assertEqual(self.table.refresh(), {'rescored': 1, 'unchanged': 2, 'removed': 0})
+        self.assertEqual(self.calls.count('BBB'), 2)
+        self.assertEqual([r['symbol'] for r in self.table.snapshot()], ['BBB', 'AAA', 'CCC'])
+
+    def test_failed_score_is_retried(self):
+        self.risks.pop('CCC')  # the scorer raises KeyError
+        with self.assertLogs('universe_scores', 'ERROR') as logs:
+            self.assertEqual(self.table.refresh()['rescored'], 3)
+        self.assertIn('CCC', logs.output[0])
+        self.assertEqual([r['symbol'] for r in self.table.snapshot()], ['AAA', 'BBB'])
+        self.risks['CCC'] = 25
+        self.assertEqual(self.table.refresh(), {'rescored': 1, 'unchanged': 2, 'removed': 0})
+        self.assertEqual([r['symbol'] for r in self.table.snapshot()], ['AAA', 'CCC', 'BBB'])
+
+    def test_removed_model_drops_symbol(self):
+        self.table.refresh()
+        os.remove(os.path.join(self.model_dir, 'AAA_risk_model.pkl'))
+        self.assertEqual(self.table.refresh()['removed'], 1)
+        self.assertNotIn('AAA', [r['symbol'] for r in self.table.snapshot()])
+
+    def test_query_filters_sorts_and_limits(self):
+        rows = self.table.query(max_risk=30, descending=True)
+        self.assertEqual([r['symbol'] for r in rows], ['CCC', 'AAA'])
+        rows = self.table.query(min_risk=10, sort='symbol', limit=2)
+        self.assertEqual([r['symbol'] for r in rows], ['AAA', 'BBB'])
+
+
+if __name__ == '__main__':
+    unittest.main()
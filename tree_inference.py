@@ -0,0 +1,153 @@
+"""Pandas-free inference for tree ensembles.
+
+:func:`compile_model` flattens the trees of a fitted scikit-learn decision
+tree or random/extra-trees forest into a few contiguous arrays (children,
+split feature, threshold, leaf values) with a fixed feature order. Rows are
+then evaluated straight from a NumPy buffer by walking every tree at once,
+level by level, which for single rows and small batches is much cheaper than
+building a DataFrame and going through ``model.predict`` input validation.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def _supported_models() -> tuple:
+    # Imported on first use: any model passed in has already loaded
+    # scikit-learn, and importing it up front slows down API start-up.
+    from sklearn.ensemble import (
+        ExtraTreesClassifier,
+        ExtraTreesRegressor,
+        RandomForestClassifier,
+        RandomForestRegressor,
+    )
+    from sklearn.tree import BaseDecisionTree
+
+    return BaseDecisionTree, (
+        BaseDecisionTree,
+        RandomForestClassifier,
+        RandomForestRegressor,
+        ExtraTreesClassifier,
+        ExtraTreesRegressor,
+    )
+
+
+class CompiledForest:
+    """Flat array form of a fitted tree ensemble.
+
+    Nodes of all trees are concatenated; ``roots`` holds the index of each
+    tree's root. Leaves point to themselves, so a fixed number of steps
+    (the deepest tree's depth) moves every tree to its leaf without branching.
+
+    Parameters
+    ----------
+    trees : sequence
+        Fitted ``sklearn.tree._tree.Tree`` objects of one ensemble.
+    feature_names : sequence of str
+        Column order of the input buffer.
+    classes : numpy.ndarray, optional
+        Class labels for classifiers; ``None`` for regressors.
+    """
+
+    def __init__(self, trees: Sequence[Any], feature_names: Sequence[str], classes: Optional[np.ndarray] = None) -> None:
+        self.feature_names = list(feature_names)
+        self.classes = classes
+        sizes = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+        self.roots = offsets
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        left, right, feature, threshold, missing_left, value = [], [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count, dtype=np.intp) + offset
+            leaf = tree.children_left == -1
+            left.append(np.where(leaf, nodes, tree.children_left + offset))
+            right.append(np.where(leaf, nodes, tree.children_right + offset))
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            missing_left.append(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool)))
+            leaf_value = tree.value[:, 0, :].astype(np.float64)
+            if classes is not None:
+                total = leaf_value.sum(axis=1, keepdims=True)
+                total[total == 0] = 1.0
+                leaf_value = leaf_value / total
+            value.append(leaf_value)
+
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.missing_left = np.concatenate(missing_left).astype(bool)
+        self.value = np.concatenate(value)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _as_buffer(self, X) -> np.ndarray:
+        # scikit-learn trees compare float32 inputs against float64 thresholds.
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {len(self.feature_names)}")
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+        return X
+
+    def leaves(self, X) -> np.ndarray:
+        """Return the ``rows x trees`` leaf index reached by each row."""
+        X = self._as_buffer(X)
+        nodes = np.tile(self.roots, (X.shape[0], 1))
+        rows = np.arange(X.shape[0])[:, None]
+        has_nan = bool(np.isnan(X).any())
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_value(self, X) -> np.ndarray:
+        """Return the averaged leaf values: class probabilities or regression outputs."""
+        return self.value[self.leaves(X)].mean(axis=1)
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.classes is None:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self.predict_value(X)
+
+    def predict(self, X) -> np.ndarray:
+        """Return predictions equal to the source model's ``predict``."""
+        values = self.predict_value(X)
+        if self.classes is None:
+            return values[:, 0]
+        return self.classes.take(values.argmax(axis=1))
+
+    def buffer(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Pack feature dicts into an input buffer in ``feature_names`` order."""
+        return np.array([[row[name] for name in self.feature_names] for row in rows], dtype=np.float32)
+
+
+def compile_model(model: Any, feature_names: Optional[Sequence[str]] = None) -> Optional[CompiledForest]:
+    """Return a :class:`CompiledForest` for ``model``, or ``None`` if unsupported.
+
+    Supported models are single-output decision trees and random or extra
+    trees forests. Feature order is taken from ``model.feature_names_in_``
+    when present, else from ``feature_names``.
+    """
+    single_tree, supported = _supported_models()
+    if not isinstance(model, supported) or getattr(model, "n_outputs_", 1) != 1:
+        return None
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        if feature_names is None:
+            return None
+        names = feature_names
+    trees = [model.tree_] if isinstance(model, single_tree) else [est.tree_ for est in model.estimators_]
+    if not trees:
+        return None
+    classes = getattr(model, "classes_", None)
+    return CompiledForest(trees, names, None if classes is None else np.asarray(classes))
@@ -0,0 +1,201 @@
+"""Precomputed risk scores for every symbol that has a model and price data."""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MODEL_SUFFIX = "_risk_model.pkl"
+
+log = logging.getLogger(__name__)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def model_symbols(model_dir: str) -> List[str]:
+    """Return the symbols that have a model file in ``model_dir``."""
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(
+        name[: -len(MODEL_SUFFIX)]
+        for name in os.listdir(model_dir)
+        if name.endswith(MODEL_SUFFIX)
+    )
+
+
+class ScoreTable:
+    """Table of per-symbol risk scores refreshed incrementally.
+
+    A symbol is rescored only when its price data or its model file changed
+    since the previous refresh. Readers get an immutable snapshot, so serving
+    never waits for a refresh in progress.
+
+    Parameters
+    ----------
+    model_dir : str
+        Directory holding ``{symbol}_risk_model.pkl`` files.
+    scorer : callable
+        ``scorer(symbol)`` returns a dict with at least ``risk_percentage`` or
+        ``None`` when the symbol cannot be scored.
+    data_signature : callable
+        ``data_signature(symbol)`` returns a hashable value that changes when
+        the symbol's price data changes, or ``None`` when it has no data.
+    model_versions : callable, optional
+        Returns ``{symbol: model_version}`` for every servable model, for
+        example from the model registry. By default ``model_dir`` is listed
+        and each model file's ``(mtime, size)`` is its version.
+    score_many : callable, optional
+        ``score_many(symbols)`` returns ``{symbol: row}`` for the symbols it
+        could score. When given, every changed symbol of a refresh is scored
+        in one call, so a pooled model needs one batched predict.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        scorer: Callable[[str], Optional[Dict[str, Any]]],
+        data_signature: Callable[[str], Any],
+        model_versions: Optional[Callable[[], Dict[str, Any]]] = None,
+        score_many: Optional[Callable[[List[str]], Dict[str, Dict[str, Any]]]] = None,
+    ) -> None:
+        self.model_dir = model_dir
+        self._model_versions = model_versions
+        self._scorer = scorer
+        self._score_many = score_many
+        self._data_signature = data_signature
+        self._signatures: Dict[str, Tuple[Any, Any]] = {}
+        self._scores: Dict[str, Dict[str, Any]] = {}
+        self._sorted: List[Dict[str, Any]] = []
+        self.refreshed_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _models(self) -> Dict[str, Any]:
+        if self._model_versions is not None:
+            return self._model_versions()
+        return {
+            symbol: file_signature(os.path.join(self.model_dir, f"{symbol}{MODEL_SUFFIX}"))
+            for symbol in model_symbols(self.model_dir)
+        }
+
+    def refresh(self) -> Dict[str, int]:
+        """Rescore changed symbols and publish a new snapshot.
+
+        Returns counts of ``rescored``, ``unchanged`` and ``removed`` symbols.
+        """
+        with self._refresh_lock:
+            scores = dict(self._scores)
+            signatures = dict(self._signatures)
+            rescored = unchanged = 0
+
+            models = self._models()
+            symbols = set(models)
+            pending = {}
+            for symbol, model_version in models.items():
+                signature = (self._data_signature(symbol), model_version)
+                if signatures.get(symbol) == signature:
+                    unchanged += 1
+                    continue
+
+                scores.pop(symbol, None)
+                rescored += 1
+                if signature[0] is None:
+                    signatures[symbol] = signature
+                else:
+                    pending[symbol] = signature
+
+            # A symbol whose scorer raised keeps no signature, so the next
+            # refresh tries it again.
+            rows = self._score(list(pending))
+            for symbol, signature in pending.items():
+                if symbol not in rows:
+                    signatures.pop(symbol, None)
+                    continue
+                signatures[symbol] = signature
+                if rows[symbol] is not None:
+                    scores[symbol] = {"symbol": symbol, **rows[symbol]}
+
+            removed = [s for s in signatures if s not in symbols]
+            for symbol in removed:
+                signatures.pop(symbol)
+                scores.pop(symbol, None)
+
+            self._signatures = signatures
+            self._scores = scores
+            self._sorted = sorted(scores.values(), key=lambda r: r["risk_percentage"])
+            self.refreshed_at = time.time()
+            return {"rescored": rescored, "unchanged": unchanged, "removed": len(removed)}
+
+    def _score(self, symbols: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        if self._score_many is not None and symbols:
+            try:
+                return self._score_many(symbols)
+            except Exception:
+                log.exception("Toplu skor hesaplanamadı")
+        rows = {}
+        for symbol in symbols:
+            try:
+                rows[symbol] = self._scorer(symbol)
+            except Exception:
+                log.exception("Skor hesaplanamadı %s", symbol)
+        return rows
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return scores sorted by ascending ``risk_percentage``."""
+        if self.refreshed_at is None:
+            self.refresh()
+        return self._sorted
+
+    def query(
+        self,
+        min_risk: Optional[float] = None,
+        max_risk: Optional[float] = None,
+        sort: str = "risk_percentage",
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Filter, sort and limit the current snapshot.
+
+        ``min_risk`` is inclusive and ``max_risk`` is exclusive.
+        """
+        rows = self.snapshot()
+        if min_risk is not None:
+            rows = [r for r in rows if r["risk_percentage"] >= min_risk]
+        if max_risk is not None:
+            rows = [r for r in rows if r["risk_percentage"] < max_risk]
+        if sort != "risk_percentage":
+            rows = sorted(rows, key=lambda r: (r.get(sort) is None, r.get(sort)))
+        if descending:
+            rows = list(reversed(rows))
+        if limit is not None:
+            rows = rows[:limit]
+        return rows
+
+    def start(self, interval: float = 300.0) -> None:
+        """Refresh now and then every ``interval`` seconds in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while True:
+                try:
+                    self.refresh()
+                except Exception:  # keep serving the previous snapshot
+                    log.exception("Skor tablosu yenilenemedi")
+                if self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=run, name="score-table-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()